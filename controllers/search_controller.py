@@ -6,9 +6,11 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from PyQt6.QtWidgets import QTableWidgetItem, QProgressDialog
 from PyQt6.QtCore import Qt, QThread, pyqtSignal  
 import concurrent
+import pandas as pd
 from datetime import datetime
 from utils.awb_detector import AWBDetector
 from utils.pattern_learner import PatternLearner
+from utils.detection_pool import DetectionProcessPool
 
 class SearchWorker(QThread):
     progress = pyqtSignal(int)
@@ -46,18 +48,27 @@ class SearchController:
         self.search_thread = None
         self.awb_detector = AWBDetector(main_window)  # main_window'u geç
         self.pattern_learner = PatternLearner()  # Pattern learner ekle
-        self.load_patterns()
         self.search_worker = None
         self.data_source_type = self.main_window.config.get("datasource", {}).get("type", "excel")
+        
+        # search.executor: "process" ise toplu tespit GIL'siz process havuzunda yapılır
+        search_config = self.main_window.config.get("search", {})
+        self.process_pool = None
+        if search_config.get("executor", "thread") == "process":
+            self.process_pool = DetectionProcessPool(
+                max_workers=search_config.get("process_workers") or None,
+                chunk_size=search_config.get("process_chunk_size", 50)
+            )
+        # Veri kaynağındaki AWB'lerin düzeltme indeksi arka planda kurulur
+        if self.main_window.config.get("detector", {}).get("fuzzy_index", True):
+            self.awb_detector.executor.submit(
+                self.awb_detector.build_fuzzy_index, self.main_window.data_source
+            )
 
-    def load_patterns(self):
-        """AWB pattern'larını json'dan yükle"""
-        try:
-            with open("config/awb_patterns.json", "r") as f:
-                self.patterns = json.load(f)["patterns"]
-        except Exception as e:
-            print(f"Pattern yükleme hatası: {str(e)}")
-            self.patterns = {}
+    @property
+    def patterns(self) -> Dict:
+        """AWB pattern'ları (detector'ın güncel derlenmiş bundle'ından)"""
+        return self.awb_detector.patterns.get("patterns", {})
 
     def search_completed(self):
         """Arama tamamlandığında"""
@@ -66,7 +77,8 @@ class SearchController:
 
     def _search_worker(self):
         with ThreadPoolExecutor() as executor:
-            mails = self.main_window.cache.load_cache()["mails"]
+            # Yalnızca başlıklar okunur; gövdeler her batch'te ayrıca yüklenir
+            mails = self.main_window.cache.list_mails()
             batch_size = self.main_window.config["search"]["batch_size"]
             
             # Mailleri batch'lere böl
@@ -81,6 +93,10 @@ class SearchController:
             results = []
             for future in concurrent.futures.as_completed(futures):
                 results.extend(future.result())
+
+            # Gönderen rotası ve pattern istatistikleri tüm batch'ler bitince bir kez diske yazılır
+            self.awb_detector.router.save()
+            self.awb_detector.pattern_stats.save()
                 
             # UI güncellemesi
             self.main_window.update_results(results)
@@ -89,47 +105,83 @@ class SearchController:
         """Bir batch içindeki maillerde AWB ara"""
         results = []
         seen_awbs = set()
+        mails = self.main_window.cache.with_bodies(mails)
         
-        for mail in mails:
-            text_to_search = f"{mail['body']} {mail['subject']}"
-            detected_awbs = self.awb_detector.find_all_awbs(text_to_search)
-            
+        # Tüm batch tek çağrıda taranır, sonuçlar mail sırasıyla gelir
+        detected = self._detect_batch(mails)
+        
+        for mail, detected_awbs in zip(mails, detected.values()):
             for awb_info in detected_awbs:
                 # Pattern'dan min_confidence değerini al
                 airline = awb_info['airline']
                 pattern_data = self.awb_detector.patterns["patterns"].get(airline, {})
                 min_confidence = pattern_data.get("min_confidence", 0.7)
                 
-                if awb_info['confidence'] >= min_confidence:
-                    normalized_awb, airline = self.awb_normalizer.normalize_awb(
-                        awb_info['awb'], 
-                        pattern_data
-                    )
-                    is_valid = self.awb_validator.validate_and_normalize(normalized_awb)
-                    
-                    if is_valid and normalized_awb not in seen_awbs:
-                        seen_awbs.add(normalized_awb)
-                        results.append({
-                            "awb": normalized_awb,
-                            "airline": airline,
-                            "confidence": awb_info['confidence'],
-                            "context": awb_info['context'],
-                            "matched_text": awb_info['match_text'],
-                            "line_number": awb_info['line_number'],
-                            "date": mail["date"],
-                            "subject": mail["subject"]
-                        })
+                # Detector AWB'yi zaten normalize edip doğruladı
+                normalized_awb = awb_info['awb']
+                if awb_info['confidence'] >= min_confidence and normalized_awb not in seen_awbs:
+                    seen_awbs.add(normalized_awb)
+                    results.append({
+                        "awb": normalized_awb,
+                        "airline": airline,
+                        "confidence": awb_info['confidence'],
+                        "context": awb_info['context'],
+                        "matched_text": awb_info['match_text'],
+                        "line_number": awb_info['line_number'],
+                        "date": mail["date"],
+                        "subject": mail["subject"]
+                    })
                         
         return sorted(results, key=lambda x: x['confidence'], reverse=True)
         
+    def _detect_batch(self, mails):
+        """Batch'i seçili executor ile tara"""
+        if self.process_pool is not None:
+            try:
+                return self.process_pool.find_all_awbs_batch(mails, self.awb_detector)
+            except Exception as e:
+                print(f"Process havuzu hatası, thread moduna dönülüyor: {str(e)}")
+                self.process_pool.shutdown()
+                self.process_pool = None
+        return self.awb_detector.find_all_awbs_batch(mails)
+
+    def rematch_cache(self):
+        """Mail cache'indeki tüm mailleri güncel pattern'larla toplu tara (DataFrame döner)"""
+        batch_size = self.main_window.config["search"]["batch_size"]
+        # Gövdeler parça parça okunur; bellekte aynı anda tek parçanın gövdeleri bulunur
+        frames = [frame for frame in (self.awb_detector.find_all_awbs_frame(mails)
+                                      for mails in self.main_window.cache.iter_mails(batch_size))
+                  if not frame.empty]
+        if not frames:
+            return self.awb_detector.find_all_awbs_frame([])
+        return pd.concat(frames, ignore_index=True)
+
+    def shutdown(self):
+        """Arka plan kaynaklarını kapat"""
+        # Oturumun aşama istatistiklerini sakla (regresyon karşılaştırması için)
+        if self.awb_detector.stats.enabled:
+            self.awb_detector.dump_stats()
+        self.awb_detector.router.save()
+        self.awb_detector.pattern_stats.save()
+        # Öğrenme kuyruğunda kalanlar işlenip kaydedilir
+        if self.awb_detector.learning_worker is not None:
+            self.awb_detector.learning_worker.stop()
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+            self.process_pool = None
+
     def update_ui(self, results):
         """UI'da sonuçları göster"""
         table = self.main_window.results_panel.results_table
         table.setRowCount(0)
+        # Veri kaynağında birebir bulunmayan AWB'ler için en yakın kayıtlar tek matris hesabıyla bulunur
+        nearest = self.awb_detector.fuzzy_matcher.reconcile([result["awb"] for result in results])
         
         for row, result in enumerate(results):
             table.insertRow(row)
             excel_data = self.main_window.excel.find_awb(result["awb"])
+            if not excel_data and nearest.get(result["awb"]):
+                excel_data = self.main_window.excel.find_awb(nearest[result["awb"]][0][0])
             
             items = [
                 excel_data.get("poz_no", ""),        # Poz No
@@ -1,13 +1,17 @@
 import datetime
 
 class MailModel:
-    def __init__(self, date, subject, body, sender, to, has_attachments):
+    def __init__(self, date, subject, body, sender, to, has_attachments, sender_email="",
+                 entry_id="", folder=""):
         self.date = date
         self.subject = subject
         self.body = body
         self.sender = sender
         self.to = to
         self.has_attachments = has_attachments
+        self.sender_email = sender_email
+        self.entry_id = entry_id  # Outlook EntryID (cache anahtarı)
+        self.folder = folder      # Outlook klasör yolu
 
     def to_dict(self):
         return {
@@ -16,7 +20,10 @@ class MailModel:
             "body": self.body,
             "sender": self.sender,
             "to": self.to,
-            "has_attachments": self.has_attachments
+            "has_attachments": self.has_attachments,
+            "sender_email": self.sender_email,
+            "entry_id": self.entry_id,
+            "folder": self.folder
         }
 
     @classmethod
@@ -27,5 +34,8 @@ class MailModel:
             body=data["body"],
             sender=data["sender"],
             to=data["to"],
-            has_attachments=data["has_attachments"]
+            has_attachments=data["has_attachments"],
+            sender_email=data.get("sender_email", ""),
+            entry_id=data.get("entry_id", ""),
+            folder=data.get("folder", "")
         )
@@ -1,5 +1,6 @@
 import sys
 import logging
+import multiprocessing
 from PyQt6.QtWidgets import QApplication, QMessageBox
 from utils.excel_helper import ExcelHelper
 from utils.mail_analyzer import MailAnalyzer
@@ -18,4 +19,5 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Paketlenmiş exe'de process havuzu için
     main()
\ No newline at end of file
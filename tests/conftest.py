@@ -0,0 +1,89 @@
+import io
+import os
+import re
+import sys
+import json
+import random
+import contextlib
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Detector pattern dosyasını ve cache yollarını proje köküne göre okur
+os.chdir(ROOT)
+
+from utils.awb_detector import AWBDetector  # noqa: E402
+from utils.pattern_bundle import get_pattern_bundles  # noqa: E402
+
+PATTERN_FILE = os.path.join(ROOT, "config", "awb_patterns.json")
+
+WORDS = ["AWB", "DHL EXPRESS AWB", "MAWB", "tel", "235", "624", "/IST", "-", " ", "\n", "hello",
+         "1Z2A28V06773006362", "25AT520000W6Q1KMK1", "772238490728", "176-4503 9094",
+         "080-37586743", "235-1234 5678", "624 87654321", "1234567890", "<td>", "</td>", "<br>"]
+
+
+def random_text(rng: random.Random, parts: int = 12) -> str:
+    """Rakam dizileri, ayraçlar ve gerçek AWB biçimleri karışık metin"""
+    pieces = []
+    for _ in range(rng.randint(0, parts)):
+        if rng.random() < 0.4:
+            pieces.append("".join(rng.choice("0123456789") for _ in range(rng.randint(1, 14))))
+        else:
+            pieces.append(rng.choice(WORDS))
+    return rng.choice([" ", "-", "", " "]).join(pieces)
+
+
+def valid_awb(rng: random.Random, prefix: str) -> str:
+    serial = rng.randint(1000000, 9999999)
+    return f"{prefix}-{serial}{serial % 7}"
+
+
+def match_key(match):
+    """Yoldan bağımsız karşılaştırılan sonuç alanları"""
+    return (match["awb"], match["airline"], match["match_text"], round(match["confidence"], 4),
+            match["location"], match["line_number"])
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+@pytest.fixture(scope="session")
+def pattern_config():
+    with open(PATTERN_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def plain_patterns(pattern_config):
+    """Motorsuz referans: airline sırasıyla her pattern'ın kendi derlenmiş regex'i"""
+    return [
+        (airline, index, re.compile(source, re.IGNORECASE))
+        for airline, data in pattern_config["patterns"].items() if data.get("enabled", True)
+        for index, source in enumerate(data.get("patterns", []))
+    ]
+
+
+@pytest.fixture(scope="session")
+def reference_detector(pattern_config, tmp_path_factory):
+    """Ön filtresiz, cache'siz, yakın kopyasız ve parçasız düz tarama yapan detector"""
+    config = json.loads(json.dumps(pattern_config))
+    config["prefilter"] = {"enabled": False}
+    config["streaming"] = {**config.get("streaming", {}), "enabled": False}
+    path = tmp_path_factory.mktemp("patterns") / "awb_patterns.json"
+    path.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    detector = AWBDetector()
+    detector.bundles = get_pattern_bundles(str(path))
+    detector.detection_cache = None
+    detector.near_duplicates = None
+    return detector
+
+
+@pytest.fixture
+def detector():
+    """Varsayılan ayarlı detector (ön filtre ve yakın kopya indeksi açık)"""
+    detector = AWBDetector()
+    detector.detection_cache = None
+    return detector
@@ -0,0 +1,76 @@
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.cache_manager import CacheManager
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def make_config(**cache):
+    return {"cache": {"path": "cache/mail_cache.json", "db_path": "cache/mail_cache.db", **cache},
+            "detection_cache": {"path": "cache/detection"}}
+
+
+def mail(i, days_ago=0, body=None):
+    return {"entry_id": f"e{i}", "date": (datetime.now() - timedelta(days=days_ago)).isoformat(),
+            "subject": f"konu {i}", "sender": "ops", "body": body if body is not None else f"gövde {i} " * 20}
+
+
+def test_legacy_json_cache_is_migrated_once(cache_dir):
+    os.makedirs("cache")
+    compressed = "compressed:" + zlib.compress("sıkıştırılmış gövde".encode("utf-8")).hex()
+    with open("cache/mail_cache.json", "w", encoding="utf-8") as f:
+        json.dump({"mails": [mail(1), mail(2, body=compressed)], "last_refresh": "x"}, f, ensure_ascii=False)
+
+    cache = CacheManager(make_config())
+    assert cache.count() == 2
+    assert cache.get_mail("e2")["body"] == "sıkıştırılmış gövde"
+    assert cache.get_mail("e1")["body"] == mail(1)["body"]
+    # Veritabanı doluyken JSON yeniden içe alınmaz
+    with cache.conn:
+        cache.conn.execute("DELETE FROM mails WHERE entry_id = 'e1'")
+    assert CacheManager(make_config()).count() == 1
+
+
+def test_old_mails_are_pruned_on_save(cache_dir):
+    cache = CacheManager(make_config(max_age_days=30))
+    cache.save_cache({"mails": [mail(i, days_ago=i * 10) for i in range(6)]})
+    assert sorted(m["entry_id"] for m in cache.list_mails()) == ["e0", "e1", "e2"]
+
+
+def test_bodies_are_loaded_lazily_in_pages(cache_dir):
+    cache = CacheManager(make_config())
+    cache.save_cache({"mails": [mail(i, days_ago=i % 3) for i in range(25)]})
+    headers = cache.list_mails()
+    assert all("body" not in m for m in headers)
+    assert cache.with_bodies(headers[:3])[0]["body"] == mail(int(headers[0]["entry_id"][1:]))["body"]
+    pages = list(cache.iter_mails(batch_size=7))
+    assert [len(page) for page in pages] == [7, 7, 7, 4]
+    ids = [m["entry_id"] for page in pages for m in page]
+    assert sorted(ids) == sorted(m["entry_id"] for m in headers)
+    assert all(m["body"] for page in pages for m in page)
+
+
+def test_cleanup_keeps_database_and_state_files(cache_dir):
+    cache = CacheManager(make_config())
+    cache.save_cache({"mails": [mail(1)]})
+    os.makedirs("cache/detection/ab")
+    os.makedirs("cache/other")
+    old = (datetime.now() - timedelta(days=30)).timestamp()
+    for path in ("cache/pattern_stats.json", "cache/detection/ab/x.json", "cache/other/stale.bin"):
+        with open(path, "w") as f:
+            f.write("{}")
+        os.utime(path, (old, old))
+    cache.cleanup_cache()
+    assert os.path.exists("cache/mail_cache.db")
+    assert os.path.exists("cache/pattern_stats.json")
+    assert os.path.exists("cache/detection/ab/x.json")
+    assert not os.path.exists("cache/other/stale.bin")
@@ -0,0 +1,19 @@
+import random
+
+from utils.check_digit import mod7_valid, mod7_valid_many
+
+
+def test_mod7_accepts_valid_and_rejects_wrong_check_digit():
+    assert mod7_valid("235-12345675")
+    assert mod7_valid("235 1234 5675")
+    assert not mod7_valid("235-12345678")
+    assert not mod7_valid("235-1234567")
+    assert not mod7_valid("")
+    assert not mod7_valid(None)
+
+
+def test_vectorized_check_matches_single():
+    rng = random.Random(9)
+    awbs = [f"{rng.randint(100, 999)}-{rng.randint(0, 10 ** rng.randint(6, 9))}" for _ in range(2000)]
+    awbs += ["", "abc", "235-12345675"]
+    assert mod7_valid_many(awbs) == [mod7_valid(awb) for awb in awbs]
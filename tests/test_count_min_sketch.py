@@ -0,0 +1,28 @@
+import random
+from collections import Counter
+
+from utils.count_min_sketch import CountMinSketch, HeavyHitters
+
+
+def test_estimate_never_undercounts_and_stays_within_bound():
+    sketch = CountMinSketch(width=512, depth=4)
+    rng = random.Random(10)
+    keys = [f"k{rng.randint(0, 3000)}" for _ in range(20000)]
+    counts = Counter(keys)
+    for key in keys:
+        sketch.add(key)
+    assert sketch.total == len(keys)
+    errors = [sketch.estimate(key) - count for key, count in counts.items()]
+    assert min(errors) >= 0
+    # Hata olasılıkla total/width ile sınırlı; birkaç katı kesin üst sınırdır
+    assert max(errors) <= 4 * sketch.total / sketch.width
+
+
+def test_heavy_hitters_keep_the_frequent_keys():
+    hitters = HeavyHitters(CountMinSketch(width=4096, depth=4), capacity=5)
+    rng = random.Random(11)
+    frequent = [f"hot{i}" for i in range(5)]
+    for _ in range(4000):
+        hitters.add(rng.choice(frequent) if rng.random() < 0.5 else f"cold{rng.randint(0, 5000)}")
+    assert {key for key, _ in hitters.top()} == set(frequent)
+    assert len(hitters.counts) == 5
@@ -0,0 +1,48 @@
+import random
+
+from conftest import random_text
+from utils.pattern_engine import PatternSetEngine, SpanSet
+
+
+def plain_scan(plain_patterns, text, labels=None, pos=0, endpos=None):
+    endpos = len(text) if endpos is None else endpos
+    return [
+        (airline, index, match.span(), match.groups())
+        for airline, index, regex in plain_patterns if labels is None or airline in labels
+        for match in regex.finditer(text, pos, endpos)
+    ]
+
+
+def engine_scan(hits):
+    return [(entry.label, entry.pattern_index, match.span(), match.groups()) for entry, match in hits]
+
+
+def test_scan_matches_plain_finditer(pattern_config, plain_patterns):
+    engine = PatternSetEngine(pattern_config["patterns"])
+    rng = random.Random(1)
+    for _ in range(2000):
+        text = random_text(rng)
+        assert engine_scan(engine.scan(text)) == plain_scan(plain_patterns, text), text
+
+
+def test_scan_respects_labels_and_bounds(pattern_config, plain_patterns):
+    engine = PatternSetEngine(pattern_config["patterns"])
+    rng = random.Random(2)
+    labels = engine.labels[::2]
+    for _ in range(500):
+        text = random_text(rng, 20)
+        pos = rng.randint(0, len(text))
+        endpos = rng.randint(pos, len(text))
+        expected = plain_scan(plain_patterns, text, set(labels), pos, endpos)
+        assert engine_scan(engine.scan(text, labels, pos, endpos)) == expected, text
+
+
+def test_span_set_merges_and_covers():
+    spans = SpanSet()
+    spans.add(10, 20)
+    spans.add(30, 40)
+    spans.add(18, 32)
+    assert spans.starts == [10] and spans.ends == [40]
+    assert spans.covers(12, 38)
+    assert not spans.covers(5, 12)
+    assert not spans.covers(35, 41)
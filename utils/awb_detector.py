@@ -1,73 +1,195 @@
 import re
-from typing import List, Dict, Tuple
+import time
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional
 import pandas as pd
 import json
-from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor
 from utils.pattern_learner import PatternLearner
+from utils.learning_worker import LearningWorker
 from utils.grok_client import GrokAIClient
 from utils.fuzzy_matcher import FuzzyMatcher
+from utils.pattern_engine import PatternSetEngine, SpanSet
+from utils.pattern_bundle import PatternBundle, get_pattern_bundles
+from utils.pattern_router import PatternRouter
+from utils.detection_cache import DetectionCache
+from utils.near_duplicate import NearDuplicateIndex
+from utils.awb_match import AWBMatch
+from utils.bulk_extractor import BulkExtractor
+from utils.confidence_scorer import ConfidenceScorer
+from utils.text_index import LineIndex
+from utils.stream_scanner import StreamScanner, normalize_fragment, iter_normalized_chunks
+from utils.detector_stats import DetectorStats
+from utils.pattern_stats import PatternStats, get_pattern_stats, HITS, ACCEPTED, CPU_NS
+
+# routed_scan'de rotanın router'dan alınacağını belirtir (None = tüm set)
+ROUTER = object()
+
+# Veri kaynağı düzeltmesinde izin verilen en büyük düzenleme mesafesi
+MAX_FUZZY_DISTANCE = 2
+
 
 class AWBDetector:
     def __init__(self, main_window=None):
         self.main_window = main_window
-        self.pattern_learner = PatternLearner()
-        self.load_patterns()
+        # Öğrenme arama yolunda yapılmaz; eşleşmeler arka plandaki worker kuyruğuna bırakılır
+        learning_config = self.main_window.config.get("learning", {}) if self.main_window else {}
+        self.pattern_learner = PatternLearner(
+            learned_file=learning_config.get("path", "cache/learned_patterns.json"),
+            capacity=learning_config.get("capacity", 200)
+        )
+        self.learning_worker = None
+        if learning_config.get("enabled", False):
+            self.learning_worker = LearningWorker(
+                self.pattern_learner,
+                flush_interval=learning_config.get("flush_interval", 300),
+                batch_size=learning_config.get("batch_size", 200),
+                max_queue=learning_config.get("max_queue", 10000)
+            )
+        # Derlenmiş pattern seti dosya değişince arka planda yenilenip atomik olarak değiştirilir
+        self.bundles = get_pattern_bundles()
         # Config'den Grok durumunu al
         self.grok_client = None
         if self.main_window and self.main_window.config.get("grok", {}).get("enabled", False):
             self.grok_client = GrokAIClient(
                 self.main_window.config.get("grok", {}).get("api_key")
             )
-        # Regex pattern'larını compile et
-        self._compile_patterns()
         # ThreadPoolExecutor oluştur
         self.executor = ThreadPoolExecutor(max_workers=4)
         self.fuzzy_matcher = FuzzyMatcher()  # Fuzzy matcher instance
+        # Aşama bazlı süre/sayaç ölçümü; debug açıksa eşleşme başına çıktı basılır
+        detector_config = self.main_window.config.get("detector", {}) if self.main_window else {}
+        self.debug = detector_config.get("debug", False)
+        self.stats = DetectorStats(enabled=detector_config.get("instrumentation", True))
+        self.stats_path = detector_config.get("stats_path", "cache/detector_stats.json")
+        # Veri kaynağı indeksiyle düzeltmede kabul edilen en fazla düzenleme mesafesi
+        self.fuzzy_distance = detector_config.get("fuzzy_distance", 1)
+        # 2'den büyük mesafede BK-tree araması veri kaynağının çoğunu gezer
+        if self.fuzzy_distance > MAX_FUZZY_DISTANCE:
+            print(f"fuzzy_distance {self.fuzzy_distance} desteklenmiyor, {MAX_FUZZY_DISTANCE} kullanılıyor")
+            self.fuzzy_distance = MAX_FUZZY_DISTANCE
+        # Pattern başına tarama/aday/kabul/süre istatistiği (PatternManager'da gösterilir)
+        if detector_config.get("pattern_stats", True):
+            self.pattern_stats = get_pattern_stats(
+                detector_config.get("pattern_stats_path", "cache/pattern_stats.json")
+            )
+        else:
+            self.pattern_stats = PatternStats(None, enabled=False)
+        # İçerik + pattern versiyonu anahtarlı sonuç cache'i
+        cache_config = self.main_window.config.get("detection_cache", {}) if self.main_window else {}
+        self.detection_cache = None
+        if cache_config.get("enabled", True):
+            self.detection_cache = DetectionCache(
+                max_entries=cache_config.get("max_entries", 2000),
+                disk_path=cache_config.get("path") if cache_config.get("disk", False) else None,
+                max_disk_entries=cache_config.get("max_disk_entries", 20000),
+                max_age_days=cache_config.get("max_age_days", 30)
+            )
+        # Forward/reply kopyalarında yalnızca yeni satırları tarayan yakın kopya indeksi
+        near_config = self.main_window.config.get("near_duplicate", {}) if self.main_window else {}
+        self.near_duplicates = None
+        if near_config.get("enabled", True):
+            self.near_duplicates = NearDuplicateIndex(
+                max_distance=near_config.get("max_distance", 6),
+                min_overlap=near_config.get("min_overlap", 0.5),
+                min_lines=near_config.get("min_lines", 30),
+                max_entries=near_config.get("max_entries", 5000)
+            )
 
     def load_patterns(self):
-       
-        try:
-            with open("config/awb_patterns.json", "r", encoding='utf-8') as f:
-                self.patterns = json.load(f)
-                #print("Patterns başarıyla yüklendi")
-        except UnicodeDecodeError as e:
-            print("UTF-8 encoding hatası, json_fixer.py çalıştırılmalı")
-            self.patterns = {"patterns": {}}
-        except Exception as e:
-            print(f"Pattern yükleme hatası: {str(e)}")
-            self.patterns = {"patterns": {}}
-
-    def _compile_patterns(self):
-        """Regex pattern'larını önceden compile et"""
-        self.compiled_patterns = {}
-        for airline, data in self.patterns.get("patterns", {}).items():
-            if data.get("enabled", True):
-                self.compiled_patterns[airline] = [
-                    re.compile(pattern, re.IGNORECASE) 
-                    for pattern in data.get("patterns", [])
-                ]
-
-    @lru_cache(maxsize=1000)
+        """Pattern dosyasını hemen yeniden yükle ve derle"""
+        self.bundles.reload(wait=True)
+
+    @property
+    def bundle(self) -> PatternBundle:
+        """Güncel derlenmiş pattern seti; bir tarama boyunca aynı bundle kullanılır"""
+        return self.bundles.current()
+
+    @property
+    def router(self) -> PatternRouter:
+        """Gönderen/konuya göre taranacak airline alt kümesi (güncel bundle'ın router'ı)"""
+        return self.bundle.router
+
+    # Eski kodla uyumluluk: alanlar güncel bundle'dan okunur
+    @property
+    def patterns(self) -> Dict:
+        return self.bundle.config
+
+    @property
+    def compiled_patterns(self) -> Dict[str, List[re.Pattern]]:
+        return self.bundle.compiled_patterns
+
+    @property
+    def pattern_engine(self) -> PatternSetEngine:
+        return self.bundle.pattern_engine
+
+    @property
+    def confidence_scorer(self) -> ConfidenceScorer:
+        return self.bundle.confidence_scorer
+
+    @property
+    def check_digit_rules(self) -> Dict:
+        return self.bundle.check_digit_rules
+
+    @property
+    def streaming_config(self) -> Dict:
+        return self.bundle.streaming_config
+
+    @property
+    def stream_overlap(self) -> int:
+        return self.bundle.stream_overlap
+
+    @property
+    def pattern_hash(self) -> str:
+        return self.bundle.config_hash
+
     def _clean_text(self, text: str) -> str:
-        """Metni temizle ve normalize et (cache'li)"""
+        """Metni temizle ve normalize et"""
         if not isinstance(text, str):
             return ""
-        text = re.sub(r'<[^>]+>', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
-        text = text.replace('–', '-').replace('—', '-')
-        return text.strip()
+        # Satır sonları korunur (satır numarası için), diğer boşluklar tek boşluğa iner
+        return normalize_fragment(text).strip()
 
-    def find_all_awbs(self, mail_data: dict) -> List[Dict]:
+    def find_all_awbs(self, mail_data: dict) -> List[AWBMatch]:
         try:
-            if isinstance(mail_data, str):
-                mail_data = {
-                    "subject": "",
-                    "body": mail_data,
-                    "attachments": []
-                }
-
+            started = self.stats.start()
+            mail_data = self._as_mail_dict(mail_data)
+            # Tarama boyunca aynı pattern seti (dosya bu sırada değişse bile)
+            bundle = self.bundle
+            
+            # Aynı içerik aynı pattern'larla daha önce tarandıysa sonucu kullan
+            unique_results = self.get_cached_results(mail_data, bundle)
+            if unique_results is None:
+                unique_results = self._scan_mail(mail_data, bundle)
+                # Yeni taranan mailin eşleşmeleri öğrenme kuyruğuna (beklemeden)
+                self.submit_learning(unique_results)
           
+            # Grok AI ile analiz
+            if not unique_results and self.grok_client:
+                grok_started = self.stats.start()
+                grok_results = self.analyze_with_grok(mail_data)
+                self.stats.record("grok", grok_started,
+                                  hits=int(bool(grok_results.get("has_potential_awb"))),
+                                  rejects=int(not grok_results.get("has_potential_awb")))
+                if grok_results.get("has_potential_awb"):
+                    for awb in grok_results["details"]["awb_numbers"]:
+                        unique_results.append(AWBMatch(
+                            awb, "UNKNOWN", awb, grok_results["confidence"], "AI Analiz", 0
+                        ))
+            
+            self.stats.record("mail", started, hits=len(unique_results))
+            return unique_results
+
+        except Exception as e:
+            print(f"AWB arama hatası: {str(e)}")
+            import traceback
+            print(traceback.format_exc())
+            return []
+
+    def _scan_mail(self, mail_data: dict, bundle: PatternBundle = None) -> List[AWBMatch]:
+        """Konu ve gövdeyi tara, sonucu cache'e yaz"""
+        bundle = bundle or self.bundle
+
+        def scan(labels):
             results = []
             
             # Paralel arama yap
@@ -80,47 +202,198 @@ class AWBDetector:
            
             for location, text in texts_to_search:
                 future = self.executor.submit(
-                    self._search_text, 
+                    self._search_location, 
                     text,
-                    location
+                    location,
+                    None,
+                    labels,
+                    bundle
                 )
                 futures.append(future)
 
             # Sonuçları topla
             for future in futures:
                 results.extend(future.result())
+            return results
 
-            # Tekrar edenleri kaldır
-            unique_results = self._remove_duplicates(results)
-            
-            # Pattern öğrenme daha sonra eklenecek
-            #if unique_results:
-                #self.pattern_learner.learn_from_text(
-                   # text=mail_data.get("body", ""),
-                    #context={"results": unique_results}
-                #)
-          
-            # Grok AI ile analiz
-            if not unique_results and self.grok_client:
-                grok_results = self.analyze_with_grok(mail_data)
-                if grok_results.get("has_potential_awb"):
-                    for awb in grok_results["details"]["awb_numbers"]:
-                        unique_results.append({
-                            "awb": awb,
-                            "airline": "UNKNOWN",
-                            "match_text": awb,
-                            "confidence": grok_results["confidence"],
-                            "location": "AI Analiz",
-                            "line_number": 0
-                        })
-            
-            return unique_results
+        # Tekrar edenleri kaldır
+        unique_results = self._remove_duplicates(self.routed_scan(mail_data, scan, bundle))
+        self.store_results(mail_data, unique_results, bundle)
+        return unique_results
 
-        except Exception as e:
-            print(f"AWB arama hatası: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return []
+    def routed_scan(self, mail_data: dict, scan, bundle: PatternBundle = None,
+                    labels=ROUTER) -> List[AWBMatch]:
+        """scan(labels) ile maili yönlendirilmiş airline alt kümesinde tara.
+
+        Rota yoksa (ya da öğrenilmiş rota doğrulama için örneklendiyse) tüm
+        set taranır. Rotalı taramada hiç sonuç çıkmazsa (fallback açıksa)
+        kalan airline'lar da taranır. Tüm set ile yapılan taramalar gönderen
+        istatistiğine eklenir. labels verilirse rota kararı çağırandadır
+        (ör. process worker'ları ana process'in kararını kullanır).
+        """
+        bundle = bundle or self.bundle
+        router = bundle.router
+        if labels is ROUTER:
+            labels = router.plan(mail_data)
+        if labels is None:
+            results = scan(None)
+            router.observe(mail_data, results)
+            return results
+
+        self.stats.count("route", hits=1)
+        results = scan(labels)
+        if results:
+            # Kural sırası öncelik sırasıdır: aynı AWB için öndeki airline kalır
+            order = {airline: n for n, airline in enumerate(labels)}
+            results.sort(key=lambda result: order.get(result.airline, len(order)))
+            return results
+        if not router.fallback:
+            return results
+
+        self.stats.count("route", rejects=1)
+        rest = [airline for airline in bundle.pattern_engine.labels if airline not in labels]
+        results = scan(rest)
+        router.observe(mail_data, results)
+        return results
+
+    def _cache_key(self, mail_data: dict, bundle: PatternBundle = None) -> str:
+        # Rotalı taramanın sonucu tüm set taramasından farklı olabilir
+        bundle = bundle or self.bundle
+        labels = bundle.router.route(mail_data)
+        pattern_hash = bundle.config_hash
+        # Düzeltme indeksi kurulunca (ya da değişince) önceki sonuçlar yeniden hesaplanır
+        index_version = self.fuzzy_matcher.index_version
+        if index_version is not None:
+            pattern_hash = f"{pattern_hash}-f{index_version}"
+        config_hash = pattern_hash if labels is None else f"{pattern_hash}-{'|'.join(labels)}"
+        return DetectionCache.make_key(
+            mail_data.get("subject", ""), mail_data.get("body", ""), config_hash
+        )
+
+    def get_cached_results(self, mail_data: dict, bundle: PatternBundle = None):
+        """Cache'teki sonucu AWBMatch listesi olarak dön; yoksa None"""
+        if self.detection_cache is None:
+            return None
+        cached = self.detection_cache.get(self._cache_key(mail_data, bundle))
+        if cached is None:
+            self.stats.count("cache", rejects=1)
+            return None
+        self.stats.count("cache", hits=1)
+        return [AWBMatch.from_tuple(item) for item in cached]
+
+    def store_results(self, mail_data: dict, results: List[AWBMatch], bundle: PatternBundle = None):
+        if self.detection_cache is not None:
+            self.detection_cache.put(
+                self._cache_key(mail_data, bundle), [result.to_tuple() for result in results]
+            )
+
+    def submit_learning(self, results: List[AWBMatch]):
+        """Eşleşmeleri arka plan öğrenme kuyruğuna bırak (öğrenme kapalıysa hiçbir şey yapmaz)"""
+        if self.learning_worker is not None and results:
+            self.learning_worker.submit(results)
+
+    def find_all_awbs_batch(self, mails: Iterable, routes: Dict = None) -> Dict[str, List[AWBMatch]]:
+        """Birden çok maili tek seferde tara, sonuçları mail id'sine göre dön.
+
+        Mail başına future, print ve tekrar eden doğrulama/skor hesabı
+        yapılmaz; aynı metin, AWB ve eşleşmeler batch içinde bir kez işlenir.
+        Daha önce taranmış mailler tespit cache'inden gelir. Grok fallback'i
+        toplu taramada çalıştırılmaz. routes (mail id -> airline listesi ya da
+        None) verilirse rota router'a sorulmaz.
+        """
+        results = {}
+        memo = {}
+        bundle = self.bundle
+        for index, mail in enumerate(mails):
+            mail_data = self._as_mail_dict(mail)
+            mail_id = self.mail_id(mail_data)
+            if mail_id in results:
+                mail_id = f"{mail_id}#{index}"
+            try:
+                cached = self.get_cached_results(mail_data, bundle)
+                if cached is not None:
+                    results[mail_id] = cached
+                    continue
+                def scan(labels):
+                    found = self._search_location(mail_data.get("subject", ""), "subject", memo, labels, bundle)
+                    found.extend(self._search_location(mail_data.get("body", ""), "body", memo, labels, bundle))
+                    return found
+                labels = routes.get(mail_id, ROUTER) if routes is not None else ROUTER
+                results[mail_id] = self._remove_duplicates(self.routed_scan(mail_data, scan, bundle, labels))
+                self.store_results(mail_data, results[mail_id], bundle)
+                self.submit_learning(results[mail_id])
+            except Exception as e:
+                print(f"Toplu AWB arama hatası ({mail_id}): {str(e)}")
+                results[mail_id] = []
+        return results
+
+    def extract_entities(self, mail_data: dict, bundle: PatternBundle = None) -> Dict[str, List]:
+        """AWB'leri ve kayıtlı referans tiplerini (fatura, beyanname, referans) birlikte çıkar.
+
+        AWB'ler detector'ın kendi akışıyla (cache dahil), diğer tipler
+        bundle'ın EntityExtractor'ı ile konu ve gövdede tek geçişte bulunur.
+        Sonuç {"awb": [AWBMatch], "invoice": [EntityMatch], ...} biçimindedir.
+        """
+        mail_data = self._as_mail_dict(mail_data)
+        bundle = bundle or self.bundle
+        awbs = self.get_cached_results(mail_data, bundle)
+        if awbs is None:
+            awbs = self._scan_mail(mail_data, bundle)
+
+        extractor = bundle.entity_extractor
+        entities = {"awb": awbs, **{name: [] for name in extractor.names}}
+        for location in ("subject", "body"):
+            for match in extractor.extract(mail_data.get(location, ""), location):
+                if all(match.value != found.value for found in entities[match.entity]):
+                    entities[match.entity].append(match)
+        return entities
+
+    def extract_references(self, mail_data: dict) -> Dict[str, List[str]]:
+        """GrokAIClient.extract_references ile aynı biçimde, API çağrısı yapmadan referanslar"""
+        entities = self.extract_entities(mail_data)
+        return {
+            name: [match.awb if name == "awb" else match.value for match in matches]
+            for name, matches in entities.items()
+        }
+
+    def find_all_awbs_frame(self, mails: Iterable) -> pd.DataFrame:
+        """Çok sayıda maili (ör. tüm mail cache'i) pandas ile toplu tara.
+
+        Sonuç mail_id, location, airline, awb, match_text, start, end,
+        confidence kolonlu bir DataFrame'dir. Tespit cache'i ve rota
+        kullanılmaz; tüm pattern seti her maile uygulanır.
+        """
+        return BulkExtractor(self.bundle, self.fuzzy_matcher).extract(mails)
+
+    @staticmethod
+    def _as_mail_dict(mail) -> dict:
+        """Metin, MailModel veya dict girdisini mail dict'ine çevir"""
+        if isinstance(mail, str):
+            return {
+                "subject": "",
+                "body": mail,
+                "attachments": []
+            }
+        if hasattr(mail, "to_dict"):
+            return mail.to_dict()
+        return mail
+
+    @staticmethod
+    def mail_id(mail_data: dict) -> str:
+        """Mail için batch sonuç anahtarı (Outlook EntryID yoksa tarih + konu)"""
+        entry_id = mail_data.get("entry_id") or mail_data.get("id")
+        if entry_id:
+            return str(entry_id)
+        return f"{mail_data.get('date', '')}_{mail_data.get('subject', '')}"
+
+    def _memoized(self, memo, name: str, key, func, *args):
+        """Toplu taramada aynı girdiler için sonucu tekrar hesaplama"""
+        if memo is None:
+            return func(*args)
+        table = memo.setdefault(name, {})
+        if key not in table:
+            table[key] = func(*args)
+        return table[key]
 
     def analyze_with_grok(self, mail_data: dict) -> dict:
         """Mail içeriğini x.ai API ile analiz et"""
@@ -145,8 +418,11 @@ Konu: {mail_data.get('subject', '')}
             # Önce analiz yap
             analysis = self.grok_client.analyze_text(message)
             
-            # Referansları çıkar
+            # Referansları çıkar; fatura/beyanname/referans yerelde de bulunur, AI ile birleşir
             refs = self.grok_client.extract_references(message)
+            local_refs = self.extract_references(mail_data)
+            for name in ("invoice", "declaration", "reference"):
+                refs[name] = list(dict.fromkeys(local_refs.get(name, []) + (refs.get(name) or [])))
             
             print(message)
             # Sonuçları birleştir
@@ -179,61 +455,293 @@ Konu: {mail_data.get('subject', '')}
             print(f"x.ai analiz hatası: {str(e)}")
             return {"analyzed": False, "error": str(e)}
 
-    def _search_text(self, text: str, location: str = "Mail İçeriği") -> List[Dict]:
+    def _search_text(self, text: str, location: str = "Mail İçeriği", memo: dict = None,
+                     labels: List[str] = None, bundle: PatternBundle = None) -> List[AWBMatch]:
         """Metindeki AWB numaralarını tespit eder"""
         try:
             if not text:
                 return []
+            bundle = bundle or self.bundle
+
+            # Toplu taramada aynı metin (ör. forward edilmiş kopya) bir kez taranır
+            if memo is not None:
+                memo_key = (text, location, tuple(labels) if labels is not None else None)
+                cached = memo.setdefault("texts", {}).get(memo_key)
+                if cached is not None:
+                    return list(cached)
+            # Eşleşme başına çıktı yalnızca debug modunda (toplu modda hiç) basılır
+            verbose = self.debug and memo is None
                 
+            started = self.stats.start()
             clean_text = self._clean_text(text)
-            results = []
+            self.stats.record("clean", started)
             
-            for line_number, line in enumerate(clean_text.split('\n'), start=1):
-                for airline, patterns in self.compiled_patterns.items():
-                    min_confidence = self.patterns["patterns"][airline].get("min_confidence", 0.7)
-                    for pattern in patterns:
-                        for match in pattern.finditer(line):
-                            try:
-                                print(match)
-                                normalized_awb = self._normalize_awb(match, airline)
-                               
-                                if self._validate_awb(normalized_awb, airline):
-                                    # Önce fuzzy matching yap
-                                    matched_text, fuzzy_confidence = self.fuzzy_matcher.find_best_match(
-                                        normalized_awb, 
-                                        [match.group()],
-                                        min_confidence
-                                    )
-
-                                    # İlk confidence hesapla
-                                    base_confidence = self._calculate_confidence(match.group(), line)
-                                    print(f"Geçerli : {normalized_awb} (Base Confidence: {base_confidence})")
-                                    
-                                    # Eğer fuzzy match yoksa veya düşük güvenilirlikse base confidence kullan
-                                    final_confidence = fuzzy_confidence if matched_text else base_confidence
-                                    final_match_text = matched_text if matched_text else match.group()
-
-                                    if final_confidence >= min_confidence:
-                                        results.append({
-                                            "awb": normalized_awb, 
-                                            "airline": airline,
-                                            "match_text": final_match_text,
-                                            "confidence": final_confidence,
-                                            "context": self._get_enhanced_context(clean_text, line, match.start(), line_number),
-                                            "line_number": line_number,
-                                            "location": location
-                                        })
-                                else:
-                                    print(f"❌ Geçersiz AWB: {normalized_awb} (Format Uyuşmuyor)")
-                                    
-                            except Exception as e:
-                                print(f"Eşleşme işleme hatası: {str(e)}")
-                                continue
+            # Metin bir kez normalize edilir; satır numarası ve context offset dizisinden okunur
+            line_index = LineIndex(clean_text)
+            indicator_index = None  # Gösterge konumları, ilk eşleşmede bir kez çıkarılır
+            accepted = {}  # Airline başına kabul edilmiş aralıklar
+            # Gövde daha önce taranmış bir mailin forward/reply kopyasıysa yalnızca yeni satırlar taranır
+            plan = None
+            if self.near_duplicates is not None and location == "body":
+                started = self.stats.start()
+                plan = self.near_duplicates.plan(
+                    clean_text, (bundle.config_hash, tuple(labels) if labels is not None else None)
+                )
+                if plan is not None:
+                    self.stats.record("near_dup", started, hits=int(plan.ranges is not None),
+                                      rejects=int(plan.ranges is None))
+            # Tek geçişte tüm airline pattern'larını tara
+            started = self.stats.start()
+            if plan is None or plan.ranges is None:
+                hits = bundle.pattern_engine.scan_candidates(clean_text, labels)
+            else:
+                hits = []
+                for range_start, range_end in plan.ranges:
+                    hits.extend(bundle.pattern_engine.scan(clean_text, labels, range_start, range_end))
+                hits = [hit for hit in hits if plan.is_new(hit[1].start(), hit[1].end())]
+                # Bilinen satırlardaki adaylar aynı konumda yeniden eşleştirilir; doğrulama ve
+                # güven skoru tam taramadaki gibi bu metne göre yapılır
+                entries = bundle.pattern_engine.entries
+                for entry_index, start, end in plan.reused:
+                    entry = entries[entry_index]
+                    match = entry.regex.match(clean_text, start)
+                    if match is not None and match.end() == end:
+                        hits.append((entry, match))
+                hits.sort(key=lambda hit: (hit[0].index, hit[1].start()))
+            self.stats.record("scan", started, hits=len(hits))
+            results = []
+            track = self.pattern_stats.enabled
+            usage = {}  # Entry indeksi -> [0, aday, kabul, süre ns]
+            for entry, match in hits:
+                if track:
+                    row = usage.get(entry.index)
+                    if row is None:
+                        row = usage[entry.index] = [0, 0, 0, 0]
+                    row[HITS] += 1
+                # Aynı airline'ın başka bir pattern'ı bu aralığı zaten kabul ettiyse atla
+                spans = accepted.get(entry.label)
+                if spans is not None and spans.covers(match.start(), match.end()):
+                    self.stats.count("dedup", rejects=1)
+                    continue
+                if indicator_index is None:
+                    indicator_index = bundle.confidence_scorer.index(clean_text)
+                evaluated_started = time.perf_counter_ns() if track else 0
+                evaluated = self._evaluate_match(entry, match, clean_text, indicator_index, memo, verbose, bundle)
+                if track:
+                    row[CPU_NS] += time.perf_counter_ns() - evaluated_started
+                    row[ACCEPTED] += evaluated is not None
+                if evaluated is not None:
+                    normalized_awb, final_match_text, final_confidence = evaluated
+                    accepted.setdefault(entry.label, SpanSet()).add(match.start(), match.end())
+                    # Context ilk okunduğunda üretilir
+                    results.append(AWBMatch(
+                        normalized_awb, entry.label, final_match_text, final_confidence,
+                        location, line_index.line_number(match.start()),
+                        match.start(), match.end(), source=line_index
+                    ))
+            self.pattern_stats.record(bundle.pattern_engine.entries, labels, usage)
+            if plan is not None:
+                self.near_duplicates.add(plan, [(entry.index, match.start(), match.end()) for entry, match in hits])
+            if memo is not None:
+                memo["texts"][memo_key] = list(results)
             return results
         except Exception as e:
             print(f"Metin arama hatası: {str(e)}")
             return []
 
+    def _evaluate_match(self, entry, match: re.Match, text: str, indicator_index,
+                        memo: dict = None, verbose: bool = True,
+                        bundle: PatternBundle = None) -> Optional[Tuple[str, str, float]]:
+        """Eşleşmeyi normalize et, doğrula ve skorla; kabul edilirse (awb, metin, güven)"""
+        bundle = bundle or self.bundle
+        airline = entry.label
+        min_confidence = bundle.config["patterns"][airline].get("min_confidence", 0.7)
+        try:
+            if verbose:
+                print(match)
+            normalized_awb = self._normalize_awb(match, airline)
+           
+            stats = self.stats
+            # Kontrol hanesi tutmayan aday pahalı adımlara girmeden elenir
+            check_digit = bundle.check_digit_rules.get(airline)
+            if check_digit is not None:
+                started = stats.start()
+                checked = check_digit(normalized_awb)
+                stats.record("check_digit", started, hits=int(checked), rejects=int(not checked))
+                if not checked:
+                    # OCR hatalı numara veri kaynağındaki tek yakın kayda düzeltilebilir
+                    corrected = self._corrected(normalized_awb, airline, memo, bundle)
+                    if corrected is None:
+                        if verbose:
+                            print(f"❌ Geçersiz AWB: {normalized_awb} (Kontrol Hanesi Uyuşmuyor)")
+                        return None
+                    normalized_awb = corrected
+
+            started = stats.start()
+            valid = self._memoized(memo, "valid", (normalized_awb, airline),
+                                   self._validate_awb, normalized_awb, airline, bundle)
+            stats.record("validate", started, hits=int(valid), rejects=int(not valid))
+            if not valid:
+                corrected = self._corrected(normalized_awb, airline, memo, bundle)
+                if corrected is not None:
+                    normalized_awb, valid = corrected, True
+            if valid:
+                # Önce fuzzy matching yap
+                started = stats.start()
+                matched_text, fuzzy_confidence = self._memoized(
+                    memo, "fuzzy", (normalized_awb, match.group(), min_confidence),
+                    self.fuzzy_matcher.find_best_match,
+                    normalized_awb, 
+                    [match.group()],
+                    min_confidence
+                )
+                stats.record("fuzzy", started, hits=int(bool(matched_text)), rejects=int(not matched_text))
+
+                # İlk confidence hesapla
+                started = stats.start()
+                base_confidence = self._calculate_confidence(
+                    match.group(), text, match.start(), match.end(), indicator_index, bundle
+                )
+                stats.record("confidence", started)
+                if verbose:
+                    print(f"Geçerli : {normalized_awb} (Base Confidence: {base_confidence})")
+                
+                # Eğer fuzzy match yoksa veya düşük güvenilirlikse base confidence kullan
+                final_confidence = fuzzy_confidence if matched_text else base_confidence
+                final_match_text = matched_text if matched_text else match.group()
+
+                if final_confidence >= min_confidence:
+                    stats.count("accept", hits=1)
+                    return normalized_awb, final_match_text, final_confidence
+                stats.count("accept", rejects=1)
+            elif verbose:
+                print(f"❌ Geçersiz AWB: {normalized_awb} (Format Uyuşmuyor)")
+                
+        except Exception as e:
+            print(f"Eşleşme işleme hatası: {str(e)}")
+        return None
+
+    def build_fuzzy_index(self, data_source) -> int:
+        """Veri kaynağının AWB'lerinden düzeltme indeksini kur (uzun sürebilir, arka planda çağrılır)"""
+        try:
+            started = self.stats.start()
+            count = self.fuzzy_matcher.build_index(data_source.get_awb_keys())
+            self.stats.record("fuzzy_index", started, hits=count)
+            print(f"Fuzzy AWB indeksi hazır: {count} kayıt")
+            return count
+        except Exception as e:
+            print(f"Fuzzy indeks hatası: {str(e)}")
+            return 0
+
+    def _corrected(self, awb: str, airline: str, memo: dict = None,
+                   bundle: PatternBundle = None) -> Optional[str]:
+        """Doğrulanamayan AWB'nin veri kaynağındaki düzeltilmiş hali; indeks yoksa None"""
+        if self.fuzzy_matcher.index is None or self.fuzzy_distance <= 0:
+            return None
+        corrected = self._memoized(memo, "correct", (awb, airline), self._correct_awb, awb, airline, bundle)
+        self.stats.count("correct", hits=int(corrected is not None), rejects=int(corrected is None))
+        return corrected
+
+    def _correct_awb(self, awb: str, airline: str, bundle: PatternBundle = None) -> Optional[str]:
+        """En yakın tek kayıt aynı uzunluktaysa awb'nin ayraçlarıyla yaz; kontrol hanesi ve formatı tutmalı.
+
+        fuzzy_distance 1 ise yalnızca tek hanesi farklı kayıt (OCR'da tek
+        rakamın yanlış okunması) anahtar sözlüğünde aranır, BK-tree'ye inilmez;
+        2 ise en yakın kayıt BK-tree'de aranır.
+        """
+        bundle = bundle or self.bundle
+        if self.fuzzy_distance <= 1:
+            key = self.fuzzy_matcher.substitute(awb)
+        else:
+            key = self.fuzzy_matcher.resolve(awb, self.fuzzy_distance)
+        if key is None:
+            return None
+        if sum(c.isalnum() for c in awb) != len(key):
+            return None
+        chars = iter(key)
+        corrected = ''.join(next(chars) if c.isalnum() else c for c in awb)
+        check_digit = bundle.check_digit_rules.get(airline)
+        if check_digit is not None and not check_digit(corrected):
+            return None
+        return corrected if self._validate_awb(corrected, airline, bundle) else None
+
+    def _search_location(self, text: str, location: str, memo: dict = None,
+                         labels: List[str] = None, bundle: PatternBundle = None) -> List[AWBMatch]:
+        """Metni boyutuna göre tek seferde ya da parça parça tara"""
+        bundle = bundle or self.bundle
+        config = bundle.streaming_config
+        if config.get("enabled", True) and isinstance(text, str) and len(text) >= config.get("threshold", 1048576):
+            return list(self.iter_awbs_stream(text, location, labels=labels, bundle=bundle))
+        return self._search_text(text, location, memo, labels, bundle)
+
+    def iter_awbs_stream(self, text: str, location: str = "body", chunk_size: int = None,
+                         labels: List[str] = None, bundle: PatternBundle = None) -> Iterator[AWBMatch]:
+        """Büyük metni sabit boyutlu parçalarla normalize edip tara, eşleşmeleri bulundukça üret.
+
+        Bellek kullanımı metin boyutundan bağımsız olarak parça boyutu +
+        overlap ile sınırlıdır. Güven skoru göstergeleri tüm metin yerine
+        eşleşmenin bulunduğu tampon içinde aranır.
+        """
+        if not text:
+            return
+        bundle = bundle or self.bundle
+        chunk_size = max(chunk_size or bundle.streaming_config.get("chunk_size", 262144), 4 * bundle.stream_overlap)
+        yield from self.iter_stream_chunks(iter_normalized_chunks(text, chunk_size), location, labels, bundle)
+
+    def iter_stream_chunks(self, chunks: Iterable[str], location: str = "body",
+                           labels: List[str] = None, bundle: PatternBundle = None) -> Iterator[AWBMatch]:
+        """Normalize edilmiş metin parçalarını tara (process worker'ları da bunu kullanır)"""
+        bundle = bundle or self.bundle
+        scanner = StreamScanner(bundle.pattern_engine, bundle.stream_overlap, labels=labels)
+        started = self.stats.start()
+        found = 0
+        last_buffer = None
+        indicator_index = None
+        accepted = {}  # Airline başına kabul edilmiş aralıklar (tüm metne göre)
+        track = self.pattern_stats.enabled
+        usage = {}
+        for entry, match, buffer, base_offset, context in scanner.scan(chunks):
+            if track:
+                row = usage.get(entry.index)
+                if row is None:
+                    row = usage[entry.index] = [0, 0, 0, 0]
+                row[HITS] += 1
+            start, end = base_offset + match.start(), base_offset + match.end()
+            spans = accepted.get(entry.label)
+            if spans is not None and spans.covers(start, end):
+                self.stats.count("dedup", rejects=1)
+                continue
+            if buffer is not last_buffer:
+                last_buffer = buffer
+                indicator_index = bundle.confidence_scorer.index(buffer)
+            evaluated_started = time.perf_counter_ns() if track else 0
+            evaluated = self._evaluate_match(entry, match, buffer, indicator_index,
+                                             verbose=self.debug, bundle=bundle)
+            if track:
+                row[CPU_NS] += time.perf_counter_ns() - evaluated_started
+                row[ACCEPTED] += evaluated is not None
+            if evaluated is not None:
+                normalized_awb, final_match_text, final_confidence = evaluated
+                accepted.setdefault(entry.label, SpanSet()).add(start, end)
+                found += 1
+                yield AWBMatch(
+                    normalized_awb, entry.label, final_match_text, final_confidence,
+                    location, context['line_number'], start, end, context=context
+                )
+        self.pattern_stats.record(bundle.pattern_engine.entries, labels, usage)
+        self.stats.record("stream", started, hits=found)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Aşama bazlı süre ve sayaç özeti"""
+        return self.stats.snapshot()
+
+    def dump_stats(self, path: str = None) -> bool:
+        """Aşama özetini JSON olarak yaz (varsayılan: settings.json detector.stats_path)"""
+        return self.stats.dump(path or self.stats_path)
+
+    def reset_stats(self):
+        self.stats.reset()
+
     def _normalize_awb(self, match: re.Match, airline: str) -> str:
         raw_awb = match.group()
         clean_awb = re.sub(r'[\s-]+', '', raw_awb)
@@ -252,12 +760,12 @@ Konu: {mail_data.get('subject', '')}
                 return f"{prefix}-{number}"
         return clean_awb
 
-    def _validate_awb(self, awb: str, airline: str) -> bool:
+    def _validate_awb(self, awb: str, airline: str, bundle: PatternBundle = None) -> bool:
         if not awb:
             return False
 
         clean_awb = re.sub(r'[-\s/]', '', awb)
-        pattern_data = self.patterns["patterns"].get(airline)
+        pattern_data = (bundle or self.bundle).config["patterns"].get(airline)
         
         if not pattern_data:
             return False
@@ -270,61 +778,21 @@ Konu: {mail_data.get('subject', '')}
         
         if prefix:
             if isinstance(prefix, list):
-                if not any(clean_awb.startswith(p) for p in prefix):
+                if not clean_awb.startswith(tuple(prefix)):
                     return False
             else:
                 if not clean_awb.startswith(prefix):
                     return False
         return True
 
-    def _get_enhanced_context(self, text: str, line: str, pos: int, line_no: int, window: int = 50) -> Dict:
-        """Gelişmiş context çıkarma"""
-        try:
-            # Öncesi ve sonrası için karakter bazlı kesme
-            text_before = text[max(0, pos-window):pos]
-            text_after = text[pos:min(len(text), pos+window)]
-            
-            return {
-                'before': text_before,
-                'current': line,
-                'after': text_after,
-                'line_number': line_no,
-                'position': pos
-            }
-            
-        except Exception as e:
-            print(f"Context çıkarma hatası: {str(e)}")
-            return {
-                'before': '',
-                'current': line,
-                'after': '',
-                'line_number': line_no,
-                'position': 0
-            }
-
-    def _calculate_confidence(self, text: str, line: str) -> float:
+    def _calculate_confidence(self, text: str, line: str, start: int = 0, end: int = 0,
+                              indicator_index=None, bundle: PatternBundle = None) -> float:
         """AWB tespiti güven skoru hesapla"""
-        confidence = 1.0
-        
         try:
-            # Context bazlı güven artırıcılar
-            context_indicators = {
-                'awb': 0.3,
-                'tracking': 0.2,
-                'shipment': 0.2,
-                'waybill': 0.2,
-                'air cargo': 0.2
-            }
-            
-            for indicator, score in context_indicators.items():
-                if re.search(indicator, line, re.IGNORECASE):
-                    confidence += score
-                    
-            # Format bazlı güven artırıcılar
-            if re.match(r'^\d{3}-\d{8}$', text):  # Mükemmel format
-                confidence += 0.3
-                
-            return min(confidence, 1.0)  # Max 1.0
+            scorer = (bundle or self.bundle).confidence_scorer
+            if indicator_index is None:
+                indicator_index = scorer.index(line)
+            return scorer.score(text, indicator_index, start, end)
             
         except Exception as e:
             print(f"Güven skoru hesaplama hatası: {str(e)}")
@@ -336,14 +804,14 @@ Konu: {mail_data.get('subject', '')}
         end = min(len(text), pos + window)
         return text[start:end].strip()
 
-    def _remove_duplicates(self, results: List[Dict]) -> List[Dict]:
+    def _remove_duplicates(self, results: List[AWBMatch]) -> List[AWBMatch]:
         """Tekrar eden AWB numaralarını temizle"""
         seen = set()
         unique_results = []
         
         for result in results:
-            if result["awb"] not in seen:
-                seen.add(result["awb"])
+            if result.awb not in seen:
+                seen.add(result.awb)
                 unique_results.append(result)
                 
         return unique_results
@@ -0,0 +1,99 @@
+from typing import Dict, Optional
+
+# Eski dict sonuçlarının anahtarları; AWBMatch bunlarla dict gibi okunabilir
+MATCH_FIELDS = ("awb", "airline", "match_text", "confidence", "context", "line_number", "location")
+CONTEXT_WINDOW = 50  # Context için eşleşme öncesi/sonrası karakter sayısı
+
+
+class AWBMatch:
+    """Tek bir AWB eşleşmesi (değiştirilemez, slots tabanlı).
+
+    Context dict'i eşleşme anında kurulmaz; metnin LineIndex'ine referans ve
+    konum saklanır, context ilk okunduğunda üretilir. Mevcut kod için result["awb"] ve
+    result.get("match_text") erişimleri çalışmaya devam eder, gerekirse
+    to_dict() ile düz dict alınır.
+    """
+    __slots__ = ("awb", "airline", "match_text", "confidence", "location",
+                 "line_number", "start", "end", "_source", "_context")
+
+    def __init__(self, awb: str, airline: str, match_text: str, confidence: float,
+                 location: str, line_number: int, start: int = 0, end: int = 0,
+                 source=None, context: Optional[Dict] = None):
+        setter = object.__setattr__
+        setter(self, "awb", awb)
+        setter(self, "airline", airline)
+        setter(self, "match_text", match_text)
+        setter(self, "confidence", confidence)
+        setter(self, "location", location)
+        setter(self, "line_number", line_number)
+        setter(self, "start", start)
+        setter(self, "end", end)
+        setter(self, "_source", source)  # utils.text_index.LineIndex
+        setter(self, "_context", context)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AWBMatch değiştirilemez")
+
+    @property
+    def context(self) -> Dict:
+        """Eşleşme çevresi (ilk erişimde hesaplanır)"""
+        if self._context is None:
+            if self._source is not None:
+                context = self._source.context(self.start, CONTEXT_WINDOW)
+            else:
+                context = {'before': '', 'current': '', 'after': '',
+                           'line_number': self.line_number, 'position': self.start}
+            object.__setattr__(self, "_context", context)
+        return self._context
+
+    # Dict benzeri erişim (eski sonuç dict'lerini bekleyen kod için)
+    def __getitem__(self, key):
+        if key in MATCH_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in MATCH_FIELDS:
+            return getattr(self, key)
+        return default
+
+    def __contains__(self, key):
+        return key in MATCH_FIELDS
+
+    def keys(self):
+        return MATCH_FIELDS
+
+    def to_dict(self) -> Dict:
+        """Eski formatta sonuç dict'i"""
+        return {field: getattr(self, field) for field in MATCH_FIELDS}
+
+    def to_tuple(self) -> tuple:
+        """Cache ve process'ler arası taşınacak kompakt tuple"""
+        context = self.context
+        return (self.awb, self.airline, self.match_text, self.confidence, self.location,
+                self.line_number, context.get("position", 0),
+                context.get("before", ""), context.get("after", ""))
+
+    @classmethod
+    def from_tuple(cls, compact: tuple) -> "AWBMatch":
+        """to_tuple çıktısından eşleşmeyi geri kur"""
+        awb, airline, match_text, confidence, location, line_number, position, before, after = compact
+        return cls(awb, airline, match_text, confidence, location, line_number,
+                   start=position, end=position + len(match_text or ""), context={
+                       'before': before,
+                       'current': before + after,  # Satırın tamamı yerine eşleşme çevresi taşınır
+                       'after': after,
+                       'line_number': line_number,
+                       'position': position
+                   })
+
+    def __eq__(self, other):
+        if not isinstance(other, AWBMatch):
+            return NotImplemented
+        return self.to_tuple() == other.to_tuple()
+
+    def __hash__(self):
+        return hash(self.to_tuple())
+
+    def __repr__(self):
+        return f"AWBMatch({self.awb!r}, {self.airline!r}, confidence={self.confidence})"
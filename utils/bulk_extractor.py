@@ -0,0 +1,189 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from utils.stream_scanner import normalize_fragment
+from utils.fuzzy_matcher import FuzzyMatcher
+from utils.check_digit import CHECK_DIGIT_BULK_RULES
+
+# Sonuç DataFrame'inin kolonları; start/end temizlenmiş metindeki aralıktır
+COLUMNS = ["mail_id", "location", "airline", "awb", "match_text", "start", "end", "confidence"]
+LOCATIONS = ("subject", "body")
+
+# Pattern'ı saran grup; tüm eşleşme metni bu kolondan okunur
+MATCH_GROUP = "_awb"
+
+
+class BulkExtractor:
+    """Tüm cache'i tek seferde yeniden taramak için pandas tabanlı toplu tespit.
+
+    Konu ve gövdeler tek bir Series'e alınır, her pattern Series.str.extractall
+    ile tüm metinlerde çalıştırılır. Normalize, kontrol hanesi ve format
+    doğrulaması kolon işlemleriyle yapılır; yalnızca doğrulamadan geçen
+    adaylar için fuzzy/güven skoru satır bazında hesaplanır. Sonuç
+    AWBDetector.find_all_awbs_batch ile aynı AWB'leri içerir (rota ve
+    Grok fallback'i hariç).
+    """
+
+    def __init__(self, bundle, fuzzy_matcher: Optional[FuzzyMatcher] = None):
+        self.bundle = bundle
+        self.fuzzy_matcher = fuzzy_matcher or FuzzyMatcher()
+
+    def texts_frame(self, mails: Iterable) -> pd.DataFrame:
+        """(mail_id, location, text) satırları; id'ler find_all_awbs_batch ile aynı verilir"""
+        from utils.awb_detector import AWBDetector
+
+        rows = []
+        seen_ids = set()
+        for index, mail in enumerate(mails):
+            mail_data = AWBDetector._as_mail_dict(mail)
+            mail_id = AWBDetector.mail_id(mail_data)
+            if mail_id in seen_ids:
+                mail_id = f"{mail_id}#{index}"
+            seen_ids.add(mail_id)
+            for location in LOCATIONS:
+                text = mail_data.get(location, "")
+                if isinstance(text, str) and text:
+                    rows.append((mail_id, location, text))
+
+        frame = pd.DataFrame(rows, columns=["mail_id", "location", "text"])
+        # AWBDetector._clean_text ile aynı normalize
+        frame["text"] = frame["text"].map(normalize_fragment).str.strip()
+        return frame
+
+    def _candidates(self, texts: pd.Series, entry) -> pd.DataFrame:
+        """Tek pattern'ın tüm metinlerdeki adayları: row, match_text, group1, grouped, start, end"""
+        if entry.combinable:
+            found = texts.str.extractall(f"(?P<{MATCH_GROUP}>{entry.source})", flags=self.bundle.pattern_engine.flags)
+            if found.empty:
+                return pd.DataFrame()
+            inner = [column for column in found.columns if column != MATCH_GROUP]
+            # İsimsiz grup kolonları 0'dan sıralanır; sarma grubu 0 olduğundan pattern'ın 1. grubu 1'dir
+            candidates = pd.DataFrame({
+                "row": found.index.get_level_values(0),
+                "match_text": found[MATCH_GROUP].to_numpy(),
+                "group1": found[1].to_numpy() if 1 in found.columns else None,
+                "grouped": found[inner].notna().any(axis=1).to_numpy() if inner else False
+            })
+            candidates["start"], candidates["end"] = self._spans(texts, candidates, entry.regex)
+            return candidates
+
+        # Geri referanslı / global flag'li pattern'lar sarılamaz, satır satır taranır
+        rows = []
+        for row, text in texts.items():
+            for match in entry.regex.finditer(text):
+                rows.append((row, match.group(), match.group(1) if match.re.groups else None,
+                             bool(match.lastindex), match.start(), match.end()))
+        return pd.DataFrame(rows, columns=["row", "match_text", "group1", "grouped", "start", "end"])
+
+    @staticmethod
+    def _spans(texts: pd.Series, candidates: pd.DataFrame, regex):
+        """extractall konum vermez; eşleşmeler sırayla metinde aranıp regex ile doğrulanır"""
+        starts = []
+        ends = []
+        for row, rows in candidates.groupby("row", sort=False)["match_text"]:
+            text = texts[row]
+            matched = list(rows)
+            positions = []
+            pos = 0
+            for match_text in matched:
+                start = text.find(match_text, pos) if match_text else -1
+                found = regex.match(text, start) if start >= 0 else None
+                if found is None or found.end() != start + len(match_text):
+                    positions = None
+                    break
+                positions.append((start, found.end()))
+                pos = found.end()
+            if positions is None:
+                # Aynı metin daha önce eşleşmeyen bir yerde de geçiyorsa finditer'a dön
+                positions = [(match.start(), match.end()) for match in regex.finditer(text)][:len(matched)]
+            starts.extend(start for start, _ in positions)
+            ends.extend(end for _, end in positions)
+        return starts, ends
+
+    def _normalize(self, candidates: pd.DataFrame) -> pd.Series:
+        """AWBDetector._normalize_awb'nin kolon işlemi karşılığı"""
+        clean = candidates["match_text"].str.replace(r'[\s-]+', '', regex=True)
+        airline = candidates["airline"]
+        generic = ~airline.isin(["DHL", "OZEL"]) & (clean.str.len() >= 11)
+        awb = clean.where(~generic, clean.str[:3] + "-" + clean.str[3:11])
+        dhl = (airline == "DHL") & candidates["grouped"].astype(bool)
+        return awb.where(~dhl, candidates["group1"])
+
+    def _valid(self, candidates: pd.DataFrame) -> pd.Series:
+        """Kontrol hanesi + uzunluk/prefix doğrulaması (AWBDetector._validate_awb)"""
+        patterns = self.bundle.config.get("patterns", {})
+        awb = candidates["awb"].fillna("")
+        clean = awb.str.replace(r'[-\s/]', '', regex=True)
+        valid = pd.Series(False, index=candidates.index)
+        for airline, rows in candidates.groupby("airline").groups.items():
+            data = patterns.get(airline)
+            if not data:
+                continue
+            ok = (awb[rows] != "") & (clean[rows].str.len() == data["length"])
+            prefix = data.get("prefix")
+            if prefix:
+                ok &= clean[rows].str.startswith(tuple(prefix) if isinstance(prefix, list) else prefix)
+            rule = CHECK_DIGIT_BULK_RULES.get(data.get("check_digit"))
+            if rule is not None:
+                ok &= pd.Series(rule(awb[rows]), index=rows, dtype=bool)
+            valid[rows] = ok
+        return valid
+
+    def extract(self, mails: Iterable) -> pd.DataFrame:
+        """Maillerdeki AWB'leri (mail_id, location, airline, awb, match_text, start, end, confidence) olarak dön"""
+        texts_frame = self.texts_frame(mails)
+        if texts_frame.empty:
+            return pd.DataFrame(columns=COLUMNS)
+        texts = texts_frame["text"]
+
+        parts = []
+        for entry in self.bundle.pattern_engine.entries:
+            candidates = self._candidates(texts, entry)
+            if candidates.empty:
+                continue
+            candidates["airline"] = entry.label
+            candidates["entry"] = entry.index
+            parts.append(candidates)
+        if not parts:
+            return pd.DataFrame(columns=COLUMNS)
+
+        candidates = pd.concat(parts, ignore_index=True)
+        candidates["awb"] = self._normalize(candidates)
+        candidates = candidates[self._valid(candidates)].copy()
+        if candidates.empty:
+            return pd.DataFrame(columns=COLUMNS)
+
+        candidates["confidence"] = self._confidence(texts, candidates)
+        patterns = self.bundle.config.get("patterns", {})
+        min_confidence = candidates["airline"].map(
+            lambda airline: patterns.get(airline, {}).get("min_confidence", 0.7)
+        )
+        accepted = candidates[candidates["confidence"] >= min_confidence].copy()
+
+        # Detector sırası: mail, konu/gövde, pattern sırası, konum; mail başına ilk AWB kalır
+        accepted["mail_id"] = texts_frame["mail_id"].to_numpy()[accepted["row"].to_numpy()]
+        accepted["location"] = texts_frame["location"].to_numpy()[accepted["row"].to_numpy()]
+        accepted = accepted.sort_values(["row", "entry", "start"], kind="stable")
+        accepted = accepted.drop_duplicates(["mail_id", "awb"])
+        return accepted[COLUMNS].reset_index(drop=True)
+
+    def _confidence(self, texts: pd.Series, candidates: pd.DataFrame) -> List[float]:
+        """Fuzzy ve gösterge skoru (AWBDetector._evaluate_match ile aynı kural); satır bazında"""
+        patterns = self.bundle.config.get("patterns", {})
+        scorer = self.bundle.confidence_scorer
+        indexes: Dict[int, object] = {}
+        scores = []
+        for row, airline, awb, match_text, start, end in candidates[
+                ["row", "airline", "awb", "match_text", "start", "end"]].itertuples(index=False):
+            min_confidence = patterns.get(airline, {}).get("min_confidence", 0.7)
+            matched, fuzzy_confidence = self.fuzzy_matcher.find_best_match(awb, [match_text], min_confidence)
+            if matched:
+                scores.append(fuzzy_confidence)
+                continue
+            index = indexes.get(row)
+            if index is None:
+                index = indexes[row] = scorer.index(texts[row])
+            scores.append(scorer.score(match_text, index, start, end))
+        return scores
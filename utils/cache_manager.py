@@ -1,105 +1,425 @@
 import json
 import zlib
 import os
-import shutil
+import sqlite3
+import threading
 from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from utils.near_duplicate import SimHashIndex, fingerprint
+
+# Başlık kolonları; gövdeler ayrı tabloda (liste ve filtreleme gövdeye dokunmaz)
+MAIL_COLUMNS = ("entry_id", "date", "subject", "sender", "sender_email", "recipients",
+                "folder", "has_attachments", "fingerprint")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mails (
+    entry_id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    subject TEXT,
+    sender TEXT,
+    sender_email TEXT,
+    recipients TEXT,
+    folder TEXT,
+    has_attachments INTEGER,
+    fingerprint TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_mails_date ON mails(date);
+CREATE INDEX IF NOT EXISTS idx_mails_sender ON mails(sender);
+CREATE INDEX IF NOT EXISTS idx_mails_folder_date ON mails(folder, date);
+CREATE TABLE IF NOT EXISTS bodies (
+    entry_id TEXT PRIMARY KEY REFERENCES mails(entry_id) ON DELETE CASCADE,
+    body BLOB
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
 
 class CacheManager:
+    """Outlook EntryID anahtarlı SQLite mail cache'i.
+
+    Başlıklar (tarih, gönderen, klasör indeksli) ve gövdeler ayrı
+    tablolardadır; gövde zlib ile sıkıştırılmış blob olarak tutulur. Yazma
+    yalnızca upsert'tür, dosya baştan yazılmaz. Liste ve tarih filtresi
+    list_mails ile gövde okunmadan, tek mail get_mail ile anahtardan gelir.
+    Eski cache/mail_cache.json varsa veritabanı boşken bir kez içe alınır.
+    """
+
     def __init__(self,  config=None):
-        
+
         self.config = config  # Config parametresi eklendi
-   
-        self.cache_file = self.config.get("cache", {}).get("path")
+        cache_config = self.config.get("cache", {})
+        self.cache_file = cache_config.get("path")  # Eski JSON cache (taşıma için)
+        self.db_path = cache_config.get("db_path", "cache/mail_cache.db")
+        self.compress = cache_config.get("compress", True)
+        # Bu kadar günden eski mailler (gövdeleriyle) kayıt sırasında silinir; 0 ise silinmez
+        self.max_age_days = cache_config.get("max_age_days", 90)
         self.max_size_mb = 100
         self.cache_dir = "cache"
         self.cleanup_threshold = 0.9  # 90% doluluk temizlik başlatır
-        
+
         # Cache dizinini oluştur
         os.makedirs(self.cache_dir, exist_ok=True)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
 
-    def load_cache(self):
-        """Cache'den veri yükle"""
+        # Arama thread'leri de okuduğundan tek bağlantı kilitle paylaşılır
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA foreign_keys=ON")
+            self.conn.executescript(SCHEMA)
+        self._migrate_json()
+        self.prune_expired()
+
+    @staticmethod
+    def mail_key(mail: Dict) -> str:
+        """Mail anahtarı: Outlook EntryID, yoksa tarih + konu"""
+        entry_id = mail.get("entry_id") or mail.get("id")
+        if entry_id:
+            return str(entry_id)
+        return f"{mail.get('date', '')}_{mail.get('subject', '')}"
+
+    def _encode_body(self, body: str) -> bytes:
+        data = (body or "").encode('utf-8')
+        return zlib.compress(data) if self.compress else data
+
+    @staticmethod
+    def _decode_body(blob) -> str:
+        if blob is None:
+            return ""
+        data = bytes(blob)
         try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    
-                    # Sıkıştırılmış içerikleri aç
-                    for mail in cache_data.get("mails", []):
-                        if isinstance(mail.get("body"), str) and mail["body"].startswith("compressed:"):
-                            compressed = bytes.fromhex(mail["body"][11:])  # "compressed:" prefixi çıkar
-                            mail["body"] = zlib.decompress(compressed).decode('utf-8')
-                    
-                    return cache_data
-            return {"mails": [], "last_refresh": None}
+            return zlib.decompress(data).decode('utf-8')
+        except zlib.error:
+            return data.decode('utf-8')
+
+    def upsert_mails(self, mails: Iterable[Dict]) -> int:
+        """Mailleri ekle ya da güncelle (tek transaction); yazılan mail sayısı"""
+        now = datetime.now().isoformat()
+        headers = []
+        bodies = []
+        for mail in mails:
+            if hasattr(mail, "to_dict"):
+                mail = mail.to_dict()
+            body = mail.get("body")
+            if isinstance(body, str) and body.startswith("compressed:"):
+                body = zlib.decompress(bytes.fromhex(body[11:])).decode('utf-8')
+            key = self.mail_key(mail)
+            date = mail.get("date", "")
+            if isinstance(date, datetime):
+                date = date.isoformat()
+            headers.append((
+                key, date, mail.get("subject", ""), mail.get("sender", ""),
+                mail.get("sender_email", ""), mail.get("to", ""), mail.get("folder", ""),
+                int(bool(mail.get("has_attachments", False))),
+                f"{fingerprint(body):016x}" if isinstance(body, str) else None,
+                now
+            ))
+            if isinstance(body, str):
+                bodies.append((key, self._encode_body(body)))
+        if not headers:
+            return 0
+        with self._lock, self.conn:
+            self.conn.executemany(
+                """INSERT INTO mails (entry_id, date, subject, sender, sender_email, recipients,
+                                      folder, has_attachments, fingerprint, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(entry_id) DO UPDATE SET
+                       date=excluded.date, subject=excluded.subject, sender=excluded.sender,
+                       sender_email=excluded.sender_email, recipients=excluded.recipients,
+                       folder=excluded.folder, has_attachments=excluded.has_attachments,
+                       fingerprint=COALESCE(excluded.fingerprint, mails.fingerprint),
+                       updated_at=excluded.updated_at""",
+                headers
+            )
+            self.conn.executemany(
+                "INSERT INTO bodies (entry_id, body) VALUES (?, ?) "
+                "ON CONFLICT(entry_id) DO UPDATE SET body=excluded.body",
+                bodies
+            )
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('last_refresh', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (now,)
+            )
+        return len(headers)
+
+    def _row_to_mail(self, row, with_body: bool = False) -> Dict:
+        mail = {
+            "entry_id": row["entry_id"],
+            "date": row["date"],
+            "subject": row["subject"] or "",
+            "sender": row["sender"] or "",
+            "sender_email": row["sender_email"] or "",
+            "to": row["recipients"] or "",
+            "folder": row["folder"] or "",
+            "has_attachments": bool(row["has_attachments"]),
+            "fingerprint": row["fingerprint"]
+        }
+        if with_body:
+            mail["body"] = self._decode_body(row["body"])
+        return mail
+
+    def list_mails(self, since: datetime = None, until: datetime = None, folder: str = None,
+                   sender: str = None, limit: int = None, with_body: bool = False) -> List[Dict]:
+        """İndeksli sorguyla mail listesi (yeniden eskiye); gövde yalnızca with_body ile okunur"""
+        conditions = []
+        params = []
+        if since is not None:
+            conditions.append("m.date >= ?")
+            params.append(since.isoformat() if isinstance(since, datetime) else since)
+        if until is not None:
+            conditions.append("m.date < ?")
+            params.append(until.isoformat() if isinstance(until, datetime) else until)
+        if folder is not None:
+            conditions.append("m.folder = ?")
+            params.append(folder)
+        if sender is not None:
+            conditions.append("m.sender = ?")
+            params.append(sender)
+        columns = ", ".join(f"m.{column}" for column in MAIL_COLUMNS)
+        query = f"SELECT {columns}{', b.body' if with_body else ''} FROM mails m"
+        if with_body:
+            query += " LEFT JOIN bodies b ON b.entry_id = m.entry_id"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY m.date DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        try:
+            with self._lock:
+                rows = self.conn.execute(query, params).fetchall()
+            return [self._row_to_mail(row, with_body) for row in rows]
+        except Exception as e:
+            print(f"Cache okuma hatası: {str(e)}")
+            return []
+
+    def get_mail(self, entry_id: str) -> Optional[Dict]:
+        """Tek maili gövdesiyle getir"""
+        columns = ", ".join(f"m.{column}" for column in MAIL_COLUMNS)
+        try:
+            with self._lock:
+                row = self.conn.execute(
+                    f"SELECT {columns}, b.body FROM mails m "
+                    "LEFT JOIN bodies b ON b.entry_id = m.entry_id WHERE m.entry_id = ?",
+                    (entry_id,)
+                ).fetchone()
+            return self._row_to_mail(row, with_body=True) if row is not None else None
+        except Exception as e:
+            print(f"Cache okuma hatası: {str(e)}")
+            return None
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM mails").fetchone()[0]
+
+    def last_refresh(self) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_refresh'").fetchone()
+        return row[0] if row is not None else None
+
+    def iter_mails(self, batch_size: int = 200, since: datetime = None,
+                   with_body: bool = True) -> Iterator[List[Dict]]:
+        """Mailleri batch_size'lık gruplar halinde (yeniden eskiye) üret.
+
+        Her grup ayrı bir sorguyla okunur; bellekte aynı anda yalnızca bir
+        grubun gövdeleri bulunur.
+        """
+        columns = ", ".join(f"m.{column}" for column in MAIL_COLUMNS)
+        query = f"SELECT {columns}{', b.body' if with_body else ''} FROM mails m"
+        if with_body:
+            query += " LEFT JOIN bodies b ON b.entry_id = m.entry_id"
+        last = None
+        while True:
+            conditions = []
+            params = []
+            if since is not None:
+                conditions.append("m.date >= ?")
+                params.append(since.isoformat() if isinstance(since, datetime) else since)
+            if last is not None:
+                # (tarih, anahtar) sırasında kalınan yerden devam (OFFSET'siz sayfalama)
+                conditions.append("(m.date < ? OR (m.date = ? AND m.entry_id < ?))")
+                params.extend((last[0], last[0], last[1]))
+            page = query
+            if conditions:
+                page += " WHERE " + " AND ".join(conditions)
+            page += " ORDER BY m.date DESC, m.entry_id DESC LIMIT ?"
+            params.append(int(batch_size))
+            try:
+                with self._lock:
+                    rows = self.conn.execute(page, params).fetchall()
+            except Exception as e:
+                print(f"Cache okuma hatası: {str(e)}")
+                return
+            if not rows:
+                return
+            yield [self._row_to_mail(row, with_body) for row in rows]
+            last = (rows[-1]["date"], rows[-1]["entry_id"])
+
+    def get_bodies(self, entry_ids: Iterable[str]) -> Dict[str, str]:
+        """Verilen maillerin gövdeleri, anahtar -> gövde"""
+        entry_ids = list(entry_ids)
+        bodies = {}
+        try:
+            # SQLite parametre sınırı için parça parça sorgulanır
+            for start in range(0, len(entry_ids), 500):
+                part = entry_ids[start:start + 500]
+                with self._lock:
+                    rows = self.conn.execute(
+                        f"SELECT entry_id, body FROM bodies WHERE entry_id IN ({', '.join('?' * len(part))})",
+                        part
+                    ).fetchall()
+                for row in rows:
+                    bodies[row["entry_id"]] = self._decode_body(row["body"])
+        except Exception as e:
+            print(f"Cache okuma hatası: {str(e)}")
+        return bodies
+
+    def with_bodies(self, mails: List[Dict]) -> List[Dict]:
+        """Gövdesiz mail başlıklarına gövdelerini ekle (list_mails sonucu için)"""
+        bodies = self.get_bodies(mail["entry_id"] for mail in mails if "body" not in mail)
+        return [mail if "body" in mail else {**mail, "body": bodies.get(mail["entry_id"], "")}
+                for mail in mails]
+
+    def load_cache(self, limit: int = None):
+        """Cache'den veri yükle (gövdeler dahil; eski {"mails", "last_refresh"} biçimi).
+
+        Tüm gövdeleri belleğe alır; toplu tarama için iter_mails / with_bodies kullanılır.
+        """
+        try:
+            return {"mails": self.list_mails(limit=limit, with_body=True), "last_refresh": self.last_refresh()}
         except Exception as e:
             print(f"Cache okuma hatası: {str(e)}")
             return {"mails": [], "last_refresh": None}
-            
-    def save_cache(self, data, config):
-        """Cache'e veri kaydet"""
+
+    def save_cache(self, data, config=None):
+        """Cache'e veri kaydet (yalnızca verilen mailler upsert edilir)"""
         try:
             # Cache boyut kontrolü
             self.check_cache_size()
-            
-            # Mail sayısı sınırlaması
-            max_mails = config.get("cache", {}).get("max_mails", 1000)
-            if len(data["mails"]) > max_mails:
-                data["mails"] = data["mails"][:max_mails]
-            
-            # İçerikleri sıkıştır
-            for mail in data["mails"]:
-                if isinstance(mail.get("body"), str):
-                    compressed = zlib.compress(mail["body"].encode())
-                    mail["body"] = f"compressed:{compressed.hex()}"
-            
-            data["last_refresh"] = datetime.now().isoformat()
-            
-            # Geçici dosyaya yaz
-            temp_file = f"{self.cache_file}.tmp"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-                
-            # Asıl dosyayı güvenli şekilde değiştir    
-            shutil.move(temp_file, self.cache_file)
-            
+            self.upsert_mails(data.get("mails", []))
+            self.prune_expired()
             return True
         except Exception as e:
             print(f"Cache kaydetme hatası: {str(e)}")
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
             return False
-            
+
+    def prune(self, older_than: datetime) -> int:
+        """Belirli tarihten eski mailleri (gövdeleriyle) sil"""
+        try:
+            with self._lock, self.conn:
+                cursor = self.conn.execute(
+                    "DELETE FROM mails WHERE date < ?",
+                    (older_than.isoformat() if isinstance(older_than, datetime) else older_than,)
+                )
+            return cursor.rowcount
+        except Exception as e:
+            print(f"Cache temizleme hatası: {str(e)}")
+            return 0
+
+    def prune_expired(self) -> int:
+        """max_age_days'den eski mailleri sil"""
+        if not self.max_age_days:
+            return 0
+        return self.prune(datetime.now() - timedelta(days=self.max_age_days))
+
+    def _database_files(self) -> set:
+        return {os.path.abspath(self.db_path + suffix) for suffix in ("", "-wal", "-shm")}
+
+    def _is_protected(self, path: str) -> bool:
+        """Cache temizliğinin silmeyeceği dosya mı.
+
+        cache/ kökünde veritabanı ve öğrenilmiş durum dosyaları durur
+        (pattern_stats.json, sender_routes.json, learned_patterns.json,
+        detector_stats.json); tespit cache'i dizinini kendi sınırlar.
+        """
+        path = os.path.abspath(path)
+        if path in self._database_files():
+            return True
+        if os.path.dirname(path) == os.path.abspath(self.cache_dir):
+            return True
+        detection_dir = self.config.get("detection_cache", {}).get("path")
+        if detection_dir:
+            detection_dir = os.path.abspath(detection_dir)
+            return os.path.commonpath([path, detection_dir]) == detection_dir
+        return False
+
+    def _migrate_json(self):
+        """Eski JSON cache'ini veritabanı boşsa bir kez içe al"""
+        if not self.cache_file or not os.path.exists(self.cache_file) or self.count():
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            count = self.upsert_mails(data.get("mails", []))
+            if count:
+                print(f"JSON mail cache'i SQLite'a taşındı: {count} mail")
+        except Exception as e:
+            print(f"Cache taşıma hatası: {str(e)}")
+
     def check_cache_size(self):
-        """Cache boyutunu kontrol et ve gerekirse temizle"""
+        """Cache boyutunu kontrol et ve gerekirse temizle.
+
+        cleanup_cache'in silmediği dosyalar sayılmaz: mail veritabanı
+        max_age_days ile (prune), tespit cache'i kendi sınırıyla küçülür.
+        """
         try:
             total_size = 0
             for root, dirs, files in os.walk(self.cache_dir):
-                total_size += sum(os.path.getsize(os.path.join(root, name)) 
-                                for name in files)
-                                
+                total_size += sum(os.path.getsize(os.path.join(root, name))
+                                for name in files
+                                if not self._is_protected(os.path.join(root, name)))
+
             # MB'a çevir
             total_size_mb = total_size / (1024 * 1024)
-            
+
             # Eşik değeri aşıldıysa temizlik yap
             if total_size_mb > (self.max_size_mb * self.cleanup_threshold):
                 self.cleanup_cache()
-                
+
         except Exception as e:
             print(f"Cache boyut kontrolü hatası: {str(e)}")
-            
+
     def cleanup_cache(self):
         """Eski cache dosyalarını temizle"""
         try:
             # 7 günden eski dosyaları sil
             cutoff = datetime.now() - timedelta(days=7)
-            
-            for file in os.listdir(self.cache_dir):
-                file_path = os.path.join(self.cache_dir, file)
-                if os.path.isfile(file_path):
+            # Veritabanı, durum dosyaları ve tespit cache'i silinmez (bkz. _is_protected)
+            for root, dirs, files in os.walk(self.cache_dir):
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    if self._is_protected(file_path):
+                        continue
                     mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
                     if mtime < cutoff:
                         os.remove(file_path)
-                        
+
         except Exception as e:
             print(f"Cache temizleme hatası: {str(e)}")
+
+    def near_duplicate_groups(self, mails: List[dict], max_distance: int = None) -> List[List[int]]:
+        """Gövde parmak izleri birbirine yakın (forward/reply zinciri) maillerin indeks grupları"""
+        if max_distance is None:
+            max_distance = self.config.get("near_duplicate", {}).get("max_distance", 6)
+        index = SimHashIndex(max_distance)
+        groups = {}
+        for position, mail in enumerate(mails):
+            value = mail.get("fingerprint")
+            value = int(value, 16) if value else fingerprint(mail.get("body", ""))
+            if not value:
+                continue
+            found = index.query(value)
+            owner = found[0][1] if found else position
+            groups.setdefault(owner, []).append(position)
+            if not found:
+                index.add(position, value)
+        return [members for members in groups.values() if len(members) > 1]
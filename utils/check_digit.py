@@ -0,0 +1,44 @@
+import re
+from typing import Iterable, List
+
+import numpy as np
+
+# IATA AWB: 3 hane airline prefix + 7 hane seri + 1 kontrol hanesi (seri mod 7)
+AWB_DIGITS = 11
+_NON_DIGIT = re.compile(r'\D')
+_POWERS = 10 ** np.arange(6, -1, -1, dtype=np.int64)
+
+
+def mod7_valid(awb: str) -> bool:
+    """Tek AWB için IATA mod-7 kontrol hanesi doğrulaması ("235-12345675" gibi)"""
+    digits = _NON_DIGIT.sub('', awb or '')
+    if len(digits) != AWB_DIGITS:
+        return False
+    return int(digits[3:10]) % 7 == ord(digits[10]) - 48
+
+
+def mod7_valid_many(awbs: Iterable[str]) -> List[bool]:
+    """Çok sayıda AWB'yi tek numpy işlemiyle doğrula (toplu mod / DataFrame için)"""
+    cleaned = [_NON_DIGIT.sub('', awb or '') for awb in awbs]
+    shaped = [i for i, digits in enumerate(cleaned) if len(digits) == AWB_DIGITS]
+    result = [False] * len(cleaned)
+    if not shaped:
+        return result
+
+    raw = "".join(cleaned[i] for i in shaped).encode('ascii')
+    digits = np.frombuffer(raw, dtype=np.uint8).reshape(-1, AWB_DIGITS).astype(np.int64) - 48
+    valid = (digits[:, 3:10] @ _POWERS) % 7 == digits[:, 10]
+    for i, ok in zip(shaped, valid.tolist()):
+        result[i] = ok
+    return result
+
+
+# awb_patterns.json'daki "check_digit" değerleri
+CHECK_DIGIT_RULES = {
+    "mod7": mod7_valid
+}
+
+# Toplu (BulkExtractor) doğrulamada kullanılan vektörel karşılıkları
+CHECK_DIGIT_BULK_RULES = {
+    "mod7": mod7_valid_many
+}
@@ -0,0 +1,102 @@
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+# awb_patterns.json içinde "confidence" bloğu yoksa kullanılan varsayılanlar
+DEFAULT_CONFIDENCE_CONFIG = {
+    "base": 1.0,
+    "max": 1.0,
+    "window": 0,  # 0: gösterge metnin herhangi bir yerindeyse tam puan
+    "indicators": {
+        "awb": 0.3,
+        "tracking": 0.2,
+        "shipment": 0.2,
+        "waybill": 0.2,
+        "air cargo": 0.2
+    },
+    "format_bonus": {
+        "pattern": "^\\d{3}-\\d{8}$",
+        "score": 0.3
+    }
+}
+
+
+class IndicatorIndex:
+    """Bir metindeki gösterge konumları (her gösterge için sıralı offset listesi)"""
+    __slots__ = ("positions",)
+
+    def __init__(self, positions: List[List[int]]):
+        self.positions = positions
+
+
+class ConfidenceScorer:
+    """Göstergeye yakınlık bazlı, tek geçişli güven skoru hesaplayıcı.
+
+    Tüm göstergeler tek bir regex'te birleştirilir; metin bir kez taranıp her
+    göstergenin konumları çıkarılır (IndicatorIndex). Her eşleşme için en
+    yakın gösterge bisect ile bulunur, böylece çok sayıda aday içeren
+    maillerde skor hesabı metni tekrar tekrar taramaz.
+
+    "window" 0 ise gösterge metnin herhangi bir yerinde geçtiğinde ağırlığın
+    tamamı eklenir (eski davranış). "window" > 0 ise yalnızca eşleşmeye bu
+    kadar karakter yakın göstergeler sayılır ve ağırlık mesafeyle azalır.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = {**DEFAULT_CONFIDENCE_CONFIG, **(config or {})}
+        self.base = float(config.get("base", 1.0))
+        self.max = float(config.get("max", 1.0))
+        self.window = int(config.get("window", 0) or 0)
+
+        self.weights = []
+        sources = []
+        for indicator, weight in config.get("indicators", {}).items():
+            try:
+                re.compile(indicator)
+            except re.error as e:
+                print(f"Geçersiz güven göstergesi atlandı: {indicator} - {str(e)}")
+                continue
+            sources.append(f"(?P<_i{len(self.weights)}>{indicator})")
+            self.weights.append(float(weight))
+
+        # Lookahead ile sıfır genişlikli eşleşme: iç içe geçen göstergeler de bulunur
+        self.indicator_regex = re.compile(f"(?=(?:{'|'.join(sources)}))", re.IGNORECASE) if sources else None
+
+        format_bonus = config.get("format_bonus") or {}
+        self.format_regex = re.compile(format_bonus["pattern"]) if format_bonus.get("pattern") else None
+        self.format_score = float(format_bonus.get("score", 0.0))
+
+    def index(self, text: str) -> IndicatorIndex:
+        """Metni bir kez tarayıp gösterge konumlarını çıkar"""
+        positions = [[] for _ in self.weights]
+        if self.indicator_regex is not None and text:
+            for match in self.indicator_regex.finditer(text):
+                positions[int(match.lastgroup[2:])].append(match.start())
+        return IndicatorIndex(positions)
+
+    def score(self, match_text: str, index: IndicatorIndex, start: int = 0, end: int = 0) -> float:
+        """Eşleşmenin güven skoru (start/end eşleşmenin metindeki konumu)"""
+        confidence = self.base
+        window = self.window
+
+        for weight, positions in zip(self.weights, index.positions):
+            if not positions:
+                continue
+            if window <= 0:
+                confidence += weight
+                continue
+            # Eşleşmeye en yakın gösterge konumu
+            i = bisect_left(positions, start)
+            distance = None
+            if i < len(positions):
+                distance = max(0, positions[i] - end)
+            if i > 0:
+                before = start - positions[i - 1]
+                distance = before if distance is None else min(distance, before)
+            if distance is not None and distance <= window:
+                confidence += weight * (1.0 - distance / (window + 1))
+
+        if self.format_regex is not None and self.format_regex.match(match_text):
+            confidence += self.format_score
+
+        return min(confidence, self.max)
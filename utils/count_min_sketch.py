@@ -0,0 +1,91 @@
+import zlib
+import heapq
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class CountMinSketch:
+    """Sabit boyutlu yaklaşık sayaç (count-min sketch).
+
+    depth satırın her birinde anahtar ayrı tohumlu crc32 ile bir hücreye
+    düşer; tahmin satırlardaki en küçük değerdir. Tahmin gerçek sayıdan
+    küçük olmaz, en fazla toplam/width kadar fazla olabilir. Bellek anahtar
+    sayısından bağımsız olarak width * depth * 4 bayttır.
+    """
+
+    def __init__(self, width: int = 65536, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self._rows = np.arange(depth)
+        self.total = 0
+
+    def _cells(self, key: str) -> np.ndarray:
+        data = key.encode('utf-8')
+        return np.fromiter((zlib.crc32(data, seed * 0x9E3779B1 & 0xFFFFFFFF) % self.width
+                            for seed in range(self.depth)), dtype=np.int64, count=self.depth)
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Sayacı artır, güncel tahmini dön"""
+        cells = self._cells(key)
+        values = self.table[self._rows, cells]
+        # Conservative update: yalnızca en küçük hücreler artırılır, fazla sayım azalır
+        target = values.min() + count
+        self.table[self._rows, cells] = np.maximum(values, target)
+        self.total += count
+        return int(target)
+
+    def estimate(self, key: str) -> int:
+        return int(self.table[self._rows, self._cells(key)].min())
+
+    def clear(self):
+        self.table.fill(0)
+        self.total = 0
+
+
+class HeavyHitters:
+    """Sketch tahminine göre en sık capacity anahtarı tutan küme.
+
+    Anahtarın tahmini listedeki en küçük değerden büyükse en küçük
+    çıkarılır; böylece sık geçen anahtarlar bellek büyümeden izlenir.
+    """
+
+    def __init__(self, sketch: CountMinSketch, capacity: int = 200):
+        self.sketch = sketch
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []  # (sayı, anahtar); eski kayıtlar tembel silinir
+
+    def add(self, key: str, count: int = 1):
+        estimate = self.sketch.add(key, count)
+        if key in self.counts or len(self.counts) < self.capacity:
+            self.counts[key] = estimate
+            heapq.heappush(self._heap, (estimate, key))
+        else:
+            smallest = self._smallest()
+            if estimate > smallest[0]:
+                heapq.heappop(self._heap)
+                del self.counts[smallest[1]]
+                self.counts[key] = estimate
+                heapq.heappush(self._heap, (estimate, key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(value, key) for key, value in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _smallest(self) -> Tuple[int, str]:
+        """Güncel en küçük kayıt (eski heap girdileri atlanır)"""
+        while True:
+            value, key = self._heap[0]
+            if self.counts.get(key) == value:
+                return value, key
+            heapq.heappop(self._heap)
+
+    def top(self, n: int = None) -> List[Tuple[str, int]]:
+        """En sık anahtarlar, çoktan aza"""
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return ranked if n is None else ranked[:n]
+
+    def clear(self):
+        self.counts.clear()
+        self._heap.clear()
@@ -22,3 +22,7 @@ class DataSource(ABC):
     @abstractmethod
     def test_connection(self) -> bool:
         pass
+
+    def get_awb_keys(self) -> List[str]:
+        """Arama kolonundaki tüm AWB değerleri (FuzzyMatcher indeksi için)"""
+        return []
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class DetectionCache:
+    """Tespit sonuçları için içerik hash'i anahtarlı iki katmanlı cache.
+
+    Anahtar, mail konusu/gövdesinin hash'i ile aktif pattern config'inin
+    hash'inden oluşur; pattern'lar değiştiğinde eski sonuçlar kendiliğinden
+    geçersiz olur. Bellekte sınırlı bir LRU tutulur, istenirse sonuçlar
+    cache/ altında küçük JSON dosyaları olarak da saklanır (yeniden başlatma
+    sonrası için). Disk katmanı kendi dizinini kendisi sınırlar: max_age_days
+    boyunca okunmamış dosyalar ve max_disk_entries'i aşan en eskiler silinir.
+    """
+
+    def __init__(self, max_entries: int = 2000, disk_path: Optional[str] = None,
+                 max_disk_entries: int = 20000, max_age_days: float = 30):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.max_disk_entries = max_disk_entries
+        self.max_age_days = max_age_days
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0  # Son disk temizliğinden beri yazılan dosya sayısı
+        if self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+            self.prune_disk()
+
+    @staticmethod
+    def config_hash(patterns: Dict) -> str:
+        """Pattern config'inin kısa hash'i (pattern versiyonu)"""
+        data = json.dumps(patterns, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def make_key(subject: str, body: str, config_hash: str) -> str:
+        """Mail içeriği + pattern versiyonundan cache anahtarı üret"""
+        digest = hashlib.sha1()
+        digest.update((subject or "").encode('utf-8', 'surrogatepass'))
+        digest.update(b"\x1f")
+        digest.update((body or "").encode('utf-8', 'surrogatepass'))
+        return f"{config_hash}_{digest.hexdigest()}"
+
+    def _disk_file(self, key: str) -> str:
+        digest = key.rsplit("_", 1)[-1]
+        return os.path.join(self.disk_path, digest[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[tuple]]:
+        """Kompakt sonuç listesini getir; yoksa None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        if not self.disk_path:
+            return None
+        try:
+            path = self._disk_file(key)
+            if not os.path.exists(path):
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                results = [tuple(item) for item in json.load(f)]
+            # Okunan dosya yeni sayılır; yaş/adet sınırı önce kullanılmayanları siler
+            os.utime(path)
+            self._remember(key, results)
+            return results
+        except Exception as e:
+            print(f"Tespit cache okuma hatası: {str(e)}")
+            return None
+
+    def put(self, key: str, results: List[tuple]):
+        """Kompakt sonuç listesini kaydet"""
+        results = list(results)
+        self._remember(key, results)
+
+        if not self.disk_path:
+            return
+        path = self._disk_file(key)
+        temp_file = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False)
+            os.replace(temp_file, path)
+        except Exception as e:
+            print(f"Tespit cache yazma hatası: {str(e)}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return
+
+        # Sınır her yazmada değil, sınırın onda biri kadar yeni dosyada bir denetlenir
+        with self._lock:
+            self._puts += 1
+            due = self._puts >= max(1, self.max_disk_entries // 10)
+            if due:
+                self._puts = 0
+        if due:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Disk katmanındaki eski ve sınırı aşan dosyaları sil, silinen sayısını dön"""
+        if not self.disk_path:
+            return 0
+        removed = 0
+        try:
+            cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days else None
+            files = []
+            for root, dirs, names in os.walk(self.disk_path):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        mtime = os.path.getmtime(path)
+                    except OSError:
+                        continue
+                    # Yarım kalmış yazmalardan artan .tmp dosyaları da yaşlanınca silinir
+                    if cutoff is not None and mtime < cutoff:
+                        os.remove(path)
+                        removed += 1
+                    elif name.endswith(".json"):
+                        files.append((mtime, path))
+            if self.max_disk_entries and len(files) > self.max_disk_entries:
+                files.sort()
+                for _, path in files[:len(files) - self.max_disk_entries]:
+                    os.remove(path)
+                    removed += 1
+            # Boşalan hash alt dizinleri de kaldırılır
+            for name in os.listdir(self.disk_path):
+                directory = os.path.join(self.disk_path, name)
+                if os.path.isdir(directory) and not os.listdir(directory):
+                    os.rmdir(directory)
+        except Exception as e:
+            print(f"Tespit cache temizleme hatası: {str(e)}")
+        return removed
+
+    def _remember(self, key: str, results: List[tuple]):
+        """Bellek LRU'suna ekle, sınırı aşanı at"""
+        with self._lock:
+            self._memory[key] = results
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self):
+        """Bellek katmanını temizle"""
+        with self._lock:
+            self._memory.clear()
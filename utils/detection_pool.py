@@ -0,0 +1,237 @@
+import os
+import threading
+from typing import Dict, List, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from utils.stream_scanner import find_cut, normalize_fragment, split_segments
+from utils.pattern_stats import PatternStats
+
+# Her worker process'te bir kez oluşturulan detector (pattern'lar bir kez derlenir)
+_worker_detector = None
+
+
+def _init_worker():
+    """Worker başlangıcı: pattern'ları yükle ve derle"""
+    global _worker_detector
+    from utils.awb_detector import AWBDetector
+    _worker_detector = AWBDetector()
+    # Gönderen istatistikleri ve rota kararı yalnızca ana process'te; rotalar her görevle gelir
+    _worker_detector.router.read_only = True
+    # Cache anahtarı rotaya bağlı; worker rotayı bilmediğinden cache ana process'te tutulur
+    _worker_detector.detection_cache = None
+    # Pattern istatistikleri worker'da biriktirilip sonuçla birlikte ana process'e döner
+    _worker_detector.pattern_stats = PatternStats(None)
+
+
+def _sync_patterns(config_hash: str = None):
+    """Ana process farklı bir pattern sürümü kullanıyorsa worker'ın bundle'ını hemen yenile"""
+    if config_hash and _worker_detector.pattern_hash != config_hash:
+        _worker_detector.load_patterns()
+
+
+def _detect_chunk(mails: List[Dict], config_hash: str = None, routes: Dict = None) -> tuple:
+    """Worker'da bir mail chunk'ını ana process'in rotalarıyla tara; (kompakt sonuçlar, pattern istatistiği) dön"""
+    try:
+        _sync_patterns(config_hash)
+        detected = _worker_detector.find_all_awbs_batch(mails, routes)
+        return {
+            mail_id: [result.to_tuple() for result in results]
+            for mail_id, results in detected.items()
+        }, _worker_detector.pattern_stats.drain()
+    except Exception as e:
+        print(f"Worker tarama hatası: {str(e)}")
+        return {}, {}
+
+
+def _scan_segment(behind: str, own: str, ahead: str, location: str, first: bool, last: bool,
+                  labels: List[str] = None, config_hash: str = None) -> tuple:
+    """Worker'da büyük bir gövdenin tek segmentini (öncesi/sonrası overlap ile) tara.
+
+    Dönüş: (öncesinin normalize uzunluğu, segmentin normalize uzunluğu,
+    öncesindeki satır sayısı, segmentteki satır sayısı, kompakt sonuçlar,
+    pattern istatistiği).
+    Konumlar ve satırlar behind + own + ahead metnine göredir.
+    """
+    try:
+        _sync_patterns(config_hash)
+        bundle = _worker_detector.bundle
+        norm_behind = normalize_fragment(behind)
+        norm_own = normalize_fragment(own)
+        norm_ahead = normalize_fragment(ahead)
+        if first:
+            norm_own = norm_own.lstrip()
+        if last:
+            norm_own = norm_own.rstrip()
+        text = norm_behind + norm_own + norm_ahead
+        chunk_size = max(bundle.streaming_config.get("chunk_size", 262144), 4 * bundle.stream_overlap)
+        chunks = (text[start:end] for start, end in split_segments(text, chunk_size))
+        results = [
+            match.to_tuple()
+            for match in _worker_detector.iter_stream_chunks(chunks, location, labels, bundle)
+        ]
+        return (len(norm_behind), len(norm_own), norm_behind.count('\n'), norm_own.count('\n'), results,
+                _worker_detector.pattern_stats.drain())
+    except Exception as e:
+        print(f"Worker segment tarama hatası: {str(e)}")
+        return (0, 0, 0, 0, [], {})
+
+
+class DetectionProcessPool:
+    """GIL'e takılmadan toplu AWB tespiti yapan uzun ömürlü process havuzu.
+
+    Worker'lar başlangıçta kendi AWBDetector'larını kurar ve sonra yalnızca
+    mail chunk'ları alır. Process'ler arasında sadece konu/gövde metni gider,
+    sonuçlar tuple olarak döner ve ana process'te AWBMatch'e açılır. Akış
+    eşiğini aşan tek bir gövde segmentlere bölünüp worker'lara dağıtılır.
+    """
+
+    def __init__(self, max_workers: int = None, chunk_size: int = 50):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Havuzu ilk kullanımda başlat"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    def find_all_awbs_batch(self, mails: Iterable, detector=None) -> Dict[str, List]:
+        """AWBDetector.find_all_awbs_batch ile aynı sonucu process'lerde üret.
+
+        detector verilirse önce onun tespit cache'ine bakılır; worker'lara
+        yalnızca cache'te olmayan mailler gönderilir, sonuçlar cache'e yazılır.
+        """
+        from utils.awb_detector import AWBDetector
+        from utils.awb_match import AWBMatch
+
+        # Worker'lar ana process ile aynı pattern sürümünü kullanır
+        bundle = detector.bundle if detector is not None else None
+        config_hash = bundle.config_hash if bundle is not None else None
+
+        # Id'ler ana process'te verilir ki chunk'lar arasında çakışmasın
+        payload = []
+        routes = {}  # mail id -> airline listesi (None: tüm set); worker'lar kendi rotasını kullanmaz
+        order = []
+        seen_ids = set()
+        ready = {}
+        pending = {}
+        for index, mail in enumerate(mails):
+            mail_data = AWBDetector._as_mail_dict(mail)
+            mail_id = AWBDetector.mail_id(mail_data)
+            if mail_id in seen_ids:
+                mail_id = f"{mail_id}#{index}"
+            seen_ids.add(mail_id)
+            order.append(mail_id)
+
+            if detector is not None:
+                cached = detector.get_cached_results(mail_data, bundle)
+                if cached is not None:
+                    ready[mail_id] = cached
+                    continue
+                pending[mail_id] = mail_data
+
+                # Çok büyük gövde tek worker'ı kilitlemesin, segmentlere bölünür
+                body = mail_data.get("body", "")
+                streaming = bundle.streaming_config
+                if (streaming.get("enabled", True) and isinstance(body, str)
+                        and len(body) >= streaming.get("threshold", 1048576)):
+                    def scan(labels, mail_data=mail_data, body=body):
+                        found = detector._search_text(mail_data.get("subject", ""), "subject", None, labels, bundle)
+                        found.extend(self.scan_large_text(body, "body", detector, labels, bundle))
+                        return found
+                    ready[mail_id] = detector._remove_duplicates(detector.routed_scan(mail_data, scan, bundle))
+                    detector.store_results(mail_data, ready[mail_id], bundle)
+                    detector.submit_learning(ready[mail_id])
+                    continue
+
+            if detector is not None:
+                routes[mail_id] = bundle.router.plan(mail_data)
+            payload.append({
+                "id": mail_id,
+                "subject": mail_data.get("subject", ""),
+                "body": mail_data.get("body", ""),
+                "sender": mail_data.get("sender", ""),
+                "sender_email": mail_data.get("sender_email", "")
+            })
+
+        if payload:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(
+                    _detect_chunk, payload[i:i + self.chunk_size], config_hash,
+                    {item["id"]: routes[item["id"]] for item in payload[i:i + self.chunk_size]
+                     if item["id"] in routes} if detector is not None else None
+                )
+                for i in range(0, len(payload), self.chunk_size)
+            ]
+            for future in futures:
+                detected, pattern_stats = future.result()
+                if detector is not None:
+                    detector.pattern_stats.merge(pattern_stats)
+                for mail_id, compacts in detected.items():
+                    ready[mail_id] = [AWBMatch.from_tuple(item) for item in compacts]
+                    if mail_id in pending:
+                        detector.store_results(pending[mail_id], ready[mail_id], bundle)
+                        detector.submit_learning(ready[mail_id])
+                        # Worker'lar öğrenmez; tüm set ile taranan mailler burada sayılır
+                        if routes.get(mail_id) is None:
+                            bundle.router.observe(pending[mail_id], ready[mail_id])
+
+        return {mail_id: ready.get(mail_id, []) for mail_id in order}
+
+    def scan_large_text(self, text: str, location: str, detector, labels: List[str] = None,
+                        bundle=None) -> List:
+        """Tek bir büyük metni segmentlere bölüp worker'larda paralel tara"""
+        from utils.awb_match import AWBMatch
+
+        bundle = bundle or detector.bundle
+        segment_size = max(bundle.streaming_config.get("segment_size", 2097152), 8 * bundle.stream_overlap)
+        lookaround = 4 * bundle.stream_overlap  # Normalize sonrası overlap'ı kapsayacak ham karakter
+        segments = split_segments(text, segment_size)
+        executor = self._get_executor()
+        futures = []
+        for number, (start, end) in enumerate(segments):
+            behind_start = find_cut(text, max(0, start - lookaround)) if start else 0
+            ahead_end = find_cut(text, min(len(text), end + lookaround))
+            futures.append(executor.submit(
+                _scan_segment,
+                text[behind_start:start] if behind_start < start else "",
+                text[start:end],
+                text[end:ahead_end],
+                location,
+                number == 0,
+                number == len(segments) - 1,
+                labels,
+                bundle.config_hash
+            ))
+
+        results = []
+        offset = 0
+        lines = 0
+        for future in futures:
+            behind_length, own_length, behind_lines, own_lines, compacts, pattern_stats = future.result()
+            detector.pattern_stats.merge(pattern_stats)
+            for compact in compacts:
+                position = compact[6]
+                # Yalnızca bu segmentte başlayan eşleşmeler; komşu segmentinkiler orada sayılır
+                if not behind_length <= position < behind_length + own_length:
+                    continue
+                compact = list(compact)
+                compact[5] = lines + compact[5] - behind_lines
+                compact[6] = offset + position - behind_length
+                results.append(AWBMatch.from_tuple(tuple(compact)))
+            offset += own_length
+            lines += own_lines
+        return results
+
+    def shutdown(self):
+        """Havuzu kapat"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Dict
+
+# Yüzdelik hesabı için stage başına tutulan en fazla son ölçüm
+SAMPLE_LIMIT = 2048
+
+
+class StageCounter:
+    """Tek bir aşamanın sayaçları ve son süre örnekleri"""
+    __slots__ = ("calls", "hits", "rejects", "total_ns", "max_ns", "samples")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.rejects = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.samples = deque(maxlen=SAMPLE_LIMIT)
+
+    def to_dict(self) -> Dict:
+        samples = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))] / 1e6
+
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "rejects": self.rejects,
+            "total_ms": round(self.total_ns / 1e6, 3),
+            "avg_ms": round(self.total_ns / 1e6 / self.calls, 4) if self.calls else 0.0,
+            "p50_ms": round(percentile(0.50), 4),
+            "p95_ms": round(percentile(0.95), 4),
+            "p99_ms": round(percentile(0.99), 4),
+            "max_ms": round(self.max_ns / 1e6, 4)
+        }
+
+
+class DetectorStats:
+    """AWBDetector aşamaları için düşük maliyetli süre ve sayaç toplayıcı.
+
+    Aşamalar: clean, scan, dedup, check_digit, validate, fuzzy, confidence,
+    accept, stream, cache, route, grok, mail.
+    Kullanım:
+        started = stats.start()
+        ...
+        stats.record("scan", started, hits=len(hits))
+    Kapalıyken start() 0 döner ve record() hiçbir şey yapmaz.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._stages: Dict[str, StageCounter] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> int:
+        return time.perf_counter_ns() if self.enabled else 0
+
+    def record(self, stage: str, started: int, hits: int = 0, rejects: int = 0):
+        """started (start() dönüşü) ile şimdi arasındaki süreyi aşamaya ekle"""
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter_ns() - started
+        with self._lock:
+            counter = self._stages.get(stage)
+            if counter is None:
+                counter = self._stages[stage] = StageCounter()
+            counter.calls += 1
+            counter.hits += hits
+            counter.rejects += rejects
+            counter.total_ns += elapsed
+            if elapsed > counter.max_ns:
+                counter.max_ns = elapsed
+            counter.samples.append(elapsed)
+
+    def count(self, stage: str, hits: int = 0, rejects: int = 0):
+        """Süre ölçmeden yalnızca sayaç artır"""
+        if not self.enabled:
+            return
+        with self._lock:
+            counter = self._stages.get(stage)
+            if counter is None:
+                counter = self._stages[stage] = StageCounter()
+            counter.calls += 1
+            counter.hits += hits
+            counter.rejects += rejects
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Aşama bazında özet (calls, hits, rejects, total/avg/p50/p95/p99/max ms)"""
+        with self._lock:
+            return {stage: counter.to_dict() for stage, counter in self._stages.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def dump(self, path: str) -> bool:
+        """Özeti JSON dosyasına yaz"""
+        temp_file = f"{path}.tmp"
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "stages": self.snapshot()
+                }, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, path)
+            return True
+        except Exception as e:
+            print(f"İstatistik yazma hatası: {str(e)}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False
@@ -0,0 +1,154 @@
+import re
+from typing import Dict, List, Optional, Type
+
+from utils.pattern_engine import PatternSetEngine, SpanSet
+from utils.stream_scanner import normalize_fragment
+from utils.text_index import LineIndex
+
+_SPACES = re.compile(r'\s+')
+_SEPARATORS = re.compile(r'[-\s/.]+')
+_TRAILING = re.compile(r'[-/.:]+$')
+
+
+class EntityMatch:
+    """AWB dışı bir referans eşleşmesi (fatura, beyanname, serbest referans)"""
+    __slots__ = ("entity", "value", "match_text", "location", "line_number", "start", "end")
+
+    def __init__(self, entity: str, value: str, match_text: str, location: str,
+                 line_number: int, start: int, end: int):
+        self.entity = entity
+        self.value = value
+        self.match_text = match_text
+        self.location = location
+        self.line_number = line_number
+        self.start = start
+        self.end = end
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"EntityMatch({self.entity}: {self.value})"
+
+
+class EntityType:
+    """Bir referans tipinin pattern'ları, normalize ve doğrulama kuralı.
+
+    Varsayılan pattern'lar awb_patterns.json "entities" bloğundaki aynı
+    isimli kayıtla değiştirilebilir. Pattern'da grup varsa değer 1. gruptan,
+    yoksa tüm eşleşmeden alınır.
+    """
+    name = ""
+    default_patterns: List[str] = []
+    min_length = 4
+    max_length = 32
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.patterns = config.get("patterns") or list(self.default_patterns)
+        self.min_length = config.get("min_length", self.min_length)
+        self.max_length = config.get("max_length", self.max_length)
+
+    def normalize(self, match: re.Match) -> str:
+        value = match.group(1) if match.lastindex else match.group()
+        return _TRAILING.sub('', _SPACES.sub('', value or '')).upper()
+
+    def validate(self, value: str) -> bool:
+        return (self.min_length <= len(value) <= self.max_length
+                and any(c.isdigit() for c in value))
+
+
+# Kayıtlı referans tipleri (isim -> sınıf); yeni tip register_entity_type ile eklenir
+ENTITY_TYPES: Dict[str, Type[EntityType]] = {}
+
+
+def register_entity_type(entity_type: Type[EntityType]) -> Type[EntityType]:
+    ENTITY_TYPES[entity_type.name] = entity_type
+    return entity_type
+
+
+@register_entity_type
+class InvoiceEntity(EntityType):
+    name = "invoice"
+    default_patterns = [
+        r"\b(?:INV|FAT|FTR)[-/\s]?\d{4,}(?:[-/]\d+)*\b",
+        r"(?:fatura|invoice)\s*(?:no|nr|number|numaras[ıi])?\s*[:#.]?\s*([A-Z]{0,4}[-/]?\d[A-Z0-9/-]{4,})"
+    ]
+
+
+@register_entity_type
+class DeclarationEntity(EntityType):
+    """Gümrük beyannamesi: 18 haneli (YY + idare kodu + IM/EX/TR + sıra) veya BYN/IM/EX önekli"""
+    name = "declaration"
+    default_patterns = [
+        r"\b\d{8}(?:IM|EX|TR)\d{6,8}\b",
+        r"\bBYN[-\s]?\d{6,}\b",
+        r"\b(?:IM|EX)[-\s]?\d{6,}\b"
+    ]
+
+    def normalize(self, match: re.Match) -> str:
+        return _SEPARATORS.sub('', super().normalize(match))
+
+
+@register_entity_type
+class ReferenceEntity(EntityType):
+    name = "reference"
+    default_patterns = [
+        r"\b(?:ref(?:erans)?|our ref|your ref)\s*(?:no|nr)?\s*[:#.]?\s*([A-Z0-9][A-Z0-9/-]{3,})"
+    ]
+
+
+class EntityExtractor:
+    """Kayıtlı tüm referans tiplerini tek çağrıda çıkaran tarayıcı.
+
+    Tiplerin pattern'ları tek bir PatternSetEngine'de toplanır (etiket =
+    tip adı); metin bir kez normalize edilip tüm tiplerle taranır. AWB'ler bu
+    geçişe dahil değildir, AWBDetector kendi pattern seti ve doğrulamasıyla
+    bulur; AWBDetector.extract_entities ikisini birleştirir.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or {}
+        self.types: Dict[str, EntityType] = {}
+        for name, entity_type in ENTITY_TYPES.items():
+            instance = entity_type(config.get(name))
+            if instance.enabled:
+                self.types[name] = instance
+        self.engine = PatternSetEngine({
+            name: {"patterns": instance.patterns}
+            for name, instance in self.types.items()
+        })
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.types)
+
+    def extract(self, text: str, location: str = "body") -> List[EntityMatch]:
+        """Metindeki tüm referansları (tip başına tekrarsız) dön"""
+        if not isinstance(text, str) or not text:
+            return []
+        clean_text = normalize_fragment(text).strip()
+        line_index = None
+        accepted = {}
+        seen = set()
+        results = []
+        for entry, match in self.engine.scan(clean_text):
+            spans = accepted.get(entry.label)
+            if spans is not None and spans.covers(match.start(), match.end()):
+                continue
+            entity_type = self.types[entry.label]
+            value = entity_type.normalize(match)
+            if not entity_type.validate(value):
+                continue
+            accepted.setdefault(entry.label, SpanSet()).add(match.start(), match.end())
+            if (entry.label, value) in seen:
+                continue
+            seen.add((entry.label, value))
+            if line_index is None:
+                line_index = LineIndex(clean_text)
+            results.append(EntityMatch(
+                entry.label, value, match.group(), location,
+                line_index.line_number(match.start()), match.start(), match.end()
+            ))
+        return results
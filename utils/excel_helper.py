@@ -118,6 +118,25 @@ class ExcelHelper(DataSource):
             
         return {}
 
+    def get_awb_keys(self) -> List[str]:
+        """Arama kolonundaki tüm AWB değerleri (FuzzyMatcher indeksi için)"""
+        try:
+            if self.df is None or self.df.empty:
+                return []
+            search_column = None
+            for col_name, details in self.config.get("datasource", {}).get("column_mappings", {}).items():
+                if details.get("searchable", False):
+                    search_column = col_name
+                    break
+            if not search_column:
+                search_column = self.config.get("datasource", {}).get("search_column")
+            if not search_column or search_column not in self.df.columns:
+                return []
+            return self.df[search_column].dropna().astype(str).tolist()
+        except Exception as e:
+            print(f"AWB listesi alma hatası: {str(e)}")
+            return []
+
     def export_awb_results(self, results, file_name=None):
         """AWB sonuçlarını Excel'e aktar"""
         try:
@@ -1,8 +1,166 @@
 from difflib import SequenceMatcher
 from fuzzywuzzy import fuzz
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import re
+import zlib
+import numpy as np
+
+try:
+    from rapidfuzz import process as rf_process, fuzz as rf_fuzz
+except ImportError:  # rapidfuzz yoksa match_many fuzzywuzzy döngüsüne düşer
+    rf_process = None
+
+try:
+    from Levenshtein import distance as levenshtein
+except ImportError:  # python-Levenshtein kurulu değilse saf Python hesap
+    def levenshtein(a: str, b: str) -> int:
+        """İki metin arasındaki düzenleme mesafesi (ekle/sil/değiştir)"""
+        if len(a) < len(b):
+            a, b = b, a
+        previous = list(range(len(b) + 1))
+        for i, char_a in enumerate(a, 1):
+            current = [i]
+            for j, char_b in enumerate(b, 1):
+                current.append(min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b)
+                ))
+            previous = current
+        return previous[-1]
+
+_KEY_CHARS = re.compile(r'[^0-9A-Z]')
+
+# match_many'de tek seferde oluşturulan skor matrisinin en fazla hücre sayısı (~64 MB uint8)
+MATRIX_CELLS = 64 * 1024 * 1024
+
+
+class BKTree:
+    """Levenshtein mesafesine göre BK-tree.
+
+    Her düğüm çocuklarını kendisine olan mesafeye göre tutar; üçgen
+    eşitsizliği sayesinde arama yalnızca |d - k| .. d + k aralığındaki
+    dallara iner ve tüm anahtarları gezmez.
+    """
+
+    def __init__(self, distance=levenshtein):
+        self.distance = distance
+        self._root = None  # [anahtar, {mesafe: çocuk düğüm}]
+        self._size = 0
+
+    def add(self, key: str) -> bool:
+        if self._root is None:
+            self._root = [key, {}]
+            self._size = 1
+            return True
+        node = self._root
+        while True:
+            d = self.distance(key, node[0])
+            if d == 0:
+                return False
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [key, {}]
+                self._size += 1
+                return True
+            node = child
+
+    def search(self, key: str, max_distance: int) -> List[Tuple[int, str]]:
+        """max_distance içindeki anahtarlar, (mesafe, anahtar) olarak yakından uzağa"""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node_key, children = stack.pop()
+            d = self.distance(key, node_key)
+            if d <= max_distance:
+                found.append((d, node_key))
+            for child_distance, child in children.items():
+                if d - max_distance <= child_distance <= d + max_distance:
+                    stack.append(child)
+        found.sort()
+        return found
+
+    def __len__(self):
+        return self._size
+
 
 class FuzzyMatcher:
+    def __init__(self):
+        # Veri kaynağındaki AWB'lerin düzenleme mesafesi indeksi (build_index ile kurulur)
+        self.index: Optional[BKTree] = None
+        self._originals: Dict[str, str] = {}
+        # Anahtarlarda geçen karakterler; tek hane farkı bu karakterlerle yerine koyarak aranır
+        self._alphabet: str = ""
+        # İndeksteki anahtar kümesinin özeti; tespit cache anahtarına girer
+        self.index_version: Optional[str] = None
+
+    @staticmethod
+    def normalize_key(awb) -> str:
+        """Karşılaştırma anahtarı: yalnızca büyük harf ve rakam"""
+        return _KEY_CHARS.sub('', str(awb).upper())
+
+    def build_index(self, keys: Iterable) -> int:
+        """Bilinen AWB'lerden BK-tree kur; kurulan indeks tek atamayla devreye girer"""
+        tree = BKTree()
+        originals = {}
+        for key in keys:
+            if key is None:
+                continue
+            normalized = self.normalize_key(key)
+            if normalized and tree.add(normalized):
+                originals[normalized] = str(key).strip()
+        alphabet = "".join(sorted(set().union(*originals))) if originals else ""
+        digest = zlib.crc32("\n".join(sorted(originals)).encode('utf-8'))
+        self.index, self._originals, self._alphabet, self.index_version = tree, originals, alphabet, f"{digest:08x}"
+        return len(tree)
+
+    def substitute(self, awb: str) -> Optional[str]:
+        """awb'den yalnızca tek hanesi farklı tek kaydın normalize anahtarı; yoksa ya da birden çoksa None.
+
+        Her hane alfabedeki karakterlerle değiştirilip anahtar sözlüğünde
+        aranır (rakamlı veride ~10 x uzunluk arama); ek indeks tutulmaz,
+        BK-tree'ye inilmez.
+        """
+        key = self.normalize_key(awb)
+        originals = self._originals
+        if key in originals:
+            return key
+        found = None
+        for i in range(len(key)):
+            head, tail = key[:i], key[i + 1:]
+            for char in self._alphabet:
+                if char == key[i]:
+                    continue
+                candidate = head + char + tail
+                if candidate in originals:
+                    if found is not None:
+                        return None
+                    found = candidate
+        return found
+
+    def nearest(self, awb: str, max_distance: int = 1, limit: int = 5) -> List[Tuple[str, int]]:
+        """Veri kaynağında awb'ye max_distance içindeki AWB'ler, (kayıt, mesafe) olarak"""
+        index = self.index
+        if index is None:
+            return []
+        originals = self._originals
+        return [
+            (originals.get(key, key), distance)
+            for distance, key in index.search(self.normalize_key(awb), max_distance)[:limit]
+        ]
+
+    def resolve(self, awb: str, max_distance: int = 1) -> Optional[str]:
+        """En yakın tek kaydın normalize anahtarı; eşit uzaklıkta birden çok kayıt varsa None"""
+        index = self.index
+        if index is None:
+            return None
+        found = index.search(self.normalize_key(awb), max_distance)
+        if not found or (len(found) > 1 and found[1][0] == found[0][0]):
+            return None
+        return found[0][1]
+
     def find_best_match(self, search_text: str, candidates: List[str], threshold: float = 0.8) -> Tuple[str, float]:
         """En iyi eşleşmeyi bul"""
         best_match = None
@@ -19,6 +177,72 @@ class FuzzyMatcher:
                 
         return best_match, best_ratio
 
+    def match_many(self, queries: Sequence[str], choices: Sequence[str], threshold: float = 0.8,
+                   limit: int = 1, workers: int = -1) -> List[List[Tuple[str, float]]]:
+        """Her sorgu için threshold üzerindeki en iyi limit aday, (aday, oran) olarak.
+
+        Skorlar rapidfuzz process.cdist ile çok iş parçacıklı tek bir uint8
+        matriste hesaplanır (fuzz.ratio ile aynı 0-100 ölçek); en iyi adaylar
+        argpartition ile seçilir. Matris MATRIX_CELLS'i aşmasın diye sorgular
+        parçalara bölünür. rapidfuzz kurulu değilse fuzzywuzzy döngüsü kullanılır.
+        """
+        queries = list(queries)
+        choices = list(choices)
+        if not queries or not choices or limit <= 0:
+            return [[] for _ in queries]
+        cutoff = int(np.ceil(threshold * 100))
+        limit = min(limit, len(choices))
+        step = max(1, MATRIX_CELLS // len(choices))
+
+        results = []
+        for offset in range(0, len(queries), step):
+            part = queries[offset:offset + step]
+            if rf_process is not None:
+                scores = rf_process.cdist(part, choices, scorer=rf_fuzz.ratio, score_cutoff=cutoff,
+                                          dtype=np.uint8, workers=workers)
+            else:
+                scores = np.array([[fuzz.ratio(query, choice) for choice in choices] for query in part],
+                                  dtype=np.uint8)
+            if limit < len(choices):
+                top = np.argpartition(-scores.astype(np.int16), limit - 1, axis=1)[:, :limit]
+            else:
+                top = np.broadcast_to(np.arange(len(choices)), scores.shape)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores.astype(np.int16), axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for indices, row_scores in zip(top, top_scores):
+                results.append([
+                    (choices[index], score / 100)
+                    for index, score in zip(indices.tolist(), row_scores.tolist())
+                    if score >= cutoff and score > 0
+                ])
+        return results
+
+    def reconcile(self, awbs: Sequence[str], threshold: float = 0.8,
+                  limit: int = 1) -> Dict[str, List[Tuple[str, float]]]:
+        """Tespit edilen AWB'lerin veri kaynağındaki (indekslenmiş) en yakın kayıtları"""
+        originals = self._originals
+        if not originals:
+            return {}
+        awbs = list(dict.fromkeys(awbs))
+        if rf_process is None:
+            # Saf Python matris tüm veri kaynağı için yavaş; BK-tree'deki yakın kayıtlar skorlanır
+            results = {}
+            for awb in awbs:
+                key = self.normalize_key(awb)
+                found = [(record, fuzz.ratio(key, self.normalize_key(record)) / 100)
+                         for record, _ in self.nearest(awb, max_distance=2, limit=limit * 4)]
+                found = sorted((item for item in found if item[1] >= threshold), key=lambda item: -item[1])
+                results[awb] = found[:limit]
+            return results
+        keys = list(originals)
+        matches = self.match_many([self.normalize_key(awb) for awb in awbs], keys, threshold, limit)
+        return {
+            awb: [(originals[key], ratio) for key, ratio in found]
+            for awb, found in zip(awbs, matches)
+        }
+
     def examples(self):
         """Fuzzy matching örnekleri"""
         # Örnek 1: Basit yazım hatası
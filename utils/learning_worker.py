@@ -0,0 +1,89 @@
+import time
+import queue
+import threading
+from typing import Iterable, Optional
+
+from utils.pattern_learner import PatternLearner
+
+
+class LearningWorker:
+    """Pattern öğrenmeyi arama yolunun dışında yapan arka plan kuyruğu.
+
+    Detector yeni taranmış mailin eşleşmelerini submit() ile bırakır ve
+    beklemez; eşleşmeler metnin LineIndex referansını taşıdığından context
+    worker thread'inde üretilir. Worker kuyruğu batch_size'lık gruplar
+    halinde işler, öğrenilenleri flush_interval saniyede bir atomik yazar.
+    Kuyruk doluysa yeni iş düşürülür (aramayı bekletmez), sayısı dropped'da
+    tutulur.
+    """
+
+    def __init__(self, learner: Optional[PatternLearner] = None, flush_interval: float = 300,
+                 batch_size: int = 200, max_queue: int = 10000):
+        self.learner = learner or PatternLearner()
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.learned = 0
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pattern-learning", daemon=True)
+        self._thread.start()
+
+    def submit(self, matches: Iterable) -> bool:
+        """Bir mailin eşleşmelerini kuyruğa bırak; kuyruk doluysa False"""
+        matches = list(matches)
+        if not matches or self._stop.is_set():
+            return False
+        try:
+            self.queue.put_nowait(matches)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            timeout = max(0.1, self.flush_interval - (time.monotonic() - self._last_flush))
+            try:
+                batch = [self.queue.get(timeout=min(timeout, 1.0))]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                self._learn(batch)
+            if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def _learn(self, batch):
+        for matches in batch:
+            self.learner.learn_from_matches(matches)
+            self.learned += 1
+        self._dirty = True
+
+    def flush(self):
+        """Öğrenilen adayları şimdi kaydet (değişiklik varsa)"""
+        if self._dirty:
+            self._dirty = False
+            self.learner.save_learned_patterns()
+        self._last_flush = time.monotonic()
+
+    def stop(self, flush: bool = True, timeout: float = 5):
+        """Worker'ı durdur; kuyrukta kalanları işleyip kaydet"""
+        self._stop.set()
+        self._thread.join(timeout)
+        if flush:
+            batch = []
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                self._learn(batch)
+            self.flush()
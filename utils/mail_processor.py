@@ -6,6 +6,7 @@ import os
 import zipfile
 import pythoncom
 from win32com.client import constants
+from utils.thread_segmenter import segment_thread, scan_thread
 
 class MailProcessor:
     def __init__(self):
@@ -41,14 +42,48 @@ class MailProcessor:
                     results.append(content)
         return results
         
-    def _extract_thread(self, msg) -> List[str]:
-        """Mail zincirini akıllıca işle"""
-        thread = []
+    def _extract_thread(self, msg) -> List[Dict]:
+        """Mail zincirini tekrarsız bloklara ayır.
+
+        Her mesajın gövdesi yeni içerik ve alıntı geçmişi olarak bölünür;
+        konuşmada daha önce görülmüş bloklar tekrar alınmaz. Sonuç
+        {"entry_id", "text", "quoted"} listesidir (eskiden yeniye).
+        """
+        return [
+            {"entry_id": segment.message_id, "text": segment.text, "quoted": segment.quoted}
+            for segment in segment_thread(self._thread_messages(msg))
+        ]
+
+    def scan_thread(self, msg, detector) -> Dict[str, List]:
+        """Konuşmadaki AWB'leri mesaj EntryID'sine göre dön; her blok bir kez taranır"""
+        return scan_thread(self._thread_messages(msg), detector)
+
+    def _thread_messages(self, msg) -> List[Dict]:
+        """Konuşmadaki mailler, alınma zamanına göre eskiden yeniye"""
+        items = []
         conversation = msg.GetConversation()
         if conversation:
-            for mail in conversation.GetChildren():
-                thread.append(self._extract_body(mail))
-        return thread
+            def walk(children):
+                for item in children:
+                    # Yalnızca mail öğeleri (olbMail = 43)
+                    if getattr(item, "Class", 43) == 43:
+                        items.append(item)
+                    walk(conversation.GetChildren(item))
+            walk(conversation.GetRootItems())
+        if not items:
+            items = [msg]
+        items.sort(key=lambda item: str(getattr(item, "ReceivedTime", "")))
+        return [
+            {
+                "entry_id": item.EntryID,
+                "subject": item.Subject,
+                "sender": getattr(item, "SenderName", ""),
+                "sender_email": getattr(item, "SenderEmailAddress", ""),
+                "date": str(getattr(item, "ReceivedTime", "")),
+                "body": self._extract_body(item)
+            }
+            for item in items
+        ]
 
     def _is_supported_attachment(self, filename: str) -> bool:
         """Desteklenen ek formatlarını kontrol et"""
@@ -319,6 +319,34 @@ class MSSQLHelper(DataSource):
         finally:
             self.return_connection(conn)
 
+    def get_awb_keys(self) -> List[str]:
+        """Arama kolonundaki tüm AWB değerleri (FuzzyMatcher indeksi için)"""
+        search_column = self.full_config.get("datasource", {}).get("search_column")
+        query = self.config.get('table', '')
+        if not search_column or not query:
+            return []
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query.replace("SELECT top 1", "SELECT"))
+            columns = [column[0] for column in cursor.description]
+            if search_column not in columns:
+                print(f"Uyarı: '{search_column}' sütunu bulunamadı!")
+                return []
+            position = columns.index(search_column)
+            keys = []
+            while True:
+                rows = cursor.fetchmany(10000)
+                if not rows:
+                    break
+                keys.extend(str(row[position]) for row in rows if row[position] is not None)
+            return keys
+        except Exception as e:
+            print(f"AWB listesi alma hatası: {str(e)}")
+            return []
+        finally:
+            self.return_connection(conn)
+
     def __del__(self):
         """Temizlik"""
         for conn in self.connection_pool:
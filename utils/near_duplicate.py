@@ -0,0 +1,242 @@
+import re
+import zlib
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.stream_scanner import normalize_fragment
+
+# Alıntı satırlarının başındaki "> " işaretleri satır kimliğine dahil edilmez
+_QUOTE_PREFIX = re.compile(r'[>\s]*')
+_BITS = 64
+
+
+def _line_hash(content: str) -> int:
+    """Satır içeriğinin process'ten bağımsız 64 bit hash'i"""
+    data = content.encode('utf-8')
+    return zlib.crc32(data) | (zlib.crc32(data, 0x9E3779B9) << 32)
+
+
+def split_lines(text: str) -> List[Tuple[int, int, int]]:
+    """Normalize edilmiş metnin boş olmayan satırları: (içerik başı, içerik sonu, hash)"""
+    lines = []
+    start = 0
+    length = len(text)
+    while start <= length:
+        end = text.find('\n', start)
+        if end == -1:
+            end = length
+        content_start = _QUOTE_PREFIX.match(text, start, end).end()
+        if content_start < end:
+            lines.append((content_start, end, _line_hash(text[content_start:end])))
+        start = end + 1
+    return lines
+
+
+def simhash(hashes: Iterable[int]) -> int:
+    """Özellik hash'lerinden 64 bit SimHash (bit başına çoğunluk oyu, numpy ile)"""
+    values = np.fromiter(hashes, dtype=np.uint64)
+    if not len(values):
+        return 0
+    bits = np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(values)
+    return int(np.packbits(votes, bitorder='little').view('<u8')[0])
+
+
+def fingerprint(text: str) -> int:
+    """Ham (HTML olabilir) metnin satır bazlı SimHash'i; CacheManager'da saklanır"""
+    if not isinstance(text, str) or not text:
+        return 0
+    return simhash(line[2] for line in split_lines(normalize_fragment(text).strip()))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class SimHashIndex:
+    """SimHash'leri bant tabanlı LSH ile saklayan indeks.
+
+    64 bit max_distance + 1 banda bölünür; en fazla max_distance bit farklı
+    iki parmak izinin en az bir bandı aynıdır (güvercin yuvası), bu yüzden
+    aday arama tüm kayıtları gezmez.
+    """
+
+    def __init__(self, max_distance: int = 6):
+        self.max_distance = max_distance
+        count = max_distance + 1
+        widths = [_BITS // count + (1 if i < _BITS % count else 0) for i in range(count)]
+        self._bands = []
+        shift = 0
+        for width in widths:
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables: List[Dict[int, set]] = [{} for _ in self._bands]
+        self._fingerprints: Dict[object, int] = {}
+
+    def add(self, key, value: int):
+        self.remove(key)
+        self._fingerprints[key] = value
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            table.setdefault((value >> shift) & mask, set()).add(key)
+
+    def remove(self, key):
+        value = self._fingerprints.pop(key, None)
+        if value is None:
+            return
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            keys = table.get((value >> shift) & mask)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del table[(value >> shift) & mask]
+
+    def query(self, value: int) -> List[Tuple[int, object]]:
+        """max_distance içindeki kayıtlar, (mesafe, anahtar) olarak yakından uzağa"""
+        candidates = set()
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            candidates |= table.get((value >> shift) & mask, set())
+        found = []
+        for key in candidates:
+            distance = hamming(value, self._fingerprints[key])
+            if distance <= self.max_distance:
+                found.append((distance, key))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+
+class ScanPlan:
+    """Bir metnin taranma planı: önceki kopyadan alınacak sonuçlar ve taranacak aralıklar"""
+    __slots__ = ("lines", "fingerprint", "key", "reused", "ranges", "_starts", "_ends")
+
+    def __init__(self, lines, fingerprint: int, key):
+        self.lines = lines
+        self.fingerprint = fingerprint
+        self.key = key
+        self.reused = []     # Bilinen satırlardaki adaylar: [(entry indeksi, başlangıç, bitiş)]
+        self.ranges = None   # None: tüm metin taranır
+        self._starts = []    # Yeni satırların içerik aralıkları (sıralı)
+        self._ends = []
+
+    def is_new(self, start: int, end: int) -> bool:
+        """[start, end) aralığı yeni bir satıra değiyor mu (değmiyorsa adayı önceki kopyadan gelir)"""
+        if self.ranges is None:
+            return True
+        position = bisect_right(self._starts, end - 1) - 1
+        return position >= 0 and self._ends[position] > start
+
+
+class NearDuplicateIndex:
+    """Forward/reply kopyalarında yalnızca farklı satırları taratan indeks.
+
+    Taranan her gövdenin satır hash'leri ve satır içinde kalan regex
+    adayları (kabul edilsin edilmesin) saklanır. Yeni gövdenin SimHash'ine
+    yakın bir kayıt bulunur ve satırlarının en az min_overlap kadarı o
+    kayıtta varsa, bilinen satırlardaki adaylar konumları kaydırılarak
+    alınır; yalnızca yeni satırlar (birer satır komşuyla) taranır. Adaylar
+    yeni metinde yeniden doğrulanıp skorlanır, çünkü güven skoru komşu
+    satırlara bağlıdır. Kayıtlar pattern sürümü ve airline alt kümesi (key)
+    aynıysa kullanılır.
+    """
+
+    def __init__(self, max_distance: int = 6, min_overlap: float = 0.5,
+                 min_lines: int = 30, max_entries: int = 5000):
+        self.min_overlap = min_overlap
+        self.min_lines = min_lines
+        self.max_entries = max_entries
+        self._index = SimHashIndex(max_distance)
+        self._records: "OrderedDict[int, Tuple]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def plan(self, text: str, key) -> Optional[ScanPlan]:
+        """Metin için plan; kısa metinlerde None (normal tarama)"""
+        lines = split_lines(text)
+        if len(lines) < self.min_lines:
+            return None
+        plan = ScanPlan(lines, simhash(line[2] for line in lines), key)
+
+        with self._lock:
+            best = None
+            for _, record_id in self._index.query(plan.fingerprint):
+                record_key, known, results = self._records[record_id]
+                if record_key != key:
+                    continue
+                overlap = sum(1 for line in lines if line[2] in known) / len(lines)
+                if overlap >= self.min_overlap and (best is None or overlap > best[0]):
+                    best = (overlap, record_id)
+            if best is None:
+                return plan
+            self._records.move_to_end(best[1])
+            _, known, results = self._records[best[1]]
+
+        # Bilinen satırların sonuçlarını yeni konumlarına taşı
+        used = set()
+        unknown = []
+        for number, (start, end, line_hash) in enumerate(lines):
+            rows = results.get(line_hash, ())
+            # Satır başında başlayan aday önündeki alıntı/boşluk önekini de yutabilir
+            # ("[-\s]*\d{10}"); önek kopyadan kopyaya değiştiğinden bu satırlar yeniden taranır
+            if line_hash not in known or any(row[1] == 0 for row in rows):
+                unknown.append(number)
+                plan._starts.append(start)
+                plan._ends.append(end)
+            elif line_hash not in used:
+                used.add(line_hash)
+                for entry_index, offset, length in rows:
+                    plan.reused.append((entry_index, start + offset, start + offset + length))
+
+        # Yeni satırlar komşularıyla birlikte (satır aşan eşleşmeler için) aralıklara dönüşür
+        ranges = []
+        for number in unknown:
+            start = lines[max(0, number - 1)][0]
+            end = lines[min(len(lines) - 1, number + 1)][1]
+            if ranges and start <= ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+            else:
+                ranges.append((start, end))
+        plan.ranges = ranges
+        return plan
+
+    def add(self, plan: ScanPlan, candidates: List[Tuple[int, int, int]]):
+        """Taranmış metni tüm regex adaylarıyla, (entry indeksi, başlangıç, bitiş), indekse ekle"""
+        lines = plan.lines
+        starts = [line[0] for line in lines]
+        per_line: Dict[int, List[Tuple]] = {}
+        unsafe = set()
+        for entry_index, match_start, match_end in candidates:
+            number = _line_at(starts, match_start)
+            start, end, line_hash = lines[number] if number >= 0 else (0, 0, None)
+            if line_hash is None or match_start < start or match_end > end:
+                # Satır aşan eşleşmenin dokunduğu satırlar her seferinde yeniden taranır
+                for line in lines:
+                    if line[0] < match_end and line[1] > match_start:
+                        unsafe.add(line[2])
+                continue
+            row = (entry_index, match_start - start, match_end - match_start)
+            rows = per_line.setdefault(line_hash, [])
+            # Aynı satır metinde tekrar ediyorsa sonuç bir kez saklanır
+            if row not in rows:
+                rows.append(row)
+        known = {line[2] for line in lines} - unsafe
+        per_line = {line_hash: rows for line_hash, rows in per_line.items() if line_hash in known}
+
+        with self._lock:
+            record_id = self._next_id
+            self._next_id += 1
+            self._records[record_id] = (plan.key, known, per_line)
+            self._index.add(record_id, plan.fingerprint)
+            while len(self._records) > self.max_entries:
+                old_id, _ = self._records.popitem(last=False)
+                self._index.remove(old_id)
+
+
+def _line_at(starts: List[int], pos: int) -> int:
+    """pos'u içeren (ya da ondan önceki) satırın sırası"""
+    return bisect_right(starts, pos) - 1
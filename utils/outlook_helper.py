@@ -53,9 +53,20 @@ class OutlookHelper:
             body=msg.Body,
             sender=msg.SenderName,
             to=msg.To,
-            has_attachments=msg.Attachments.Count > 0
+            has_attachments=msg.Attachments.Count > 0,
+            sender_email=getattr(msg, "SenderEmailAddress", "") or "",
+            entry_id=getattr(msg, "EntryID", "") or "",
+            folder=OutlookHelper._folder_path(msg)
         )
 
+    @staticmethod
+    def _folder_path(msg) -> str:
+        """Mailin bulunduğu Outlook klasörünün yolu"""
+        try:
+            return msg.Parent.FolderPath
+        except Exception:
+            return ""
+
     def get_mail_content(self, msg):
         """Mail ve eklerinin içeriğini al"""
         content = []
@@ -109,3 +120,13 @@ class OutlookHelper:
         except Exception as e:
             print(f"Klasör getirme hatası: {str(e)}")
             return None
+
+    def get_mail_by_id(self, entry_id):
+        """Entry ID ile mail getir (klasör gezmeden)"""
+        try:
+            outlook = win32com.client.Dispatch("Outlook.Application")
+            namespace = outlook.GetNamespace("MAPI")
+            return namespace.GetItemFromID(entry_id)
+        except Exception as e:
+            print(f"Mail getirme hatası: {str(e)}")
+            return None
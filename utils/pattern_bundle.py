@@ -0,0 +1,217 @@
+import os
+import re
+import json
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+from utils.pattern_engine import PatternSetEngine, DigitRunPrefilter
+from utils.confidence_scorer import ConfidenceScorer
+from utils.check_digit import CHECK_DIGIT_RULES
+from utils.detection_cache import DetectionCache
+from utils.entity_extractor import EntityExtractor
+from utils.pattern_router import PatternRouter
+
+DEFAULT_PATTERN_FILE = "config/awb_patterns.json"
+
+
+class PatternBundle:
+    """awb_patterns.json'un derlenmiş, değiştirilemez bir sürümü.
+
+    Bir tarama başlarken bundle alınır ve tarama boyunca o bundle kullanılır;
+    dosya bu sırada değişse bile tarama tutarlı bir pattern seti görür.
+    """
+    __slots__ = ("version", "mtime", "config", "config_hash", "compiled_patterns",
+                 "pattern_engine", "confidence_scorer", "check_digit_rules",
+                 "streaming_config", "stream_overlap", "entity_extractor", "router")
+
+    def __init__(self, config: Dict, version: int = 0, mtime: float = 0.0):
+        self.version = version
+        self.mtime = mtime
+        self.config = config
+        patterns = config.get("patterns", {})
+
+        self.compiled_patterns = {}
+        for airline, data in patterns.items():
+            if data.get("enabled", True):
+                self.compiled_patterns[airline] = [
+                    re.compile(pattern, re.IGNORECASE)
+                    for pattern in data.get("patterns", [])
+                ]
+        # Rakam dizisi ön filtresi: AWB adayı olmayan metinler regex'e girmez
+        prefilter = None
+        prefilter_config = config.get("prefilter", {})
+        if prefilter_config.get("enabled", True):
+            prefilter = DigitRunPrefilter(patterns, prefilter_config.get("window_margin", 48))
+        # Tüm airline pattern'larını tarayan motor
+        self.pattern_engine = PatternSetEngine(patterns, prefilter=prefilter)
+        # Göstergeye yakınlık bazlı güven skoru (awb_patterns.json "confidence" bloğu)
+        self.confidence_scorer = ConfidenceScorer(config.get("confidence"))
+        # Airline bazında açılan kontrol hanesi doğrulaması ("check_digit": "mod7")
+        self.check_digit_rules = {
+            airline: CHECK_DIGIT_RULES[data["check_digit"]]
+            for airline, data in patterns.items()
+            if data.get("check_digit") in CHECK_DIGIT_RULES
+        }
+        # Çok büyük gövdeler parça parça taranır; overlap en uzun eşleşmeyi kapsar
+        self.streaming_config = {
+            "enabled": True,
+            "threshold": 1048576,
+            "chunk_size": 262144,
+            "segment_size": 2097152,
+            **config.get("streaming", {})
+        }
+        self.stream_overlap = self.pattern_engine.max_match_length() + 2 * (
+            prefilter.window_margin if prefilter else 0
+        )
+        # Fatura / beyanname / referans numaraları için tek geçişli çıkarıcı ("entities" bloğu)
+        self.entity_extractor = EntityExtractor(config.get("entities"))
+        # Pattern'lar değişince cache'lenmiş sonuçlar geçersiz olsun
+        self.config_hash = DetectionCache.config_hash(config)
+        # Gönderen/konu yönlendiricisi; yönetici yerine koymadan önce kurar
+        self.router: Optional[PatternRouter] = None
+
+    def __repr__(self):
+        return f"PatternBundle(v{self.version}, {self.config_hash})"
+
+
+class PatternBundleManager:
+    """Pattern dosyasını izleyen ve derlenmiş bundle'ı paylaştıran yönetici.
+
+    current() en fazla check_interval saniyede bir dosyanın mtime'ına bakar;
+    değişiklik varsa yeni bundle arka planda derlenir ve hazır olunca tek bir
+    atama ile yerine konur. O ana kadar eski bundle kullanılmaya devam eder.
+    Aynı process'teki AWBDetector, PatternLearner ve PatternManager aynı
+    yöneticiyi (get_pattern_bundles) kullanır.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATTERN_FILE, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._bundle: Optional[PatternBundle] = None
+        self._version = 0
+        self._last_check = 0.0
+        self._loaded_mtime = None
+        self._reloading = False
+        self._pending = False
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()  # Yeniden yüklemeler sırayla; eski okuma yeniyi ezmez
+        self._listeners: List[Callable[[PatternBundle], None]] = []
+        # Gönderen rotası istatistikleri bundle'lar arasında korunur (güncel bundle'ın router'ı)
+        self.router = PatternRouter(None, [])
+        self.reload(wait=True)
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def current(self) -> PatternBundle:
+        """Güncel bundle (gerekirse arka planda yeniden derlemeyi başlatır)"""
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if self._mtime() != self._loaded_mtime:
+                self.reload()
+        return self._bundle
+
+    def reload(self, wait: bool = False):
+        """Dosyayı yeniden yükle; wait=False ise derleme arka planda yapılır.
+
+        Arka planda bir yükleme sürerken gelen istek kaybolmaz, o yükleme
+        bitince bir kez daha yüklenir. wait=True süren yüklemenin bitmesini
+        bekler ve dosyayı kendisi okur.
+        """
+        if wait:
+            with self._reload_lock:
+                self._reload()
+            return
+        with self._lock:
+            if self._reloading:
+                self._pending = True
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload_loop, name="pattern-reload", daemon=True).start()
+
+    def _reload_loop(self):
+        while True:
+            with self._reload_lock:
+                self._reload()
+            with self._lock:
+                if not self._pending:
+                    self._reloading = False
+                    return
+                self._pending = False
+
+    def _reload(self):
+        try:
+            mtime = self._mtime()
+            config = self._load_config()
+            if config is None:
+                # Okunamayan (ör. yarım yazılmış) dosyada eski bundle korunur
+                self._loaded_mtime = mtime
+                if self._bundle is None:
+                    self._swap(PatternBundle({"patterns": {}}), mtime)
+                return
+            self._swap(PatternBundle(config), mtime)
+        except Exception as e:
+            print(f"Pattern derleme hatası: {str(e)}")
+
+    def _load_config(self) -> Optional[Dict]:
+        try:
+            with open(self.path, "r", encoding='utf-8') as f:
+                return json.load(f)
+        except UnicodeDecodeError:
+            print("UTF-8 encoding hatası, json_fixer.py çalıştırılmalı")
+        except Exception as e:
+            print(f"Pattern yükleme hatası: {str(e)}")
+        return None
+
+    def _swap(self, bundle: PatternBundle, mtime: Optional[float]):
+        """Yeni bundle'ı yerine koy ve dinleyicilere bildir"""
+        # Router bundle ile birlikte kurulur; okuyucular bundle'ı hep kendi router'ıyla görür
+        bundle.router = PatternRouter(bundle.config.get("routing"), bundle.pattern_engine.labels, [
+            airline for airline, data in bundle.config.get("patterns", {}).items()
+            if not data.get("prefix")
+        ], shared=self.router)
+        with self._lock:
+            self._version += 1
+            bundle.version = self._version
+            bundle.mtime = mtime or 0.0
+            self.router = bundle.router
+            self._bundle = bundle
+            self._loaded_mtime = mtime
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(bundle)
+            except Exception as e:
+                print(f"Pattern güncelleme bildirimi hatası: {str(e)}")
+
+    def subscribe(self, listener: Callable[[PatternBundle], None]):
+        """Yeni bundle yerine konduğunda çağrılacak fonksiyonu kaydet"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def write_config(self, config: Dict):
+        """Config'i dosyaya atomik yaz ve yeni bundle hazır olana kadar bekle"""
+        temp_file = f"{self.path}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=4, ensure_ascii=False)
+        os.replace(temp_file, self.path)
+        self.reload(wait=True)
+
+
+_managers: Dict[str, PatternBundleManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_pattern_bundles(path: str = DEFAULT_PATTERN_FILE) -> PatternBundleManager:
+    """Dosya başına process içinde tek bir bundle yöneticisi"""
+    key = os.path.abspath(path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = PatternBundleManager(path)
+        return manager
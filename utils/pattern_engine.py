@@ -0,0 +1,289 @@
+import re
+from bisect import bisect_right
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+from typing import Dict, List, Tuple, Optional, Iterable
+
+# Pattern'ın gömülebilirlik denemesinde kullanılan sarma grubu öneki
+GROUP_PREFIX = "_p"
+
+# Ayraçlara (boşluk/tire) toleranslı rakam dizileri: "235-1234 5678" tek dizi sayılır
+_DIGIT_RUN = re.compile(r'\d+(?:[-\s]+\d+)*')
+_SEPARATORS = re.compile(r'[-\s]+')
+_TOKEN_TAIL = re.compile(r'\S*')
+
+
+class PatternEntry:
+    """Tarama motoru içindeki tek bir pattern kaydı"""
+    __slots__ = ("index", "label", "pattern_index", "source", "regex", "combinable")
+
+    def __init__(self, index: int, label: str, pattern_index: int, source: str, regex, combinable: bool):
+        self.index = index                  # Motor içindeki sıra (airline sırası x pattern sırası)
+        self.label = label                  # Airline adı (awb_patterns.json anahtarı)
+        self.pattern_index = pattern_index  # Airline'ın "patterns" listesindeki sırası
+        self.source = source
+        self.regex = regex
+        self.combinable = combinable
+
+    def __repr__(self):
+        return f"PatternEntry({self.label}#{self.pattern_index}: {self.source})"
+
+
+class SpanSet:
+    """Kabul edilmiş eşleşme aralıklarının birleşimi (sıralı, çakışmasız).
+
+    Aynı airline'ın farklı pattern'ları çoğu zaman aynı metni yakalar;
+    kabul edilen bir aralığın içinde kalan aday sonradan aynı AWB'yi
+    üreteceğinden doğrulama/fuzzy/skor adımlarına girmeden atlanır.
+    """
+    __slots__ = ("starts", "ends")
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+
+    def covers(self, start: int, end: int) -> bool:
+        """[start, end) tamamen kabul edilmiş bir aralığın içinde mi"""
+        i = bisect_right(self.starts, start) - 1
+        return i >= 0 and self.ends[i] >= end
+
+    def add(self, start: int, end: int):
+        """Aralığı ekle, komşu/çakışan aralıklarla birleştir"""
+        i = bisect_right(self.starts, start)
+        # Soldaki aralık yeni aralığa değiyorsa onunla birleş
+        if i > 0 and self.ends[i - 1] >= start:
+            i -= 1
+            start = self.starts[i]
+            end = max(end, self.ends[i])
+        j = i
+        while j < len(self.starts) and self.starts[j] <= end:
+            end = max(end, self.ends[j])
+            j += 1
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+
+class DigitRunPrefilter:
+    """Metni rakam dizilerine ayırıp aday pencereleri çıkaran ön filtre.
+
+    Her airline'ın prefix/length bilgisinden prefix -> airline hash tablosu
+    kurulur. Metin tek seferde rakam dizilerine bölünür, yeterince uzun olan
+    dizilerin prefix'leri tabloda aranır ve yalnızca aday dizilerin çevresi
+    (pencere) regex ile taranır. AWB içermeyen mailler regex'e hiç girmez.
+
+    Numarası harf içeren airline'lar (UPS 1Z..., 25AT...) rakam dizisi
+    modeline uymadığından tüm metinde taranır; prefix'i metinde hiç
+    geçmiyorsa onlar da atlanır.
+    """
+
+    def __init__(self, pattern_config: Dict, window_margin: int = 48):
+        self.window_margin = window_margin
+        self.unprefixed = []      # [(airline, length)] prefix'siz rakam airline'ları (DHL vb.)
+        self.prefix_tables = {}   # prefix uzunluğu -> {prefix: [(airline, length)]}
+        self.passthrough = []     # [(airline, [küçük harf prefix'ler])] tüm metinde taranacaklar
+        lengths = []
+
+        for airline, data in pattern_config.items():
+            if not data.get("enabled", True):
+                continue
+            prefix = data.get("prefix") or ""
+            prefixes = [p for p in (prefix if isinstance(prefix, list) else [prefix]) if p]
+            length = int(data.get("length", 0) or 0)
+
+            if not self._is_numeric(prefixes, length, data.get("format_examples", [])):
+                self.passthrough.append((airline, [p.lower() for p in prefixes]))
+                continue
+
+            lengths.append(length)
+            if not prefixes:
+                self.unprefixed.append((airline, length))
+            for p in prefixes:
+                self.prefix_tables.setdefault(len(p), {}).setdefault(p, []).append((airline, length))
+
+        self.min_length = min(lengths) if lengths else 0
+        # Prefix uzunluğu başına tek regex: dizideki tüm prefix konumları C tarafında bulunur
+        self.prefix_scanners = [
+            (re.compile("(?=(" + "|".join(sorted(table)) + "))"), table)
+            for table in self.prefix_tables.values()
+        ]
+
+    @staticmethod
+    def _is_numeric(prefixes: List[str], length: int, examples: List[str]) -> bool:
+        """Airline numarası tamamen rakamlardan mı oluşuyor"""
+        if length <= 0 or not examples:
+            return False
+        if not all(p.isdigit() for p in prefixes):
+            return False
+        # Örneklerin son `length` karakteri (ayraçsız) rakam olmalı
+        return all(_SEPARATORS.sub('', ex)[-length:].isdigit() for ex in examples)
+
+    def _airlines_for(self, digits: str) -> set:
+        """Rakam dizisinde geçebilecek airline'lar"""
+        n = len(digits)
+        airlines = {airline for airline, length in self.unprefixed if n >= length}
+        last = n - self.min_length
+        for scanner, table in self.prefix_scanners:
+            for found in scanner.finditer(digits):
+                i = found.start()
+                if i > last:
+                    break
+                for airline, length in table[found.group(1)]:
+                    if n - i >= length:
+                        airlines.add(airline)
+        return airlines
+
+    def candidates(self, text: str) -> Tuple[List[Tuple[int, int, set]], List[str]]:
+        """(başlangıç, bitiş, airline'lar) pencereleri ve tüm metinde taranacak airline'lar"""
+        windows = []
+        margin = self.window_margin
+        text_length = len(text)
+
+        for run in _DIGIT_RUN.finditer(text):
+            run_text = run.group()
+            digits = run_text if run_text.isdigit() else _SEPARATORS.sub('', run_text)
+            if len(digits) < self.min_length:
+                continue
+            airlines = self._airlines_for(digits)
+            if not airlines:
+                continue
+
+            # Pencereyi kelime sınırına genişlet ki "/ABC" gibi ekler kesilmesin
+            start = max(0, run.start() - margin)
+            if start:
+                boundary = max(text.rfind(' ', start - margin, start), text.rfind('\n', start - margin, start))
+                if boundary >= 0:
+                    start = boundary + 1
+            end = min(text_length, run.end() + margin)
+            end = _TOKEN_TAIL.match(text, end, end + margin).end()
+
+            if windows and start <= windows[-1][1]:
+                last_start, last_end, last_airlines = windows[-1]
+                windows[-1] = (last_start, max(last_end, end), last_airlines | airlines)
+            else:
+                windows.append((start, end, airlines))
+
+        lowered = None
+        passthrough = []
+        for airline, prefixes in self.passthrough:
+            if prefixes:
+                if lowered is None:
+                    lowered = text.lower()
+                if not any(p in lowered for p in prefixes):
+                    continue
+            passthrough.append(airline)
+
+        return windows, passthrough
+
+
+class PatternSetEngine:
+    """Tüm airline pattern'larını bir arada tutan tarama motoru.
+
+    Her pattern kendi derlenmiş regex'iyle finditer ile taranır; regex
+    motoru sabit başlangıçlı (prefix'li) pattern'larda metinde doğrudan o
+    öneke atlar. Tüm pattern'ları tek bir alternation'da birleştirmek bu
+    atlamayı bozduğu için (ör. "[-\\s]*" ile başlayan alternatifler) yapılmaz.
+    Sonuçlar pattern sırasına ve konuma göre sıralı döner.
+    """
+
+    def __init__(self, pattern_config: Dict, flags: int = re.IGNORECASE,
+                 prefilter: Optional[DigitRunPrefilter] = None):
+        self.flags = flags
+        self.prefilter = prefilter
+        self.entries: List[PatternEntry] = []
+        self.labels: List[str] = []
+        self.by_label: Dict[str, List[PatternEntry]] = {}
+
+        for label, data in pattern_config.items():
+            if not data.get("enabled", True):
+                continue
+            self.labels.append(label)
+            for pattern_index, source in enumerate(data.get("patterns", [])):
+                try:
+                    regex = re.compile(source, flags)
+                except re.error as e:
+                    print(f"Geçersiz pattern atlandı ({label}): {source} - {str(e)}")
+                    continue
+                entry = PatternEntry(
+                    len(self.entries), label, pattern_index, source, regex,
+                    self._is_combinable(source)
+                )
+                self.entries.append(entry)
+                self.by_label.setdefault(label, []).append(entry)
+
+    def max_match_length(self, cap: int = 256) -> int:
+        """En uzun eşleşmenin tahmini uzunluğu (sınırsız tekrarlar cap ile sınırlanır)"""
+        longest = 0
+        for entry in self.entries:
+            try:
+                width = sre_parse.parse(entry.source, self.flags).getwidth()[1]
+            except Exception:
+                width = cap
+            longest = max(longest, min(width, cap))
+        return longest
+
+    def _is_combinable(self, source: str) -> bool:
+        """Pattern bir sarma grubu içine güvenle gömülebilir mi (toplu çıkarım için)"""
+        # Numaralı/isimli geri referanslar grup numaraları kaydığı için bozulur
+        if re.search(r'\\[1-9]|\(\?P=', source):
+            return False
+        try:
+            # Global flag'ler ((?i) vb.) ve çakışan grup adları burada hata verir
+            re.compile(f"(?:)|(?P<{GROUP_PREFIX}0>{source})", self.flags)
+            return True
+        except re.error:
+            return False
+
+    def _entries_for(self, labels: Optional[Iterable[str]]) -> List[PatternEntry]:
+        """İstenen airline alt kümesine ait pattern kayıtları (motor sırasıyla)"""
+        if labels is None:
+            return self.entries
+        by_label = self.by_label
+        return sorted((entry for label in set(labels) for entry in by_label.get(label, ())),
+                      key=lambda entry: entry.index)
+
+    def scan(self, text: str, labels: Optional[Iterable[str]] = None,
+             pos: int = 0, endpos: Optional[int] = None) -> List[Tuple[PatternEntry, "re.Match"]]:
+        """Metni tara, (pattern kaydı, match) listesi dön.
+
+        Sonuçlar pattern sırasına ve ardından konuma göre sıralıdır; yani her
+        pattern için ayrı ayrı finditer çalıştırmakla aynı sırayı verir.
+        """
+        if not text:
+            return []
+        if endpos is None:
+            endpos = len(text)
+
+        hits = []
+        for entry in self._entries_for(labels):
+            for entry_match in entry.regex.finditer(text, pos, endpos):
+                hits.append((entry, entry_match))
+        return hits
+
+    def scan_candidates(self, text: str, labels: Optional[Iterable[str]] = None) -> List[Tuple[PatternEntry, "re.Match"]]:
+        """Ön filtreden geçen pencereleri tara; ön filtre yoksa tüm metni tara"""
+        if not text:
+            return []
+        if self.prefilter is None:
+            return self.scan(text, labels)
+
+        wanted = set(labels) if labels is not None else None
+        windows, passthrough = self.prefilter.candidates(text)
+        hits = []
+        by_label = self.by_label
+        # Pencere başına yeni regex kurulmaz; penceredeki her airline'ın kendi pattern'ları taranır
+        for start, end, airlines in windows:
+            for airline in airlines:
+                if wanted is not None and airline not in wanted:
+                    continue
+                for entry in by_label.get(airline, ()):
+                    for entry_match in entry.regex.finditer(text, start, end):
+                        hits.append((entry, entry_match))
+        if wanted is not None:
+            passthrough = [airline for airline in passthrough if airline in wanted]
+        if passthrough:
+            hits.extend(self.scan(text, passthrough))
+
+        hits.sort(key=lambda hit: (hit[0].index, hit[1].start()))
+        return hits
@@ -1,86 +1,115 @@
-import json
 import re
-from typing import Dict, List
-from collections import defaultdict
+import os
+import json
+from typing import Dict, Iterable, List
+from utils.pattern_bundle import get_pattern_bundles
+from utils.count_min_sketch import CountMinSketch, HeavyHitters
+
+_WORD = re.compile(r'\b\w+\b')
+# Öğrenilen pattern'da bulunmaması gereken HTML/CSS artıkları (küçük harf; karşılaştırma harf duyarsız)
+HTML_CSS_WORDS = frozenset({'span', 'div', 'p', 'b', 'h3', 'color', 'serif', 'black', 'none',
+                            'mso', 'ligatures', 'subject'})
+_HTML_WORDS = re.compile(r'\b(?:' + '|'.join(sorted(HTML_CSS_WORDS)) + r')\b', re.IGNORECASE)
+
 
 class PatternLearner:
-    def __init__(self, pattern_file="config/awb_patterns.json"):
+    """Detector'ın bulduğu eşleşmelerin çevresinden yeni pattern adayları öğrenir.
+
+    Metin yeniden taranmaz; eşleşmelerin context'i (öncesi/sonrası) kullanılır.
+    Aday pattern'lar sabit boyutlu bir count-min sketch'te sayılır, yalnızca
+    en sık capacity aday bellekte tutulur; save_learned_patterns bu adayları
+    learned_file'a atomik yazar (awb_patterns.json'a dokunulmaz).
+    """
+
+    def __init__(self, pattern_file="config/awb_patterns.json",
+                 learned_file="cache/learned_patterns.json",
+                 width: int = 65536, depth: int = 4, capacity: int = 200):
         self.pattern_file = pattern_file
-        self.load_patterns()
-        self.learned_patterns = defaultdict(int)
+        self.learned_file = learned_file
+        # AWBDetector ile aynı derlenmiş pattern seti (dosya değişince kendiliğinden yenilenir)
+        self.bundles = get_pattern_bundles(pattern_file)
+        self.sketch = CountMinSketch(width, depth)
+        self.heavy_hitters = HeavyHitters(self.sketch, capacity)
+        self.load_learned_patterns()
         
     def load_patterns(self):
-        """Pattern'ları yükle"""
+        """Pattern'ları hemen yeniden yükle"""
+        self.bundles.reload(wait=True)
+
+    @property
+    def patterns(self) -> Dict:
+        """Güncel pattern config'i (salt okunur)"""
+        return self.bundles.current().config
+
+    @property
+    def learned_patterns(self) -> Dict[str, int]:
+        """Takip edilen adaylar: pattern -> tahmini tekrar sayısı"""
+        learned = {}
+        for key, count in self.heavy_hitters.top():
+            pattern = key.split("\t", 1)[1]
+            learned[pattern] = learned.get(pattern, 0) + count
+        return learned
+
+    def learn_from_matches(self, matches: Iterable):
+        """Detector sonuçlarından (AWBMatch veya eşdeğer dict) öğren"""
         try:
-            with open(self.pattern_file, 'r', encoding='utf-8') as f:
-                self.patterns = json.load(f)
+            for match in matches:
+                if match.get("location") == "AI Analiz":
+                    continue
+                context = match["context"]
+                self._learn(match["airline"], match["match_text"],
+                            context.get("before", ""), context.get("after", ""))
         except Exception as e:
-            print(f"Pattern yükleme hatası: {str(e)}")
-            self.patterns = {"patterns": {}}
+            print(f"Pattern öğrenme hatası: {str(e)}")
 
     def learn_from_text(self, text: str, context: Dict = None):
-        """Metinden yeni pattern'lar öğren"""
+        """Metinden yeni pattern'lar öğren.
+
+        context["results"] verilmişse (detector sonuçları) metin taranmaz;
+        verilmemişse bundle'ın pattern motoruyla taranır.
+        """
         try:
-            known_patterns = []
-            
-            # Mail içeriğinde AWB bul
-            for airline, data in self.patterns["patterns"].items():
-                for pattern in data.get("patterns", []):
-                    matches = list(re.finditer(pattern, text, re.IGNORECASE))
-                    for match in matches:
-                        # Match objesinin start ve end pozisyonlarını kullan
-                        start_pos = match.start()
-                        end_pos = match.end()
-                        
-                        # Öncesi ve sonrası için context al
-                        pre_text = text[max(0, start_pos-50):start_pos]
-                        post_text = text[end_pos:min(len(text), end_pos+50)]
-                        
-                        known_patterns.append({
-                            "pattern": pattern,
-                            "match": match.group(),
-                            "airline": airline,
-                            "pre_text": pre_text,
-                            "post_text": post_text
-                        })
-            
-            # Her pattern için analiz yap
-            for known in known_patterns:
+            results = (context or {}).get("results")
+            if results is not None:
+                self.learn_from_matches(results)
+                return
+            for entry, match in self.bundles.current().pattern_engine.scan(text):
+                start_pos, end_pos = match.start(), match.end()
                 self._analyze_context(
-                    known["pre_text"], 
-                    known["post_text"], 
-                    known
+                    text[max(0, start_pos - 50):start_pos],
+                    text[end_pos:end_pos + 50],
+                    {"match": match.group(), "airline": entry.label}
                 )
-                
-            # Öğrenilen pattern'ları kaydet
-            if len(self.learned_patterns) > 0:
-                self.save_learned_patterns()
-                
         except Exception as e:
             print(f"Pattern öğrenme hatası: {str(e)}")
             
     def _analyze_context(self, pre_text: str, post_text: str, known: Dict):
         """Pattern kontekstini analiz et"""
-        # Önceki metinde tekrar eden yapıları bul
-        pre_patterns = re.findall(r'\b\w+\b', pre_text)
-        pre_special = re.findall(r'[^\w\s]', pre_text)
-        
-        # Sonraki metinde tekrar eden yapıları bul
-        post_patterns = re.findall(r'\b\w+\b', post_text)
-        post_special = re.findall(r'[^\w\s]', post_text)
-        
-        # Pattern oluştur ve skorla
-        pattern = self._create_pattern(known["match"], pre_patterns[-3:], post_patterns[:3])
-        self.learned_patterns[pattern] += 1
+        self._learn(known["airline"], known["match"], pre_text, post_text)
+
+    def _learn(self, airline: str, match_text: str, pre_text: str, post_text: str):
+        """Eşleşmenin önceki/sonraki 3 kelimesinden aday pattern üret ve say"""
+        pre_patterns = _WORD.findall(pre_text)
+        post_patterns = _WORD.findall(post_text)
+        pattern = self._create_pattern(match_text, pre_patterns[-3:], post_patterns[:3])
+        self.heavy_hitters.add(f"{airline}\t{pattern}")
+
+    def top_candidates(self, min_occurrences: int = 3, limit: int = None) -> Dict[str, List[Dict]]:
+        """Airline başına en sık adaylar: {airline: [{"pattern", "count"}]}"""
+        candidates: Dict[str, List[Dict]] = {}
+        for key, count in self.heavy_hitters.top(limit):
+            airline, pattern = key.split("\t", 1)
+            if count < min_occurrences or _HTML_WORDS.search(pattern):
+                continue
+            candidates.setdefault(airline, []).append({"pattern": pattern, "count": count})
+        return candidates
 
     def _create_pattern(self, match: str, pre: List[str], post: List[str]) -> str:
         """Yeni pattern oluştur"""
         
         # HTML ve CSS etiketlerini filtrele
         def filter_html_css(words):
-            html_css = {'span', 'div', 'p', 'b', 'h3', 'color', 'serif', 'black', 'none', 
-                       'mso', 'ligatures', 'Subject'}
-            return [w for w in words if w.lower() not in html_css]
+            return [w for w in words if w.lower() not in HTML_CSS_WORDS]
         
         pre = filter_html_css(pre)
         post = filter_html_css(post)
@@ -101,26 +130,30 @@ class PatternLearner:
             
         return pattern
 
-    def save_learned_patterns(self):
-        """Öğrenilen pattern'ları kaydet"""
+    def save_learned_patterns(self, min_occurrences: int = 3):
+        """En sık adayları learned_file'a atomik kaydet"""
+        temp_file = f"{self.learned_file}.tmp"
         try:
-            min_occurrences = 3
-            
-            # Sadece belirli formattaki pattern'ları kabul et
-            valid_patterns = {}
-            for pattern, count in self.learned_patterns.items():
-                if (count >= min_occurrences and 
-                    not re.search(r'(?:span|div|p|b|h3|color|serif|black|none|mso|ligatures|Subject)', pattern)):
-                    valid_patterns[pattern] = count
-            
-            # Her airline için pattern'ları güncelle
-            for airline in self.patterns["patterns"]:
-                base_patterns = self.patterns["patterns"][airline]["patterns"][:2]  # İlk 2 pattern'ı koru
-                self.patterns["patterns"][airline]["patterns"] = base_patterns
-            
-            # Kaydet
-            with open(self.pattern_file, 'w', encoding='utf-8') as f:
-                json.dump(self.patterns, f, indent=4, ensure_ascii=False)
-                
+            directory = os.path.dirname(self.learned_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({"patterns": self.top_candidates(min_occurrences)}, f, ensure_ascii=False, indent=4)
+            os.replace(temp_file, self.learned_file)
         except Exception as e:
             print(f"Pattern kaydetme hatası: {str(e)}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def load_learned_patterns(self):
+        """Kayıtlı adayları sayaçlarıyla geri yükle"""
+        try:
+            if not self.learned_file or not os.path.exists(self.learned_file):
+                return
+            with open(self.learned_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for airline, candidates in data.get("patterns", {}).items():
+                for candidate in candidates:
+                    self.heavy_hitters.add(f"{airline}\t{candidate['pattern']}", candidate.get("count", 1))
+        except Exception as e:
+            print(f"Öğrenilen pattern yükleme hatası: {str(e)}")
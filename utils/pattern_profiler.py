@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import time
+import multiprocessing
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+from typing import Dict, List, Optional, Tuple
+
+# awb_patterns.json "profiler" bloğunun varsayılanları
+DEFAULT_PROFILER_CONFIG = {
+    "corpus_path": "cache/mail_cache.db",
+    "corpus_limit": 300,
+    "budget_ms_per_mb": 250.0,       # Örnek mail seti üzerinde MB başına izin verilen süre
+    "worst_case_budget_ms": 100.0,   # Tek bir girdide (kötü durum dahil) izin verilen süre
+    "adversarial_length": 4096,
+    "timeout": 10.0                  # Profil process'i bu süreyi aşarsa pattern reddedilir
+}
+
+_MB = 1024 * 1024
+_FILLER = (
+    "Merhaba, ekteki gönderi için bilgileri paylaşıyoruz. Fatura no INV-2024-0042, "
+    "tarih 12.03.2024, tel +90 212 555 01 02. Shipment tracking details below.\n"
+)
+
+
+def load_corpus(path: str, limit: int = 300) -> List[str]:
+    """Mail cache'inden örnek metinler (konu + gövde); yoksa boş liste"""
+    try:
+        if not path or not os.path.exists(path):
+            return []
+        if path.endswith(".db"):
+            from utils.cache_manager import CacheManager
+            mails = CacheManager({"cache": {"db_path": path}}).list_mails(limit=limit, with_body=True)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                mails = json.load(f).get("mails", [])
+        texts = []
+        for mail in mails[:limit]:
+            text = f"{mail.get('subject') or ''}\n{mail.get('body') or ''}"
+            if text.strip():
+                texts.append(text)
+        return texts
+    except Exception as e:
+        print(f"Profil örnek seti yükleme hatası: {str(e)}")
+        return []
+
+
+def synthetic_corpus(examples: List[str], count: int = 50) -> List[str]:
+    """Cache boşsa format örneklerini dolgu metnine gömerek örnek set üret"""
+    texts = []
+    for i in range(count):
+        body = _FILLER * (1 + i % 8)
+        if examples and i % 2 == 0:
+            example = examples[i // 2 % len(examples)]
+            middle = len(body) // 2
+            body = f"{body[:middle]} AWB: {example} {body[middle:]}"
+        texts.append(body)
+    return texts
+
+
+def _literal_prefix(source: str) -> str:
+    """Pattern'ın başındaki sabit karakterler (kötü durum girdilerini pattern'a yaklaştırmak için)"""
+    prefix = []
+    try:
+        for op, value in sre_parse.parse(source):
+            if op is not sre_parse.LITERAL:
+                break
+            prefix.append(chr(value))
+    except Exception:
+        pass
+    return "".join(prefix)
+
+
+def adversarial_inputs(sources: List[str], length: int = 4096) -> List[Tuple[str, str]]:
+    """Geri izleme patlamasını tetikleyebilecek (ad, metin) girdileri.
+
+    Uzun rakam/ayraç/harf dizileri sonda eşleşmeyi bozan bir karakterle
+    biter; pattern'ın sabit öneki de dizinin başına eklenir.
+    """
+    half = length // 2
+    end = "\x00"  # Pattern'ların eşleşmeyeceği bitiş karakteri
+    inputs = [
+        ("rakam dizisi", "1" * length + end),
+        ("rakam + boşluk", "1 " * half + end),
+        ("rakam + tire", "1-" * half + end),
+        ("boşluk dizisi", " " * length + end),
+        ("harf dizisi", "a" * length + end),
+        ("harf + rakam", "a1" * half + end)
+    ]
+    for prefix in sorted({_literal_prefix(source) for source in sources} - {""}):
+        inputs.append((f"'{prefix}' + ayraç", prefix + "- " * half + end))
+        inputs.append((f"'{prefix}' tekrarı", (prefix + " ") * max(1, length // (len(prefix) + 1))))
+    return inputs
+
+
+def nested_quantifiers(source: str) -> bool:
+    """Pattern'da iç içe sınırsız tekrar var mı ((\\d+)*, (a|a)+ gibi); statik uyarı için"""
+    repeats = (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+
+    def walk(items, inside_repeat: bool) -> bool:
+        for op, value in items:
+            if op in repeats:
+                low, high, sub = value
+                unbounded = high == sre_parse.MAXREPEAT
+                if unbounded and inside_repeat:
+                    return True
+                if walk(sub, inside_repeat or unbounded):
+                    return True
+            elif op is sre_parse.SUBPATTERN:
+                if walk(value[-1], inside_repeat):
+                    return True
+            elif op is sre_parse.BRANCH:
+                if any(walk(branch, inside_repeat) for branch in value[1]):
+                    return True
+        return False
+
+    try:
+        return walk(sre_parse.parse(source), False)
+    except Exception:
+        return False
+
+
+def _measure(sources: List[str], corpus: List[str], adversarial_length: int) -> Dict:
+    """Profil ölçümü (ayrı process'te çalışır ki takılan pattern uygulamayı dondurmasın)"""
+    regexes = [re.compile(source, re.IGNORECASE) for source in sources]
+    size = sum(len(text.encode('utf-8')) for text in corpus) or 1
+    # Küçük örnek setlerde ölçüm gürültüsü azalsın diye set birkaç kez taranır
+    rounds = min(20, max(1, _MB // size))
+
+    hits = 0
+    matches = 0
+    worst_ns = 0
+    worst_input = ""
+    started = time.perf_counter_ns()
+    for round_number in range(rounds):
+        for number, text in enumerate(corpus):
+            text_started = time.perf_counter_ns()
+            found = 0
+            for regex in regexes:
+                for _ in regex.finditer(text):
+                    found += 1
+            elapsed = time.perf_counter_ns() - text_started
+            if elapsed > worst_ns:
+                worst_ns, worst_input = elapsed, f"mail #{number + 1}"
+            if round_number == 0:
+                hits += int(found > 0)
+                matches += found
+    corpus_ns = time.perf_counter_ns() - started
+
+    for name, text in adversarial_inputs(sources, adversarial_length):
+        text_started = time.perf_counter_ns()
+        for regex in regexes:
+            for _ in regex.finditer(text):
+                pass
+        elapsed = time.perf_counter_ns() - text_started
+        if elapsed > worst_ns:
+            worst_ns, worst_input = elapsed, name
+
+    return {
+        "ms_per_mb": corpus_ns / 1e6 / (size * rounds / _MB),
+        "hit_rate": hits / len(corpus) if corpus else 0.0,
+        "matches": matches,
+        "worst_case_ms": worst_ns / 1e6,
+        "worst_case_input": worst_input
+    }
+
+
+def _profile_worker(conn, sources, corpus, adversarial_length):
+    try:
+        conn.send(_measure(sources, corpus, adversarial_length))
+    except Exception as e:
+        conn.send({"error": str(e)})
+    finally:
+        conn.close()
+
+
+class PatternProfile:
+    """Bir pattern listesinin örnek set ve kötü durum girdileri üzerindeki ölçümü"""
+
+    def __init__(self, sources: List[str], config: Dict, corpus_source: str, corpus_size: int,
+                 result: Optional[Dict] = None, error: str = None, timed_out: bool = False):
+        result = result or {}
+        self.sources = sources
+        self.config = config
+        self.corpus_source = corpus_source  # "cache" veya "synthetic"
+        self.corpus_size = corpus_size
+        self.ms_per_mb = result.get("ms_per_mb", 0.0)
+        self.hit_rate = result.get("hit_rate", 0.0)
+        self.matches = result.get("matches", 0)
+        self.worst_case_ms = result.get("worst_case_ms", 0.0)
+        self.worst_case_input = result.get("worst_case_input", "")
+        self.error = error or result.get("error")
+        self.timed_out = timed_out
+        self.nested = [source for source in sources if nested_quantifiers(source)]
+
+    @property
+    def within_budget(self) -> bool:
+        if self.error or self.timed_out:
+            return False
+        return (self.ms_per_mb <= self.config["budget_ms_per_mb"]
+                and self.worst_case_ms <= self.config["worst_case_budget_ms"])
+
+    def summary(self) -> str:
+        """Dialog'da gösterilecek kısa rapor"""
+        if self.error:
+            return f"Pattern hatası: {self.error}"
+        if self.timed_out:
+            return (f"Profil {self.config['timeout']:.0f} sn içinde bitmedi "
+                    f"(muhtemel geri izleme patlaması)")
+        lines = [
+            f"Süre: {self.ms_per_mb:.1f} ms/MB (bütçe {self.config['budget_ms_per_mb']:.0f})",
+            f"İsabet: %{self.hit_rate * 100:.0f} ({self.matches} eşleşme, "
+            f"{self.corpus_size} mail, {'cache' if self.corpus_source == 'cache' else 'örnek'})",
+            f"En kötü girdi: {self.worst_case_ms:.2f} ms - {self.worst_case_input} "
+            f"(bütçe {self.config['worst_case_budget_ms']:.0f})"
+        ]
+        if self.nested:
+            lines.append("Uyarı: iç içe sınırsız tekrar içeren pattern var")
+        return "\n".join(lines)
+
+
+def profile_patterns(sources: List[str], config: Dict = None,
+                     examples: List[str] = None) -> PatternProfile:
+    """Pattern'ları örnek mail setinde ve kötü durum girdilerinde ölç.
+
+    Ölçüm ayrı bir process'te yapılır; timeout aşılırsa process sonlandırılır
+    ve profil bütçe dışı sayılır.
+    """
+    config = {**DEFAULT_PROFILER_CONFIG, **(config or {})}
+    corpus = load_corpus(config["corpus_path"], config["corpus_limit"])
+    corpus_source = "cache"
+    if not corpus:
+        corpus = synthetic_corpus(examples or [])
+        corpus_source = "synthetic"
+
+    for source in sources:
+        try:
+            re.compile(source, re.IGNORECASE)
+        except re.error as e:
+            return PatternProfile(sources, config, corpus_source, len(corpus),
+                                  error=f"{source} - {str(e)}")
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_profile_worker,
+        args=(sender, sources, corpus, config["adversarial_length"]),
+        daemon=True
+    )
+    process.start()
+    sender.close()
+    result = None
+    try:
+        if receiver.poll(config["timeout"]):
+            result = receiver.recv()
+    except EOFError:
+        result = {"error": "Profil process'i beklenmedik şekilde kapandı"}
+    finally:
+        receiver.close()
+        if process.is_alive():
+            process.terminate()
+        process.join()
+
+    return PatternProfile(sources, config, corpus_source, len(corpus),
+                          result=result, timed_out=result is None)
@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_EMAIL_DOMAIN = re.compile(r'@([A-Za-z0-9.-]+)')
+
+
+class _RouterState:
+    """Aynı dosyanın router'ları arasında paylaşılan öğrenme durumu"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.sender_stats = defaultdict(lambda: {"mails": 0, "pinned": set(), "airlines": defaultdict(int)})
+        self.routed = defaultdict(int)
+        self.dirty = False
+        self.loaded = False
+        self.read_only = False
+
+
+class PatternRouter:
+    """Gönderen domain'i / konu anahtar kelimesine göre airline alt kümesi seçen yönlendirici.
+
+    Kurallar awb_patterns.json "routing" bloğundan okunur:
+        {"sender_domain": "dhl.com", "airlines": ["DHL"]}
+        {"sender_keyword": "turkish cargo", "airlines": ["THY"]}
+        {"subject_keyword": "HAVAS", "airlines": ["HAVAŞ", "THY"]}
+    İlk eşleşen kural kazanır. Kural yoksa gönderen için öğrenilmiş rota
+    kullanılır: bir gönderenden yeterince mail gelmiş ve bulunan AWB'lerin
+    büyük kısmı birkaç airline'a aitse bu airline'lar otomatik rota olur.
+    Prefix'siz (genel) pattern'lar sayıma girmez, her rotaya eklenir. Rotalı
+    her verify_every'inci mail yine tüm set ile taranır; rota dışı bir AWB
+    çıkarsa rota düşürülür. Rota yoksa None döner (tüm pattern'lar).
+    """
+
+    def __init__(self, config: Optional[Dict], airlines: List[str], generic: Iterable[str] = (),
+                 shared: Optional["PatternRouter"] = None):
+        # Pattern dosyası her değiştiğinde bundle'a yeni bir router kurulur; gönderen
+        # istatistikleri (shared verilirse) önceki router'larla ortak kalır
+        self._state = shared._state if shared is not None else _RouterState()
+        self._lock = self._state.lock
+        self._save_lock = self._state.save_lock  # Yazma ve os.replace tek seferde bir thread'de
+        self._sender_stats = self._state.sender_stats
+        self._routed = self._state.routed  # Öğrenilmiş rotayla taranan mail sayısı (doğrulama örneklemesi)
+        self.learned_routes: Dict[str, List[str]] = {}
+        self.configure(config, airlines, generic)
+
+    @property
+    def read_only(self) -> bool:
+        """Process worker'larında istatistik tutulmaz"""
+        return self._state.read_only
+
+    @read_only.setter
+    def read_only(self, value: bool):
+        self._state.read_only = value
+
+    @property
+    def _dirty(self) -> bool:
+        return self._state.dirty
+
+    @_dirty.setter
+    def _dirty(self, value: bool):
+        self._state.dirty = value
+
+    def configure(self, config: Optional[Dict], airlines: List[str], generic: Iterable[str] = ()):
+        """Kuralları (pattern dosyası değiştiğinde) yeniden kur; öğrenilmiş istatistikler korunur"""
+        config = config or {}
+        self.enabled = config.get("enabled", False)
+        self.fallback = config.get("fallback", True)
+        self.airlines = set(airlines)
+        # Prefix'siz pattern'lar (ör. DHL'in 10 hanesi) her gönderende eşleşir, rota seçmez
+        self.generic = [airline for airline in airlines if airline in set(generic)]
+        rules = []
+        for rule in config.get("rules", []):
+            routed = [a for a in rule.get("airlines", []) if a in self.airlines]
+            if not routed:
+                continue
+            rules.append((
+                (rule.get("sender_domain") or "").lower().lstrip("@"),
+                (rule.get("sender_keyword") or "").lower(),
+                (rule.get("subject_keyword") or "").lower(),
+                routed
+            ))
+        self.rules = rules
+
+        learning = config.get("learning", {})
+        self.learning_enabled = self.enabled and learning.get("enabled", False)
+        self.min_mails = learning.get("min_mails", 20)
+        self.min_share = learning.get("min_share", 0.95)
+        self.min_airline_share = learning.get("min_airline_share", 0.01)
+        self.verify_every = learning.get("verify_every", 10)
+        self.learned_path = learning.get("path", "cache/sender_routes.json")
+
+        if self.enabled and not self._state.loaded:
+            self._state.loaded = True
+            self.load()
+        else:
+            # Airline seti değişmiş olabilir, rotaları yeniden hesapla
+            with self._lock:
+                self.learned_routes = {}
+                for key, stats in self._sender_stats.items():
+                    self._promote(key, stats)
+
+    @staticmethod
+    def sender_key(mail_data: Dict) -> str:
+        """Gönderen için öğrenme anahtarı: e-posta domain'i, yoksa gönderen adı"""
+        sender = f"{mail_data.get('sender_email') or ''} {mail_data.get('sender') or ''}"
+        match = _EMAIL_DOMAIN.search(sender)
+        if match:
+            return match.group(1).lower()
+        return sender.strip().lower()
+
+    def route(self, mail_data: Dict) -> Optional[List[str]]:
+        """Mail için taranacak airline listesi (öncelik sırasıyla); None ise tüm set"""
+        return self._route(mail_data)[0]
+
+    def plan(self, mail_data: Dict) -> Optional[List[str]]:
+        """route() ile aynı; öğrenilmiş rotalı her verify_every'inci mail için None (tüm set).
+
+        Tüm set ile taranan mail observe() ile sayılır, rota böylece
+        yeniden denetlenir.
+        """
+        labels, key = self._route(mail_data)
+        if key is None or self.read_only or not self.verify_every:
+            return labels
+        with self._lock:
+            self._routed[key] += 1
+            if self._routed[key] % self.verify_every == 0:
+                return None
+        return labels
+
+    def _route(self, mail_data: Dict) -> Tuple[Optional[List[str]], Optional[str]]:
+        """(airline listesi, rota öğrenilmişse gönderen anahtarı)"""
+        if not self.enabled:
+            return None, None
+        sender = f"{mail_data.get('sender_email') or ''} {mail_data.get('sender') or ''}".lower()
+        subject = (mail_data.get("subject") or "").lower()
+        domains = _EMAIL_DOMAIN.findall(sender)
+
+        for domain, sender_keyword, subject_keyword, routed in self.rules:
+            if domain and not any(d == domain or d.endswith("." + domain) for d in domains):
+                continue
+            if sender_keyword and sender_keyword not in sender:
+                continue
+            if subject_keyword and subject_keyword not in subject:
+                continue
+            if domain or sender_keyword or subject_keyword:
+                return routed, None
+
+        key = self.sender_key(mail_data)
+        routed = self.learned_routes.get(key) if key else None
+        return routed, key if routed is not None else None
+
+    def observe(self, mail_data: Dict, results: List):
+        """Tam set ile taranmış bir mailin sonucunu gönderen istatistiğine ekle"""
+        if not self.learning_enabled or self.read_only:
+            return
+        key = self.sender_key(mail_data)
+        if not key:
+            return
+        with self._lock:
+            stats = self._sender_stats[key]
+            stats["mails"] += 1
+            for result in results:
+                if result.airline in self.airlines:
+                    stats["airlines"][result.airline] += 1
+            # Rota dışında AWB bulunduysa rota düşer; kaçan airline bundan sonra hep rotada kalır
+            routed = self.learned_routes.get(key)
+            missed = {
+                result.airline for result in results
+                if routed is not None and result.airline in self.airlines and result.airline not in routed
+            }
+            if missed:
+                del self.learned_routes[key]
+                stats["pinned"].update(missed)
+            self._dirty = True
+            self._promote(key, stats)
+
+    def _promote(self, key: str, stats: Dict):
+        """Yeterli veri varsa gönderen için rota oluştur"""
+        if stats["mails"] < self.min_mails:
+            return
+        counts = sorted(
+            ((airline, count) for airline, count in stats["airlines"].items()
+             if airline in self.airlines and airline not in self.generic),
+            key=lambda item: item[1], reverse=True
+        )
+        total = sum(count for _, count in counts)
+        if not total:
+            return
+        # Payı min_airline_share'i geçen her airline rotada kalır (nadir ama gerçek AWB'ler düşmez)
+        routed = [airline for airline, count in counts
+                  if count / total >= self.min_airline_share or airline in stats["pinned"]]
+        covered = sum(count for airline, count in counts if airline in routed)
+        if covered / total < self.min_share:
+            return
+        routed.extend(self.generic)
+        # Rota tüm set kadar genişse kazanç yok
+        if len(routed) < len(self.airlines):
+            self.learned_routes[key] = routed
+
+    def load(self):
+        """Öğrenilmiş gönderen istatistiklerini yükle"""
+        try:
+            if not os.path.exists(self.learned_path):
+                return
+            with open(self.learned_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for key, stats in data.get("senders", {}).items():
+                entry = self._sender_stats[key]
+                entry["mails"] = stats.get("mails", 0)
+                entry["pinned"].update(stats.get("pinned", []))
+                entry["airlines"].update(stats.get("airlines", {}))
+                self._promote(key, entry)
+        except Exception as e:
+            print(f"Rota istatistiği yükleme hatası: {str(e)}")
+
+    def save(self):
+        """Öğrenilmiş gönderen istatistiklerini kaydet (yalnızca değişiklik varsa)"""
+        if not self.learning_enabled or self.read_only or not self._dirty:
+            return
+        temp_file = None
+        with self._save_lock:
+            try:
+                with self._lock:
+                    data = {
+                        "senders": {
+                            key: {"mails": stats["mails"], "pinned": sorted(stats["pinned"]),
+                                  "airlines": dict(stats["airlines"])}
+                            for key, stats in self._sender_stats.items()
+                        },
+                        "routes": dict(self.learned_routes)
+                    }
+                    self._dirty = False
+                directory = os.path.dirname(self.learned_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Geçici dosya adı her kayıtta farklı (başka bir yazıcının dosyasını ezmez)
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory or ".",
+                                                 suffix=".tmp", delete=False) as f:
+                    temp_file = f.name
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(temp_file, self.learned_path)
+            except Exception as e:
+                print(f"Rota istatistiği kaydetme hatası: {str(e)}")
+                self._dirty = True
+                if temp_file and os.path.exists(temp_file):
+                    os.remove(temp_file)
@@ -0,0 +1,183 @@
+import os
+import json
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Sayaç sırası: tarama, aday (ham eşleşme), kabul, değerlendirme süresi (ns)
+SCANS, HITS, ACCEPTED, CPU_NS = range(4)
+
+# Bu kadar taramada hiç kabul üretmemiş pattern "ölü" sayılır
+DEFAULT_DEAD_AFTER = 500
+
+
+class PatternStats:
+    """Pattern başına kalıcı kullanım istatistikleri.
+
+    Anahtar (airline, regex kaynağı) olduğundan pattern'ların sırası
+    değişse de istatistik korunur. Detector her metin taramasının
+    sayaçlarını yerelde toplayıp tek seferde record() ile ekler.
+    path None ise (process worker'ları) dosyaya yazılmaz; biriken sayaçlar
+    drain() ile alınıp ana process'te merge() edilir.
+    """
+
+    def __init__(self, path: Optional[str] = "cache/pattern_stats.json", enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self._counters: Dict[Tuple[str, str], List[int]] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # Yazma ve os.replace tek seferde bir thread'de
+        self._dirty = False
+        if path and enabled:
+            self.load()
+
+    def record(self, entries, labels: Optional[List[str]], usage: Dict[int, List[int]]):
+        """Bir taramanın sonucunu ekle.
+
+        entries: motorun PatternEntry listesi, labels: taranan airline'lar
+        (None: hepsi), usage: entry indeksi -> [0, aday, kabul, süre ns].
+        """
+        if not self.enabled:
+            return
+        wanted = set(labels) if labels is not None else None
+        with self._lock:
+            for entry in entries:
+                if wanted is not None and entry.label not in wanted:
+                    continue
+                counter = self._counters.get((entry.label, entry.source))
+                if counter is None:
+                    counter = self._counters[(entry.label, entry.source)] = [0, 0, 0, 0]
+                counter[SCANS] += 1
+                row = usage.get(entry.index)
+                if row is not None:
+                    counter[HITS] += row[HITS]
+                    counter[ACCEPTED] += row[ACCEPTED]
+                    counter[CPU_NS] += row[CPU_NS]
+            self._dirty = True
+
+    def merge(self, delta: Dict[Tuple[str, str], List[int]]):
+        """Worker'dan gelen sayaçları ekle"""
+        if not self.enabled or not delta:
+            return
+        with self._lock:
+            for key, values in delta.items():
+                counter = self._counters.setdefault(tuple(key), [0, 0, 0, 0])
+                for i, value in enumerate(values):
+                    counter[i] += value
+            self._dirty = True
+
+    def drain(self) -> Dict[Tuple[str, str], List[int]]:
+        """Biriken sayaçları al ve sıfırla (worker -> ana process)"""
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            self._dirty = False
+            return counters
+
+    def get(self, airline: str, source: str) -> Dict:
+        """Tek pattern'ın özeti"""
+        with self._lock:
+            counter = list(self._counters.get((airline, source), [0, 0, 0, 0]))
+        scans, hits, accepted, cpu_ns = counter
+        return {
+            "scans": scans,
+            "hits": hits,
+            "accepted": accepted,
+            "cpu_ms": round(cpu_ns / 1e6, 3),
+            "accept_rate": accepted / hits if hits else 0.0,
+            "yield": accepted / scans if scans else 0.0
+        }
+
+    def is_dead(self, airline: str, source: str, dead_after: int = DEFAULT_DEAD_AFTER) -> bool:
+        """Yeterli sayıda taramada hiç kabul üretmemiş mi"""
+        stats = self.get(airline, source)
+        return stats["scans"] >= dead_after and stats["accepted"] == 0
+
+    def rank(self, airline: str, sources: List[str]) -> List[str]:
+        """Pattern'ları ucuz ve verimli olan öne gelecek şekilde sırala.
+
+        Önce kabul başına değerlendirme süresi (düşük iyi), sonra kabul
+        oranı; hiç verisi olmayan pattern'lar mevcut sıralarını korur.
+        """
+        def key(item):
+            position, source = item
+            stats = self.get(airline, source)
+            if not stats["scans"]:
+                return (1, 0.0, 0.0, position)
+            if not stats["accepted"]:
+                return (2, 0.0, 0.0, position)
+            cost = stats["cpu_ms"] / stats["accepted"]
+            return (0, cost, -stats["accept_rate"], position)
+
+        return [source for _, source in sorted(enumerate(sources), key=key)]
+
+    def reset(self, airline: str = None):
+        with self._lock:
+            if airline is None:
+                self._counters.clear()
+            else:
+                for key in [key for key in self._counters if key[0] == airline]:
+                    del self._counters[key]
+            self._dirty = True
+
+    def load(self):
+        """Kayıtlı istatistikleri yükle"""
+        try:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                for airline, patterns in data.get("patterns", {}).items():
+                    for source, stats in patterns.items():
+                        self._counters[(airline, source)] = [
+                            stats.get("scans", 0), stats.get("hits", 0),
+                            stats.get("accepted", 0), stats.get("cpu_ns", 0)
+                        ]
+        except Exception as e:
+            print(f"Pattern istatistiği yükleme hatası: {str(e)}")
+
+    def save(self):
+        """İstatistikleri kaydet (yalnızca değişiklik varsa)"""
+        if not self.path or not self.enabled or not self._dirty:
+            return
+        temp_file = None
+        with self._save_lock:
+            try:
+                with self._lock:
+                    data = {"patterns": {}}
+                    for (airline, source), counter in sorted(self._counters.items()):
+                        data["patterns"].setdefault(airline, {})[source] = {
+                            "scans": counter[SCANS],
+                            "hits": counter[HITS],
+                            "accepted": counter[ACCEPTED],
+                            "cpu_ns": counter[CPU_NS]
+                        }
+                    self._dirty = False
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Geçici dosya adı her kayıtta farklı (başka bir yazıcının dosyasını ezmez)
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory or ".",
+                                                 suffix=".tmp", delete=False) as f:
+                    temp_file = f.name
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(temp_file, self.path)
+            except Exception as e:
+                print(f"Pattern istatistiği kaydetme hatası: {str(e)}")
+                self._dirty = True
+                if temp_file and os.path.exists(temp_file):
+                    os.remove(temp_file)
+
+
+_stats: Dict[str, PatternStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_pattern_stats(path: str = "cache/pattern_stats.json") -> PatternStats:
+    """Dosya başına process içinde tek bir istatistik nesnesi (detector ve PatternManager ortak)"""
+    key = os.path.abspath(path)
+    with _stats_lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = PatternStats(path)
+        return stats
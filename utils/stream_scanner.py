@@ -0,0 +1,152 @@
+import re
+from typing import Dict, Iterator, List, Tuple
+
+from utils.text_index import LineIndex
+
+_TAG = re.compile(r'<[^>]+>')
+_HORIZONTAL_SPACE = re.compile(r'[^\S\n]+')
+_SPACE_AROUND_NEWLINE = re.compile(r' *\n *')
+
+# Güvenli kesim noktaları: satır başı (önceki satır bitmiş) veya iki boşluksuz karakter arası
+_LINE_CUT = re.compile(r'\n(?=[^\s<])')
+_WORD_CUT = re.compile(r'[^\s<>](?=[^\s<>])')
+
+# Bir tag'ın açık kalıp kalmadığını kontrol ederken geriye bakılacak en fazla karakter
+_TAG_LOOKBEHIND = 4096
+
+
+def normalize_fragment(text: str) -> str:
+    """Metin parçasını normalize et (AWBDetector._clean_text ile aynı kurallar, strip hariç).
+
+    find_cut ile bulunan noktalardan bölünen parçalar ayrı ayrı normalize
+    edilip birleştirildiğinde tüm metni normalize etmekle aynı sonucu verir.
+    """
+    text = _TAG.sub(' ', text)
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    # Satır sonları korunur (satır numarası için), diğer boşluklar tek boşluğa iner
+    text = _HORIZONTAL_SPACE.sub(' ', text)
+    text = _SPACE_AROUND_NEWLINE.sub('\n', text)
+    return text.replace('–', '-').replace('—', '-')
+
+
+def _inside_tag(text: str, pos: int) -> bool:
+    """pos bir HTML tag'ının içinde mi (kapanmamış '<' var mı)"""
+    start = max(0, pos - _TAG_LOOKBEHIND)
+    return text.rfind('<', start, pos) > text.rfind('>', start, pos)
+
+
+def find_cut(text: str, pos: int, limit: int = 65536) -> int:
+    """pos'tan sonraki ilk güvenli kesim noktası.
+
+    Kesim bir tag'ı, boşluk dizisini veya \\r\\n çiftini bölmez; böylece
+    parçalar bağımsız normalize edilebilir. limit içinde uygun nokta yoksa
+    parça sınırsız büyümesin diye pos + limit döner.
+    """
+    if pos >= len(text):
+        return len(text)
+    end = min(len(text), pos + limit)
+    for regex in (_LINE_CUT, _WORD_CUT):
+        for match in regex.finditer(text, pos, end):
+            cut = match.end()
+            if cut < len(text) and not _inside_tag(text, cut):
+                return cut
+    return end
+
+
+def iter_normalized_chunks(text: str, chunk_size: int) -> Iterator[str]:
+    """Ham metni güvenli noktalardan bölüp normalize edilmiş parçalar üret.
+
+    Parçaların birleşimi AWBDetector._clean_text(text) ile aynıdır; her
+    adımda yalnızca bir parça kadar kopya tutulur.
+    """
+    pos = 0
+    length = len(text)
+    first = True
+    while pos < length:
+        cut = find_cut(text, pos + chunk_size) if pos + chunk_size < length else length
+        piece = normalize_fragment(text[pos:cut])
+        if first:
+            piece = piece.lstrip()
+            first = False
+        if cut >= length:
+            piece = piece.rstrip()
+        if piece:
+            yield piece
+        pos = cut
+
+
+class StreamScanner:
+    """Normalize edilmiş parçaları sabit boyutlu tampon üzerinde tarayan tarayıcı.
+
+    Her parça, önceki parçanın son `overlap` karakteriyle birlikte taranır;
+    overlap en uzun pattern eşleşmesinden büyük tutulduğu için parça sınırına
+    denk gelen eşleşmeler kaybolmaz. Tampon hiçbir zaman bir parça + overlap
+    boyutunu aşmaz, eşleşmeler bulundukça üretilir.
+    """
+
+    def __init__(self, engine, overlap: int, context_window: int = 50, labels=None):
+        self.engine = engine
+        self.labels = labels  # Yalnızca bu airline'ları tara (None: hepsi)
+        self.overlap = overlap
+        self.context_window = context_window
+
+    def scan(self, chunks: Iterator[str]) -> Iterator[Tuple[object, "re.Match", str, int, Dict]]:
+        """(pattern kaydı, match, tampon, tampon başlangıç offset'i, context) üret.
+
+        match konumları tampona göredir; context içindeki position ve
+        line_number tüm metne göredir.
+        """
+        buffer = ""
+        base_offset = 0       # buffer[0]'ın tüm metindeki konumu
+        base_line = 1         # buffer[0]'ın satır numarası
+        emit_from = 0         # Bu konumdan önce başlayan eşleşmeler zaten üretildi (tampona göre)
+        next_pos = {}         # Pattern başına son üretilen eşleşmenin bitişi (tüm metne göre)
+
+        chunks = iter(chunks)
+        chunk = next(chunks, None)
+        while chunk is not None:
+            buffer += chunk
+            chunk = next(chunks, None)
+            last = chunk is None
+            cutoff = len(buffer) if last else len(buffer) - self.overlap
+            if cutoff <= emit_from:
+                continue
+
+            index = None
+            for entry, match in self.engine.scan_candidates(buffer, self.labels):
+                start = match.start()
+                if start < emit_from or start >= cutoff:
+                    continue
+                if base_offset + start < next_pos.get(entry.index, 0):
+                    continue
+                next_pos[entry.index] = base_offset + max(match.end(), start + 1)
+                if index is None:
+                    index = LineIndex(buffer)
+                context = index.context(start, self.context_window)
+                context['line_number'] += base_line - 1
+                context['position'] += base_offset
+                yield entry, match, buffer, base_offset, context
+
+            if last:
+                break
+
+            # Sonraki tura yalnızca overlap (ve context için biraz öncesi) taşınır
+            keep_from = max(0, cutoff - self.context_window)
+            boundary = max(buffer.rfind(' ', 0, keep_from), buffer.rfind('\n', 0, keep_from))
+            if boundary >= keep_from - self.overlap:
+                keep_from = boundary + 1
+            base_line += buffer.count('\n', 0, keep_from)
+            base_offset += keep_from
+            emit_from = cutoff - keep_from
+            buffer = buffer[keep_from:]
+
+
+def split_segments(text: str, segment_size: int) -> List[Tuple[int, int]]:
+    """Büyük metni worker'lara dağıtmak için güvenli noktalardan (başlangıç, bitiş) aralıkları"""
+    segments = []
+    pos = 0
+    while pos < len(text):
+        cut = find_cut(text, pos + segment_size) if pos + segment_size < len(text) else len(text)
+        segments.append((pos, cut))
+        pos = cut
+    return segments
@@ -0,0 +1,57 @@
+from bisect import bisect_right
+from typing import Dict, List
+
+
+class LineIndex:
+    """Normalize edilmiş metin ve satır başlangıç offset'leri.
+
+    Metin bir kez normalize edilip satır başları bir diziye yazılır. Bir
+    konumun satır numarası ve context penceresi bisect ile bulunur; eşleşme
+    başına metin yeniden bölünmez veya taranmaz.
+    """
+    __slots__ = ("text", "line_starts")
+
+    def __init__(self, text: str):
+        self.text = text
+        starts: List[int] = [0]
+        find = text.find
+        pos = find('\n')
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = find('\n', pos + 1)
+        self.line_starts = starts
+
+    def __len__(self):
+        return len(self.text)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_starts)
+
+    def line_number(self, pos: int) -> int:
+        """Konumun satır numarası (1'den başlar)"""
+        return bisect_right(self.line_starts, pos)
+
+    def line_bounds(self, line_number: int):
+        """Satırın (başlangıç, bitiş) offset'leri, satır sonu hariç"""
+        start = self.line_starts[line_number - 1]
+        if line_number < len(self.line_starts):
+            end = self.line_starts[line_number] - 1
+        else:
+            end = len(self.text)
+        return start, end
+
+    def line(self, line_number: int) -> str:
+        start, end = self.line_bounds(line_number)
+        return self.text[start:end]
+
+    def context(self, pos: int, window: int = 50) -> Dict:
+        """Konum çevresindeki context (eski _get_enhanced_context formatında)"""
+        line_no = self.line_number(pos)
+        return {
+            'before': self.text[max(0, pos - window):pos],
+            'current': self.line(line_no),
+            'after': self.text[pos:min(len(self.text), pos + window)],
+            'line_number': line_no,
+            'position': pos
+        }
@@ -0,0 +1,145 @@
+import re
+import hashlib
+from typing import Dict, List
+
+from utils.stream_scanner import normalize_fragment
+
+# Alıntılanmış önceki mesajın başladığını gösteren satırlar (Outlook, Gmail, Türkçe Outlook)
+REPLY_HEADER = re.compile(
+    r"^[ \t>]*(?:"
+    r"-{2,}\s*(?:original message|orijinal ileti|özgün ileti|forwarded message|iletilen ileti)\s*-{2,}"
+    r"|_{10,}"
+    r"|(?:from|kimden)\s*:[^\n]*\n(?:[ \t>]*[^\n]*\n){0,3}?[ \t>]*(?:sent|date|gönderildi|tarih)\s*:"
+    r"|on\b[^\n]{0,200}\bwrote:"
+    r"|[^\n]{0,200}\btarihinde\b[^\n]{0,200}\byazdı:"
+    r")",
+    re.IGNORECASE | re.MULTILINE
+)
+# Alıntı bloğunun başındaki başlık satırları (blok anahtarı asıl mesajın gövdesiyle aynı olsun diye atılır)
+_HEADER_LINES = re.compile(
+    r"\A(?:[ \t>]*(?:"
+    r"(?:from|sent|to|cc|subject|date|kimden|gönderildi|kime|bilgi|konu|tarih)\s*:[^\n]*"
+    r"|-{2,}[^\n]*-{2,}|_{10,}"
+    r"|on\b[^\n]{0,200}\bwrote:|[^\n]{0,200}\btarihinde\b[^\n]{0,200}\byazdı:"
+    r"|[ \t>]*"
+    r")(?:\n|\Z))*",
+    re.IGNORECASE
+)
+_QUOTED_LINE = re.compile(r"^[ \t]*>", re.MULTILINE)
+_QUOTE_PREFIX = re.compile(r"^[ \t>]+", re.MULTILINE)
+_SPACES = re.compile(r"\s+")
+_SUBJECT_PREFIX = re.compile(r"^(?:\s*(?:re|fw|fwd|ynt|ilt|ilet)\s*:)+\s*", re.IGNORECASE)
+
+
+def split_reply(text: str) -> List[str]:
+    """Gövdeyi [yeni içerik, alıntı 1, alıntı 2, ...] bloklarına ayır.
+
+    Bloklar alıntı başlıklarından ("From:/Sent:", "On ... wrote:",
+    "-----Original Message-----" vb.) ve ">" ile başlayan ilk satırdan
+    bölünür; alıntı bloklarının başlık satırları atılır. Yeni içerik boş
+    olabilir (yalnızca forward).
+    """
+    if not isinstance(text, str) or not text:
+        return [""]
+    text = normalize_fragment(text)
+    cuts = {match.start() for match in REPLY_HEADER.finditer(text)}
+    quoted = _QUOTED_LINE.search(text)
+    if quoted is not None:
+        cuts.add(quoted.start())
+    cuts.discard(0)
+
+    bounds = [0] + sorted(cuts) + [len(text)]
+    blocks = [text[:bounds[1]].strip()]
+    for start, end in zip(bounds[1:-1], bounds[2:]):
+        block = text[start:end]
+        blocks.append(block[_HEADER_LINES.match(block).end():].strip())
+    return blocks
+
+
+def segment_key(block: str) -> str:
+    """Alıntı işaretleri ve boşluklardan bağımsız blok anahtarı"""
+    normalized = _SPACES.sub(" ", _QUOTE_PREFIX.sub("", block)).strip().lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def base_subject(subject: str) -> str:
+    """RE:/FW: öneklerinden arındırılmış konu"""
+    return _SUBJECT_PREFIX.sub("", subject or "").strip().lower()
+
+
+class ThreadSegment:
+    """Konuşmada bir kez taranacak metin bloğu ve ait olduğu mesaj"""
+    __slots__ = ("message_id", "index", "text", "key", "quoted")
+
+    def __init__(self, message_id: str, index: int, text: str, key: str, quoted: bool):
+        self.message_id = message_id
+        self.index = index
+        self.text = text
+        self.key = key
+        self.quoted = quoted  # Asıl mesajı konuşmada olmayan alıntı
+
+    def __repr__(self):
+        return f"ThreadSegment({self.message_id}#{self.index}, quoted={self.quoted})"
+
+
+def segment_thread(messages: List[Dict]) -> List[ThreadSegment]:
+    """Konuşmanın tekrarsız bloklarını mesajlarına atayarak dön.
+
+    messages eskiden yeniye sıralı mail dict'leridir. Her mesajın yeni
+    içeriği kendisine atanır; alıntı blokları daha önce görülmediyse (asıl
+    mesaj konuşmada yoksa) alıntılayan ilk mesaja quoted=True ile atanır.
+    Böylece n yanıtlı zincirde her metin bir kez taranır.
+    """
+    seen = set()
+    segments = []
+    for position, message in enumerate(messages):
+        message_id = str(message.get("entry_id") or message.get("id") or position)
+        for index, block in enumerate(split_reply(message.get("body", ""))):
+            if not block and index:
+                continue
+            key = segment_key(block)
+            if key in seen:
+                continue
+            seen.add(key)
+            segments.append(ThreadSegment(message_id, index, block, key, quoted=index > 0))
+    return segments
+
+
+def scan_thread(messages: List[Dict], detector) -> Dict[str, List]:
+    """Konuşmadaki AWB'leri mesaj id'sine göre dön; her blok bir kez taranır.
+
+    Konu yalnızca RE:/FW: önekleri atıldığında ilk kez görülüyorsa taranır;
+    aynı AWB konuşmada ilk bulunduğu mesaja atanır.
+    """
+    by_id = {}
+    for position, message in enumerate(messages):
+        by_id[str(message.get("entry_id") or message.get("id") or position)] = message
+
+    subjects = set()
+    batch = []
+    for segment in segment_thread(messages):
+        message = by_id[segment.message_id]
+        subject = message.get("subject", "")
+        if segment.index or base_subject(subject) in subjects:
+            subject = ""
+        else:
+            subjects.add(base_subject(subject))
+        batch.append({
+            **message,
+            "entry_id": f"{segment.message_id}#{segment.index}",
+            "subject": subject,
+            "body": segment.text,
+            "attachments": []
+        })
+
+    found = detector.find_all_awbs_batch(batch)
+    results = {message_id: [] for message_id in by_id}
+    attributed = set()
+    for mail in batch:
+        message_id = mail["entry_id"].rsplit("#", 1)[0]
+        for match in found.get(mail["entry_id"], []):
+            if match.awb in attributed:
+                continue
+            attributed.add(match.awb)
+            results[message_id].append(match)
+    return results
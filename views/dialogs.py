@@ -6,6 +6,7 @@ from PyQt6.QtGui import QFont
 import openai
 import re
 import os
+import html
 import tempfile
 
 class AIAnalysisDialog(QDialog):
@@ -86,6 +87,19 @@ class MailPreviewDialog(QDialog):
                 temp_path = self.attachment_paths.get(i, "")
                 attachments_html += f'<li><a href="file:///{temp_path}">{attachment.FileName}</a></li>'
             attachments_html += "</ul>"
+
+        if self.outlook_msg is None:
+            # Outlook'a ulaşılamadı; önizleme mail cache'indeki kayıttan (düz metin) yapılır
+            mail = self.mail_content
+            body = html.escape(mail.get("body") or "").replace("\n", "<br>")
+            return f"""
+        <h3>{html.escape(mail.get("subject") or "")}</h3>
+        <p><b>Tarih:</b> {html.escape(str(mail.get("date") or ""))}</p>
+        <p><b>Kimden:</b> {html.escape(mail.get("sender") or "")}</p>
+        <p><b>Kime:</b> {html.escape(mail.get("to") or "")}</p>
+        <hr>
+        {body}
+        """
             
         return f"""
         <h3>{self.outlook_msg.Subject}</h3>
@@ -111,6 +111,9 @@ class AWBSearchApp(QMainWindow):
             if self.cached_mails:
                 self.cache.save_cache(self.cached_mails, self.config)
                 
+            # Process havuzunu kapat
+            self.search_controller.shutdown()
+                
         except Exception as e:
             print(f"Kapanış hatası: {str(e)}")
             
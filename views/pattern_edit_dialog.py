@@ -1,12 +1,18 @@
 import re
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLineEdit, 
                            QCheckBox, QDoubleSpinBox, QPushButton, QSpinBox,
-                           QTextEdit, QLabel, QHBoxLayout)  # Added QHBoxLayout import
+                           QTextEdit, QLabel, QHBoxLayout, QMessageBox,
+                           QApplication)  # Added QHBoxLayout import
+from PyQt6.QtCore import Qt
+from utils.check_digit import mod7_valid
+from utils.pattern_bundle import get_pattern_bundles
+from utils.pattern_profiler import profile_patterns
 
 class PatternEditDialog(QDialog):
     def __init__(self, parent=None, pattern_data=None):
         super().__init__(parent)
         self.pattern_data = pattern_data or {}
+        self.profile = None  # Son profil (kaydederken tekrar ölçmemek için)
         self.setWindowTitle("Pattern Düzenle")
         self.setup_ui()
         
@@ -34,10 +40,19 @@ class PatternEditDialog(QDialog):
         self.format_example.setPlaceholderText("Her satıra bir örnek yazın")
         layout.addRow("Format Örnekleri:", self.format_example)
         
+        # Regex pattern'ları (boşsa prefix/uzunluktan üretilir)
+        self.regex_patterns = QTextEdit()
+        self.regex_patterns.setPlaceholderText("Her satıra bir regex (boş bırakılırsa otomatik üretilir)")
+        layout.addRow("Regex Pattern'ları:", self.regex_patterns)
+        
         # Ayraç izni
         self.allow_separator = QCheckBox()
         layout.addRow("Ayraçlara İzin Ver:", self.allow_separator)
         
+        # IATA mod-7 kontrol hanesi (seri no'nun son hanesi)
+        self.check_digit = QCheckBox()
+        layout.addRow("Mod-7 Kontrol Hanesi:", self.check_digit)
+        
         # Minimum güven skoru
         self.min_confidence = QDoubleSpinBox()
         self.min_confidence.setRange(0.1, 1.0)
@@ -56,6 +71,11 @@ class PatternEditDialog(QDialog):
         self.test_result = QLabel()
         layout.addRow("Test Sonucu:", self.test_result)
         
+        # Örnek mail seti üzerinde süre / isabet / en kötü girdi raporu
+        self.profile_result = QLabel()
+        self.profile_result.setWordWrap(True)
+        layout.addRow("Performans:", self.profile_result)
+        
         # Kaydet/İptal
         buttons = QHBoxLayout()
         save_btn = QPushButton("Kaydet")
@@ -89,29 +109,77 @@ class PatternEditDialog(QDialog):
         # Format örnekleri
         examples = self.pattern_data.get("format_examples", [])
         self.format_example.setText("\n".join(examples))
+        self.regex_patterns.setText("\n".join(self.pattern_data.get("patterns", [])))
         
         # Ayarlar
         self.allow_separator.setChecked(self.pattern_data.get("separator_allowed", True))
+        self.check_digit.setChecked(self.pattern_data.get("check_digit") == "mod7")
         self.min_confidence.setValue(float(self.pattern_data.get("min_confidence", 0.7)))
 
     def test_pattern(self):
-        """Test AWB'yi kontrol et"""
+        """Test AWB'yi kontrol et ve pattern'ların performansını ölç"""
         test_awb = self.test_input.text()
         pattern = self.get_pattern()
         
         # AWB formatını test et
-        is_valid = True
-        clean_awb = re.sub(r'[\s-]', '', test_awb)
-        
-        if len(clean_awb) != pattern["length"]:
-            is_valid = False
-        elif pattern["prefix"] and not clean_awb.startswith(pattern["prefix"]):
-            is_valid = False
+        if test_awb:
+            is_valid = True
+            clean_awb = re.sub(r'[\s-]', '', test_awb)
             
-        self.test_result.setText("Geçerli ✓" if is_valid else "Geçersiz ✗")
-        self.test_result.setStyleSheet(
-            "color: green" if is_valid else "color: red"
+            if len(clean_awb) != pattern["length"]:
+                is_valid = False
+            elif pattern["prefix"] and not clean_awb.startswith(pattern["prefix"]):
+                is_valid = False
+            elif pattern.get("check_digit") == "mod7" and not mod7_valid(clean_awb):
+                is_valid = False
+                
+            self.test_result.setText("Geçerli ✓" if is_valid else "Geçersiz ✗")
+            self.test_result.setStyleSheet(
+                "color: green" if is_valid else "color: red"
+            )
+        
+        self.run_profile(pattern)
+
+    def run_profile(self, pattern: dict, sources: list = None):
+        """Pattern'ları (sources verilirse yalnızca onları) örnek mail setinde profille, sonucu göster"""
+        sources = sources or pattern["patterns"]
+        if self.profile is None or self.profile.sources != sources:
+            # Bütçeler awb_patterns.json "profiler" bloğundan okunur
+            config = get_pattern_bundles().current().config.get("profiler")
+            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+            try:
+                self.profile = profile_patterns(sources, config, pattern["format_examples"])
+            finally:
+                QApplication.restoreOverrideCursor()
+        
+        self.profile_result.setText(self.profile.summary())
+        self.profile_result.setStyleSheet(
+            "color: green" if self.profile.within_budget else "color: red"
         )
+        return self.profile
+
+    def accept(self):
+        """Bütçeyi aşan (geri izleme patlaması riski taşıyan) yeni pattern'lar kaydedilmez.
+
+        Yalnızca eklenen veya değiştirilen regex'ler ölçülür; kayıtlı
+        pattern'lar (ör. DHL'in prefix'siz 10 hanesi) başka bir alan
+        düzenlenirken kaydı engellemez.
+        """
+        pattern = self.get_pattern()
+        existing = set(self.pattern_data.get("patterns", []))
+        changed = [source for source in pattern["patterns"] if source not in existing]
+        if not changed:
+            super().accept()
+            return
+        profile = self.run_profile(pattern, changed)
+        if not profile.within_budget:
+            QMessageBox.warning(
+                self,
+                "Pattern Reddedildi",
+                f"Pattern performans bütçesini aşıyor, kaydedilmedi:\n{profile.summary()}"
+            )
+            return
+        super().accept()
         
     def get_pattern(self):
         """Form verilerini pattern dict'e dönüştür"""
@@ -125,10 +193,12 @@ class PatternEditDialog(QDialog):
             "min_confidence": self.min_confidence.value(),
             "enabled": True
         }
+        if self.check_digit.isChecked():
+            pattern["check_digit"] = "mod7"
         
-        # Eğer mevcut pattern düzenleniyorsa patterns dizisini koru
-        if self.pattern_data and "patterns" in self.pattern_data:
-            pattern["patterns"] = self.pattern_data["patterns"]
+        # Regex alanı boşsa prefix/uzunluktan pattern üret
+        regexes = [x.strip() for x in self.regex_patterns.toPlainText().splitlines() if x.strip()]
+        pattern["patterns"] = regexes or [self._generate_pattern()]
             
         return pattern
 
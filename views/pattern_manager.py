@@ -3,8 +3,10 @@ from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout,
                            QSpinBox, QLabel, QTableWidget,
                            QTableWidgetItem, QMessageBox)  # Add QMessageBox
 from .pattern_edit_dialog import PatternEditDialog  # Add this import
+from utils.pattern_bundle import get_pattern_bundles
+from utils.pattern_stats import get_pattern_stats
 
-import json
+import copy
 
 class PatternManagerDialog(QDialog):
     def __init__(self, parent=None):
@@ -25,31 +27,45 @@ class PatternManagerDialog(QDialog):
         ])
         layout.addWidget(self.table)
         
+        # Pattern bazında kullanım istatistikleri (detector'ın topladığı)
+        layout.addWidget(QLabel("Pattern İstatistikleri"))
+        self.stats_table = QTableWidget()
+        self.stats_table.setColumnCount(8)
+        self.stats_table.setHorizontalHeaderLabels([
+            "Tip", "Pattern", "Tarama", "Aday", "Kabul",
+            "Kabul Oranı", "CPU (ms)", "Durum"
+        ])
+        layout.addWidget(self.stats_table)
+        
         # Yeni Pattern Ekleme
         add_layout = QHBoxLayout()
         self.add_btn = QPushButton("Yeni Pattern Ekle")
         self.add_btn.clicked.connect(self.add_pattern)
         add_layout.addWidget(self.add_btn)
+        self.order_btn = QPushButton("İstatistiğe Göre Sırala")
+        self.order_btn.clicked.connect(self.order_patterns)
+        add_layout.addWidget(self.order_btn)
+        self.dead_btn = QPushButton("Ölü Pattern'ları Kapat")
+        self.dead_btn.clicked.connect(self.disable_dead_patterns)
+        add_layout.addWidget(self.dead_btn)
         layout.addLayout(add_layout)
         
         self.setLayout(layout)
         
     def load_patterns(self):
-        """Pattern'ları JSON'dan yükle"""
+        """Pattern'ları yükle (paylaşılan bundle'ın düzenlenebilir kopyası)"""
         try:
-            with open("config/awb_patterns.json", "r", encoding='utf-8') as f:
-                self.patterns = json.load(f)
-                print(f"Loaded patterns: {self.patterns}")  # Debug için
-                self.refresh_table()
+            self.patterns = copy.deepcopy(get_pattern_bundles().current().config)
+            print(f"Loaded patterns: {self.patterns}")  # Debug için
+            self.refresh_table()
         except Exception as e:
             print(f"Pattern yükleme hatası: {str(e)}")
             self.patterns = {"patterns": {}}
             
     def save_patterns(self):
-        """Pattern'ları JSON dosyasına kaydet"""
+        """Pattern'ları JSON dosyasına atomik kaydet; açık detector'lar yeni seti hemen alır"""
         try:
-            with open("config/awb_patterns.json", "w", encoding='utf-8') as f:
-                json.dump(self.patterns, f, indent=4, ensure_ascii=False)
+            get_pattern_bundles().write_config(self.patterns)
         except Exception as e:
             QMessageBox.warning(
                 self,
@@ -91,6 +107,75 @@ class PatternManagerDialog(QDialog):
                 print(f"Satır {row} yüklenirken hata: {str(e)}")
                 continue
 
+        self.refresh_stats_table()
+
+    def refresh_stats_table(self):
+        """Pattern istatistik tablosunu güncelle"""
+        stats = get_pattern_stats()
+        self.stats_table.setRowCount(0)
+        for airline, data in self.patterns.get("patterns", {}).items():
+            rows = [(source, "Aktif") for source in data.get("patterns", [])]
+            rows += [(source, "Kapalı") for source in data.get("disabled_patterns", [])]
+            for source, state in rows:
+                pattern_stats = stats.get(airline, source)
+                if state == "Aktif" and stats.is_dead(airline, source):
+                    state = "Ölü"
+                row = self.stats_table.rowCount()
+                self.stats_table.insertRow(row)
+                self.stats_table.setItem(row, 0, QTableWidgetItem(airline))
+                self.stats_table.setItem(row, 1, QTableWidgetItem(source))
+                self.stats_table.setItem(row, 2, QTableWidgetItem(str(pattern_stats["scans"])))
+                self.stats_table.setItem(row, 3, QTableWidgetItem(str(pattern_stats["hits"])))
+                self.stats_table.setItem(row, 4, QTableWidgetItem(str(pattern_stats["accepted"])))
+                self.stats_table.setItem(row, 5, QTableWidgetItem(f"%{pattern_stats['accept_rate'] * 100:.1f}"))
+                self.stats_table.setItem(row, 6, QTableWidgetItem(f"{pattern_stats['cpu_ms']:.1f}"))
+                self.stats_table.setItem(row, 7, QTableWidgetItem(state))
+
+    def order_patterns(self):
+        """Her airline'ın pattern'larını kabul başına maliyete göre sırala.
+
+        Aynı AWB'yi yakalayan pattern'lardan önde olanın kabulü sonrakilerin
+        adaylarını eler; verimli pattern öne alınınca daha az aday değerlendirilir.
+        """
+        stats = get_pattern_stats()
+        changed = False
+        for airline, data in self.patterns.get("patterns", {}).items():
+            ordered = stats.rank(airline, data.get("patterns", []))
+            if ordered != data.get("patterns", []):
+                data["patterns"] = ordered
+                changed = True
+        if changed:
+            self.save_patterns()
+        self.refresh_table()
+
+    def disable_dead_patterns(self):
+        """Yeterli taramada hiç kabul üretmemiş pattern'ları kapat (disabled_patterns'a taşı)"""
+        stats = get_pattern_stats()
+        disabled = []
+        for airline, data in self.patterns.get("patterns", {}).items():
+            active = data.get("patterns", [])
+            dead = [source for source in active if stats.is_dead(airline, source)]
+            # Airline'ın son pattern'ı kapatılmaz
+            if not dead or len(dead) == len(active):
+                continue
+            data["patterns"] = [source for source in active if source not in dead]
+            data["disabled_patterns"] = data.get("disabled_patterns", []) + dead
+            disabled.extend(f"{airline}: {source}" for source in dead)
+        if not disabled:
+            QMessageBox.information(self, "Ölü Pattern", "Kapatılacak pattern bulunamadı")
+            return
+        answer = QMessageBox.question(
+            self,
+            "Ölü Pattern",
+            "Aşağıdaki pattern'lar hiç kabul üretmedi, kapatılsın mı?\n" + "\n".join(disabled)
+        )
+        if answer == QMessageBox.StandardButton.Yes:
+            self.save_patterns()
+        else:
+            self.load_patterns()
+            return
+        self.refresh_table()
+
     def edit_pattern(self, airline):
         """Pattern düzenleme dialogunu aç"""
         # Mevcut pattern verilerini al
@@ -104,11 +189,9 @@ class PatternManagerDialog(QDialog):
             # Dialog kapandığında yeni verileri kaydet
             new_pattern = dialog.get_pattern()
             new_pattern["enabled"] = self.patterns["patterns"][airline].get("enabled", True)
+            if "disabled_patterns" in self.patterns["patterns"][airline]:
+                new_pattern["disabled_patterns"] = self.patterns["patterns"][airline]["disabled_patterns"]
             
-            # Mevcut patterns dizisini koru
-            if "patterns" in self.patterns["patterns"][airline]:
-                new_pattern["patterns"] = self.patterns["patterns"][airline]["patterns"]
-                
             self.patterns["patterns"][airline] = new_pattern
             self.save_patterns()
             self.refresh_table()
@@ -222,14 +222,20 @@ class MailPanel(QWidget):
             dialog = MailPreviewDialog(mail_content, self)
             dialog.exec()
             
-    def get_mail_content(self, date, subject):
-        """Mail içeriğini getir"""
-        cache_key = f"{date}_{subject}"
+    def get_mail_content(self, date, subject, entry_id=None):
+        """Mail içeriğini getir (entry_id varsa mail cache'i ve Outlook'tan doğrudan)"""
+        cache_key = entry_id or f"{date}_{subject}"
       
         if cache_key in self.main_window.mail_cache:
             return self.main_window.mail_cache[cache_key]
             
         try:
+            if entry_id:
+                formatted_content = self._mail_content_by_id(entry_id)
+                if formatted_content:
+                    self.main_window.mail_cache[cache_key] = formatted_content
+                    return formatted_content
+
             if self.current_folder:
                 messages = self.current_folder.Items
                 messages.Sort("[ReceivedTime]", True)
@@ -248,6 +254,8 @@ class MailPanel(QWidget):
                         formatted_content = {
                             "subject": subject,
                             "body": content,
+                            "sender": msg.SenderName,
+                            "sender_email": getattr(msg, "SenderEmailAddress", "") or "",
                             "attachments": attachments,
                             "outlook_msg": msg  # Orijinal Outlook mesajı buradan geliyor
                         }
@@ -260,6 +268,38 @@ class MailPanel(QWidget):
             
         return None
 
+    def _mail_content_by_id(self, entry_id):
+        """Entry ID ile mail içeriği; ekler için Outlook mesajı, yoksa mail cache'indeki kayıt"""
+        msg = self.main_window.outlook.get_mail_by_id(entry_id)
+        if msg is not None:
+            return {
+                "subject": msg.Subject,
+                "body": self.format_mail_content(msg),
+                "sender": msg.SenderName,
+                "sender_email": getattr(msg, "SenderEmailAddress", "") or "",
+                "attachments": [attachment.FileName for attachment in msg.Attachments],
+                "outlook_msg": msg
+            }
+        # Outlook'a ulaşılamıyorsa gövde mail cache'inden gelir (ekler olmadan)
+        mail = self.main_window.cache.get_mail(entry_id)
+        if mail is None:
+            return None
+        return {
+            "subject": mail.get("subject", ""),
+            "date": (mail.get("date") or "")[:16].replace("T", " "),
+            "to": mail.get("to", ""),
+            "body": mail.get("body", ""),
+            "sender": mail.get("sender", ""),
+            "sender_email": mail.get("sender_email", ""),
+            "attachments": [],
+            "outlook_msg": None
+        }
+
+    def _row_entry_id(self, row):
+        """Tablo satırındaki mailin entry ID'si (tarih hücresinde saklanır)"""
+        item = self.mail_table.item(row, 0)
+        return item.data(Qt.ItemDataRole.UserRole) if item is not None else None
+
     def format_mail_content(self, msg):
         """Mail içeriğini HTML formatında düzenle"""
         attachments_html = ""
@@ -289,14 +329,15 @@ class MailPanel(QWidget):
 
         try:
             self.mail_table.setRowCount(0)
-            cached_mails = self.main_window.cache.load_cache()
             date_range = self.get_date_range()
+            # Tarih filtresi indeksli sorguyla yapılır, gövdeler okunmaz
+            cached_mails = self.main_window.cache.list_mails(since=date_range)
             
             mail_count = 0
             awb_count = 0
-            total_mails = len(cached_mails["mails"])
+            total_mails = len(cached_mails)
             
-            for i, mail in enumerate(cached_mails["mails"]):
+            for i, mail in enumerate(cached_mails):
                 # Progress güncelle
                 progress.setValue(int((i / total_mails) * 100))
                 if progress.wasCanceled():
@@ -311,7 +352,9 @@ class MailPanel(QWidget):
                 self.mail_table.insertRow(row)
                 
                 # Mail bilgilerini ekle
-                self.mail_table.setItem(row, 0, QTableWidgetItem(msg_date.strftime("%Y-%m-%d %H:%M")))
+                date_item = QTableWidgetItem(msg_date.strftime("%Y-%m-%d %H:%M"))
+                date_item.setData(Qt.ItemDataRole.UserRole, mail.get("entry_id"))
+                self.mail_table.setItem(row, 0, date_item)
                 self.mail_table.setItem(row, 1, QTableWidgetItem(mail["subject"]))
                 self.mail_table.setItem(row, 2, QTableWidgetItem(mail["sender"]))
                 
@@ -373,7 +416,7 @@ class MailPanel(QWidget):
             self.progress.setCancelButton(None)  # İptal butonu kaldır
             
             # Mail içeriğini al
-            mail_content = self.get_mail_content(date, subject)
+            mail_content = self.get_mail_content(date, subject, self._row_entry_id(row))
             
             if not mail_content:
                 self.progress.close()
@@ -532,7 +575,7 @@ class MailPanel(QWidget):
         row = index.row()
         date = self.mail_table.item(row, 0).text()
         subject = self.mail_table.item(row, 1).text()
-        mail_content = self.get_mail_content(date, subject)  # Mail içeriğini al
+        mail_content = self.get_mail_content(date, subject, self._row_entry_id(row))  # Mail içeriğini al
         if mail_content:
             dialog = MailPreviewDialog(mail_content, self)  # Dialog'u aç
             dialog.exec()
@@ -569,7 +612,7 @@ class MailPanel(QWidget):
             if action == view_action:
                 date = self.mail_table.item(row, 0).text()
                 subject = self.mail_table.item(row, 1).text()
-                mail_content = self.get_mail_content(date, subject)
+                mail_content = self.get_mail_content(date, subject, self._row_entry_id(row))
                 if mail_content:
                     dialog = MailPreviewDialog(mail_content, self)
                     dialog.exec()
@@ -613,7 +656,7 @@ class MailPanel(QWidget):
         """Seçili mailin içeriğini al"""
         date = self.mail_table.item(row, 0).text()
         subject = self.mail_table.item(row, 1).text()
-        return self.get_mail_content(date, subject)
+        return self.get_mail_content(date, subject, self._row_entry_id(row))
 
     def show_predictions_dialog(self, predictions):
         """Eşleşme tahminlerini gösteren dialog"""
@@ -782,13 +825,16 @@ class MailPanel(QWidget):
             # Mail bilgilerini al
             date = self.mail_table.item(row, 0).text()
             subject = self.mail_table.item(row, 1).text()
-            mail_content = self.get_mail_content(date, subject)  # İki parametre ile çağır
+            mail_content = self.get_mail_content(date, subject, self._row_entry_id(row))
             
             if not mail_content:
                 return
 
             # Outlook mesaj nesnesinden ekleri al
             outlook_msg = mail_content.get('outlook_msg')
+            if outlook_msg is None:
+                QMessageBox.warning(self, "Uyarı", "Mailin ekleri için Outlook'a ulaşılamadı.")
+                return
 
             # OCR kontrolü
             ocr_enabled = self.main_window.config.get("ocr", {}).get("enabled", False)